@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - APIのプロセス内キャッシュ
+
+件数上限 (LRU) と有効期限つきのキャッシュ。
+期限切れのキーに同時にアクセスが来ても読み込みは1回だけ行う (Firestore への集中を防ぐ)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """有効期限つき LRU キャッシュ (スレッドセーフ)"""
+    
+    def __init__(self, maxsize: int = 1000, ttl_sec: float = 60.0):
+        """
+        Args:
+            maxsize: 保持する最大件数 (超えたら最も使われていないものから捨てる)
+            ttl_sec: 有効期限(秒)
+        """
+        self.maxsize = max(1, maxsize)
+        self.ttl_sec = ttl_sec
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """有効なキャッシュを取得 (なければNone)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key: Hashable, value: Any):
+        """キャッシュに保存"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_sec, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, key: Hashable):
+        """キャッシュを破棄"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        """全件破棄"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        キャッシュを取得し、なければ loader で読み込んで保存 (read-through)
+        
+        同じキーの読み込みは1つのスレッドだけが行い、他は結果を待つ。
+        loader が None を返した場合はキャッシュしない
+        
+        Args:
+            key: キー
+            loader: 値を読み込む関数
+        
+        Returns:
+            値
+        """
+        value = self.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+        
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        
+        with key_lock:
+            # 待っている間に他のスレッドが読み込んだ場合
+            value = self.get(key)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                return value
+            
+            try:
+                with self._lock:
+                    self.misses += 1
+                value = loader()
+                if value is not None:
+                    self.put(key, value)
+                return value
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        """件数とヒット率"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 配信APIサーバー
+
+エンドポイント:
+    GET /articles?limit=&cursor=   変換済みの記事一覧 (新しい順、カーソルページング)
+    GET /articles/<記事ID>          記事と変換結果 (transformedContent・メディアURL)
+    GET /search?q=&from=&to=&limit= 全文検索 (AND・"フレーズ"、公開日 YYYY-MM-DD で絞り込み)
+    GET /media/<パス>               ローカル保存のメディア (GCS未使用時のみ)
+    GET /healthz                    死活監視・キャッシュ状況
+
+WSGI (application)、Cloud Functions (main_handler)、ローカル実行 (python main.py) に対応
+"""
+
+import json
+import mimetypes
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import parse_qs, unquote
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.api.service import APIError, ArticleService, CachedResponse
+from backend.common import storage
+
+
+# ステータスコード → 理由句 (WSGI のステータス行用)
+_REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+Response = Tuple[int, Dict[str, str], bytes]
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match に ETag が含まれるか"""
+    if not if_none_match:
+        return False
+    candidates = [v.strip() for v in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _json_response(status: int, payload: Dict[str, Any]) -> Response:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    return status, {"Content-Type": "application/json; charset=utf-8"}, body
+
+
+class ArticleAPI:
+    """配信APIのルーティング"""
+    
+    def __init__(self, service: Optional[ArticleService] = None, max_age_sec: Optional[int] = None):
+        """
+        Args:
+            service: ArticleService (Noneの場合は環境変数の自治体で作成)
+            max_age_sec: Cache-Control の max-age (Noneの場合は API_MAX_AGE_SEC、既定30秒)
+        """
+        self.service = service or ArticleService()
+        self.max_age_sec = max_age_sec if max_age_sec is not None else int(os.getenv("API_MAX_AGE_SEC", "30"))
+    
+    def handle(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, str]] = None,
+        if_none_match: Optional[str] = None
+    ) -> Response:
+        """
+        リクエストを処理
+        
+        Args:
+            method: HTTPメソッド
+            path: パス
+            params: クエリパラメータ
+            if_none_match: If-None-Match ヘッダー
+        
+        Returns:
+            (ステータスコード, ヘッダー, 本文)
+        """
+        params = params or {}
+        try:
+            if method not in ("GET", "HEAD"):
+                raise APIError(405, "method not allowed")
+            
+            parts = [p for p in path.split("/") if p]
+            
+            if parts == ["healthz"]:
+                return _json_response(200, {"status": "ok", "cache": self.service.stats()})
+            
+            if parts == ["articles"]:
+                limit = params.get("limit")
+                if limit is not None and not limit.isdigit():
+                    raise APIError(400, "limit must be an integer")
+                response = self.service.list_articles(params.get("cursor"), int(limit) if limit else None)
+                return self._cached(response, if_none_match)
+            
+            if len(parts) == 2 and parts[0] == "articles":
+                return self._cached(self.service.get_article(unquote(parts[1])), if_none_match)
+            
+            if parts == ["search"]:
+                limit = params.get("limit")
+                if limit is not None and not limit.isdigit():
+                    raise APIError(400, "limit must be an integer")
+                response = self.service.search_articles(
+                    params.get("q", ""),
+                    params.get("from"),
+                    params.get("to"),
+                    int(limit) if limit else None
+                )
+                return self._cached(response, if_none_match)
+            
+            if parts and parts[0] == "media":
+                return self._media("/".join(parts[1:]))
+            
+            raise APIError(404, "not found")
+        
+        except APIError as e:
+            return _json_response(e.status, {"error": e.message})
+        except Exception as e:
+            print(f"❌ APIエラー: {method} {path} | {e}")
+            return _json_response(500, {"error": "internal error"})
+    
+    def _cached(self, response: CachedResponse, if_none_match: Optional[str]) -> Response:
+        """キャッシュ済みのレスポンス (ETag が一致すれば 304)"""
+        headers = {
+            "ETag": response.etag,
+            "Cache-Control": f"public, max-age={self.max_age_sec}",
+        }
+        if _etag_matches(if_none_match, response.etag):
+            return 304, headers, b""
+        
+        headers["Content-Type"] = "application/json; charset=utf-8"
+        return 200, headers, response.body
+    
+    def _media(self, relative: str) -> Response:
+        """ローカル保存のメディアを返す (エミュレータ・ローカル実行用)"""
+        if os.getenv("GCS_BUCKET_NAME") and not os.getenv("FIRESTORE_EMULATOR_HOST"):
+            raise APIError(404, "not found")
+        
+        root = storage.LOCAL_STORAGE_DIR.resolve()
+        file_path = (root / unquote(relative)).resolve()
+        if root not in file_path.parents or not file_path.is_file():
+            raise APIError(404, "not found")
+        
+        content_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+        return 200, {
+            "Content-Type": content_type,
+            "Cache-Control": f"public, max-age={self.max_age_sec}",
+        }, file_path.read_bytes()
+
+
+# グローバルインスタンス
+_api: Optional[ArticleAPI] = None
+_api_lock = threading.Lock()
+
+
+def get_api() -> ArticleAPI:
+    """
+    APIインスタンスを取得 (キャッシュをリクエスト間で共有するためプロセスで1つ)
+    
+    Returns:
+        ArticleAPI インスタンス
+    """
+    global _api
+    
+    with _api_lock:
+        if _api is None:
+            _api = ArticleAPI()
+    
+    return _api
+
+
+def application(environ, start_response):
+    """WSGIアプリケーション"""
+    params = {k: v[0] for k, v in parse_qs(environ.get("QUERY_STRING", "")).items()}
+    method = environ.get("REQUEST_METHOD", "GET")
+    
+    status, headers, body = get_api().handle(
+        method,
+        environ.get("PATH_INFO", "/"),
+        params,
+        environ.get("HTTP_IF_NONE_MATCH")
+    )
+    
+    if method == "HEAD":
+        body = b""
+    headers = {**headers, "Content-Length": str(len(body))}
+    start_response(f"{status} {_REASONS.get(status, '')}", list(headers.items()))
+    return [body]
+
+
+# Cloud Functions用ハンドラ
+def main_handler(request):
+    """
+    Cloud Functions (Gen2) 用HTTPハンドラ
+    
+    Args:
+        request: flask.Request
+    
+    Returns:
+        (response_body, status_code, headers)
+    """
+    status, headers, body = get_api().handle(
+        request.method,
+        request.path,
+        request.args.to_dict(),
+        request.headers.get("If-None-Match")
+    )
+    return (body, status, headers)
+
+
+def main():
+    """ローカル実行 (環境変数 PORT、既定8080)"""
+    from wsgiref.simple_server import make_server, WSGIServer
+    from socketserver import ThreadingMixIn
+    
+    class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+    
+    port = int(os.getenv("PORT", "8080"))
+    api = get_api()
+    print(f"🚀 OMO Platform - 配信API開始: http://localhost:{port} ({api.service.config.municipality_name})")
+    
+    with make_server("", port, application, server_class=_ThreadingWSGIServer) as server:
+        server.serve_forever()
+
+
+# ローカル実行
+if __name__ == "__main__":
+    main()
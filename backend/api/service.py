@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 配信API (記事・変換結果の参照)
+
+LINE・Web などの配信先がポーリングで参照する読み取り専用API。
+Firestore の読み込みはプロセス内キャッシュ (LRU + 有効期限) を通し、
+ETag (quick_hash + transformedAt) が一致するリクエストには本文なしの 304 を返す。
+レスポンス本文 (JSON) と配信用メディアURLはキャッシュに入れる時点で作っておく
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.api.cache import LRUCache
+from backend.common.config import get_config
+from backend.common.firestore import get_firestore_client
+from backend.common.metrics import span
+from backend.common.storage import public_url
+from backend.search.index import load_index
+from backend.transform.core.status import STATE_COMPLETED, get_transform_state
+
+
+# 1ページの件数 (既定・上限)
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# 一覧で返す変換結果 (メディアURLの算出用、本文の長いテキストは読まない)
+LIST_MEDIA_TYPES = ("image_single", "video_short")
+
+# 一覧のプロジェクション
+LIST_FIELDS = [
+    "title",
+    "category",
+    "original_url",
+    "published_date_str",
+    "quick_hash",
+    "transformedAt",
+    "transformStatus",
+] + [f"transformedContent.{t}" for t in LIST_MEDIA_TYPES]
+
+# 検索の日付指定 (YYYY-MM-DD)
+_DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# ドキュメントIDとして受け付ける文字列
+_DOC_ID_PATTERN = re.compile(r"^[A-Za-z0-9_\-]{1,256}$")
+
+# 保存先パスの接頭辞 (メディアURLに変換する値)
+_STORAGE_PREFIXES = ("gs://", "local://")
+
+
+class APIError(Exception):
+    """クライアントに返すエラー"""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class CachedResponse:
+    """キャッシュするレスポンス (シリアライズ済みの本文と ETag)"""
+    
+    __slots__ = ("body", "etag")
+    
+    def __init__(self, payload: Dict[str, Any], etag: Optional[str] = None):
+        """
+        Args:
+            payload: レスポンスのJSON
+            etag: ETag (Noneの場合は本文のハッシュ)
+        """
+        self.body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode("utf-8")
+        self.etag = etag or f'"{hashlib.sha256(self.body).hexdigest()[:20]}"'
+
+
+def _json_default(value):
+    """JSONに変換できない値 (Firestore のタイムスタンプなど)"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return None
+    return str(value)
+
+
+def make_etag(quick_hash: Optional[str], transformed_at) -> str:
+    """
+    記事の ETag
+    
+    本文が変わると quick_hash が、変換結果が変わると transformedAt が変わる
+    
+    Args:
+        quick_hash: 記事の軽量ハッシュ
+        transformed_at: 最後に変換結果を保存した時刻
+    """
+    stamp = transformed_at.isoformat() if isinstance(transformed_at, datetime) else str(transformed_at or "")
+    digest = hashlib.sha256(f"{quick_hash or ''}:{stamp}".encode("utf-8")).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def collect_media_urls(transformed_content: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    変換結果の保存先パスを配信用URLに変換
+    
+    Args:
+        transformed_content: {変換タイプ: 変換結果}
+    
+    Returns:
+        {変換タイプ: {キー: URL}} (例: {"image_single": {"image_path_1x1": "https://..."}})
+        画像のバリアントは variants に {"1x1": [{"format", "width", "height", "bytes", "url"}]} で返す
+    """
+    media = {}
+    for transform_type, result in (transformed_content or {}).items():
+        if not isinstance(result, dict):
+            continue
+        urls = {}
+        for key, value in result.items():
+            if isinstance(value, str) and value.startswith(_STORAGE_PREFIXES):
+                url = public_url(value)
+                if url:
+                    urls[key] = url
+        
+        # 画像のバリアント (保存先パスをURLに置き換える)
+        variants = {}
+        for key, items in (result.get("variants") or {}).items():
+            converted = []
+            for item in items or []:
+                url = public_url(item.get("path")) if isinstance(item, dict) else None
+                if url:
+                    converted.append({**{k: v for k, v in item.items() if k != "path"}, "url": url})
+            if converted:
+                variants[key] = converted
+        if variants:
+            urls["variants"] = variants
+        
+        if urls:
+            media[transform_type] = urls
+    return media
+
+
+def completed_types(data: Dict[str, Any]) -> List[str]:
+    """変換が完了している変換タイプ"""
+    return [
+        transform_type for transform_type in (data.get("transformStatus") or {})
+        if get_transform_state(data, transform_type)["state"] == STATE_COMPLETED
+    ]
+
+
+def encode_cursor(transformed_at, doc_id: str) -> str:
+    """ページングのカーソル (次ページの開始位置) を作成"""
+    stamp = transformed_at.isoformat() if isinstance(transformed_at, datetime) else str(transformed_at)
+    raw = json.dumps({"t": stamp, "id": doc_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    カーソルを解釈
+    
+    Raises:
+        APIError: 不正なカーソル (400)
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        doc_id = data["id"]
+        if not _DOC_ID_PATTERN.match(doc_id):
+            raise ValueError(doc_id)
+        return datetime.fromisoformat(data["t"]), doc_id
+    except Exception:
+        raise APIError(400, "invalid cursor")
+
+
+class ArticleService:
+    """記事・変換結果の参照 (read-through キャッシュ付き)"""
+    
+    def __init__(
+        self,
+        config=None,
+        firestore_client=None,
+        cache_size: Optional[int] = None,
+        ttl_sec: Optional[float] = None,
+        list_ttl_sec: Optional[float] = None,
+        search_reload_sec: Optional[float] = None
+    ):
+        """
+        Args:
+            config: Configインスタンス (Noneの場合は環境変数 MUNICIPALITY の自治体)
+            firestore_client: FirestoreClient (Noneの場合は自治体のコレクションで取得)
+            cache_size: 記事キャッシュの件数 (Noneの場合は API_CACHE_SIZE、既定1000)
+            ttl_sec: 記事キャッシュの有効期限 (Noneの場合は API_CACHE_TTL_SEC、既定60秒)
+            list_ttl_sec: 一覧キャッシュの有効期限 (Noneの場合は API_LIST_TTL_SEC、既定15秒)
+            search_reload_sec: 検索索引を読み直す間隔 (Noneの場合は API_SEARCH_RELOAD_SEC、既定60秒)
+        """
+        self.config = config or get_config()
+        self.firestore_client = firestore_client or get_firestore_client(self.config)
+        
+        cache_size = cache_size or int(os.getenv("API_CACHE_SIZE", "1000"))
+        ttl_sec = ttl_sec if ttl_sec is not None else float(os.getenv("API_CACHE_TTL_SEC", "60"))
+        list_ttl_sec = list_ttl_sec if list_ttl_sec is not None else float(os.getenv("API_LIST_TTL_SEC", "15"))
+        
+        self.articles = LRUCache(cache_size, ttl_sec)
+        self.pages = LRUCache(max(16, cache_size // 10), list_ttl_sec)
+        
+        search_reload_sec = search_reload_sec if search_reload_sec is not None else float(os.getenv("API_SEARCH_RELOAD_SEC", "60"))
+        self.search_index = LRUCache(1, search_reload_sec)
+    
+    # ========================================
+    # 記事
+    # ========================================
+    
+    def get_article(self, doc_id: str) -> CachedResponse:
+        """
+        記事と変換結果を取得
+        
+        Raises:
+            APIError: 不正なID (400)・記事なし (404)
+        """
+        if not _DOC_ID_PATTERN.match(doc_id or ""):
+            raise APIError(400, "invalid article id")
+        
+        response = self.articles.get_or_load(doc_id, lambda: self._load_article(doc_id))
+        if response is None:
+            raise APIError(404, "article not found")
+        return response
+    
+    def _load_article(self, doc_id: str) -> Optional[CachedResponse]:
+        """Firestore から記事を読み込んでレスポンスを作成"""
+        with span("firestore.get", source="api"):
+            snapshot = self.firestore_client.get_document(doc_id)
+        
+        if not snapshot.exists:
+            return None
+        
+        data = snapshot.to_dict() or {}
+        transformed_content = data.get("transformedContent") or {}
+        payload = {
+            **self._summary(doc_id, data),
+            "body_text": data.get("body_text", ""),
+            "transformedContent": transformed_content,
+            "media": collect_media_urls(transformed_content),
+        }
+        return CachedResponse(payload, make_etag(data.get("quick_hash"), data.get("transformedAt")))
+    
+    # ========================================
+    # 一覧
+    # ========================================
+    
+    def list_articles(self, cursor: Optional[str] = None, limit: Optional[int] = None) -> CachedResponse:
+        """
+        変換済みの記事を新しい順に取得
+        
+        Args:
+            cursor: 前ページの next_cursor (Noneの場合は先頭)
+            limit: 件数 (上限 MAX_PAGE_SIZE)
+        
+        Raises:
+            APIError: 不正なカーソル・件数 (400)
+        """
+        limit = DEFAULT_PAGE_SIZE if limit is None else limit
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise APIError(400, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        
+        start_after = decode_cursor(cursor) if cursor else None
+        return self.pages.get_or_load((cursor or "", limit), lambda: self._load_page(start_after, limit))
+    
+    def _load_page(self, start_after: Optional[Tuple[datetime, str]], limit: int) -> CachedResponse:
+        """Firestore から1ページ分を読み込んでレスポンスを作成"""
+        with span("firestore.list", source="api"):
+            # 次ページの有無を知るため1件多く読む
+            docs = self.firestore_client.query_transformed(limit + 1, start_after=start_after, fields=LIST_FIELDS)
+        
+        items = []
+        for doc in docs[:limit]:
+            data = doc.to_dict() or {}
+            items.append({
+                **self._summary(doc.id, data),
+                "media": collect_media_urls(data.get("transformedContent") or {}),
+            })
+        
+        next_cursor = None
+        if len(docs) > limit:
+            last = docs[limit - 1]
+            next_cursor = encode_cursor(last.to_dict().get("transformedAt"), last.id)
+        
+        return CachedResponse({"items": items, "next_cursor": next_cursor})
+    
+    # ========================================
+    # 検索
+    # ========================================
+    
+    def search_articles(
+        self,
+        query: str,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> CachedResponse:
+        """
+        全文検索 (スペース区切りの語をすべて含む記事、公開日の新しい順)
+        
+        Args:
+            query: 検索語 (ダブルクォートで囲むとスペースを含むフレーズ)
+            date_from: 公開日の下限 (YYYY-MM-DD)
+            date_to: 公開日の上限 (YYYY-MM-DD)
+            limit: 件数 (上限 MAX_PAGE_SIZE)
+        
+        Raises:
+            APIError: 検索語なし・不正な日付・件数 (400)
+        """
+        if not (query or "").strip():
+            raise APIError(400, "q is required")
+        for value in (date_from, date_to):
+            if value and not _DATE_PATTERN.match(value):
+                raise APIError(400, "dates must be YYYY-MM-DD")
+        
+        limit = DEFAULT_PAGE_SIZE if limit is None else limit
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise APIError(400, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        
+        # 索引は検索の stage が保存したものを一定間隔で読み直す
+        index = self.search_index.get_or_load("index", lambda: load_index(self.config.municipality))
+        with span("search.query", source="api"):
+            items, total = index.search(query, date_from, date_to, limit)
+        
+        return CachedResponse({"items": items, "total": total})
+    
+    @staticmethod
+    def _summary(doc_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """一覧・詳細で共通の項目"""
+        return {
+            "id": doc_id,
+            "title": data.get("title", ""),
+            "category": data.get("category", ""),
+            "original_url": data.get("original_url", ""),
+            "published_date": data.get("published_date_str", ""),
+            "transformed_at": data.get("transformedAt"),
+            "etag": make_etag(data.get("quick_hash"), data.get("transformedAt")),
+            "types": completed_types(data),
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        """キャッシュの状況"""
+        return {"articles": self.articles.stats(), "pages": self.pages.stats(), "search_index": self.search_index.stats()}
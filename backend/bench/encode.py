@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 動画エンコードのベンチマーク
+
+合成した静止画 + 音声 (ffmpeg の lavfi で生成) をエンコードプロファイルごとに
+シーンクリップへエンコードし、エンコード時間とファイルサイズを比較する。
+ショート動画と同じコマンド (VideoCompositor) を使う。ffmpeg が必要
+
+使い方:
+    python backend/bench/encode.py [自治体名]
+
+設定 (環境変数):
+    BENCH_ENCODE_PROFILES: 比較するプロファイル (カンマ区切り、既定: 組み込み + 自治体設定のすべて)
+    BENCH_ENCODE_SIZE: 解像度 (既定: 1080x1080)
+    BENCH_ENCODE_SECONDS: 1クリップの長さ秒 (既定: 8)
+    BENCH_ENCODE_REPEAT: 繰り返し回数 (中央値を表示、既定: 3)
+"""
+
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.transform.video.encoder import BUILTIN_PROFILES, resolve_profile
+
+
+def _parse_size(value: str) -> Tuple[int, int]:
+    """"1080x1080" → (1080, 1080)"""
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height or width)
+
+
+def _make_inputs(tmpdir: str, width: int, height: int, seconds: float) -> Tuple[str, str]:
+    """静止画 (テストパターン) とナレーション代わりの音声を生成"""
+    image_path = os.path.join(tmpdir, "still.png")
+    audio_path = os.path.join(tmpdir, "narration.m4a")
+    subprocess.run([
+        "ffmpeg", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate=1",
+        "-frames:v", "1",
+        image_path
+    ], check=True, capture_output=True)
+    subprocess.run([
+        "ffmpeg", "-y",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+        "-c:a", "aac", "-b:a", "192k",
+        audio_path
+    ], check=True, capture_output=True)
+    return image_path, audio_path
+
+
+def _load_custom_profiles(municipality: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """自治体設定の encoder_profiles (読み込めない場合は空)"""
+    if municipality:
+        os.environ["MUNICIPALITY"] = municipality
+    try:
+        from backend.common.config import get_config
+        return get_config().encoder_profiles
+    except Exception as e:
+        print(f"⚠️ 自治体設定を読み込めないため組み込みのプロファイルだけを比較します: {e}")
+        return {}
+
+
+def bench_profile(
+    name: str,
+    custom_profiles: Dict[str, Dict[str, Any]],
+    image_path: str,
+    audio_path: str,
+    size: Tuple[int, int],
+    repeat: int,
+    tmpdir: str
+) -> Dict[str, Any]:
+    """
+    1プロファイルのエンコード時間とファイルサイズを計測
+    
+    Returns:
+        {"profile", "encode_sec", "bytes", "kbps"}
+    """
+    from backend.transform.video.compositor import VideoCompositor
+    
+    profile = resolve_profile(name, custom_profiles)
+    compositor = VideoCompositor(size[0], size[1], profile.fps, profile=profile)
+    output_path = os.path.join(tmpdir, f"clip_{name}.mp4")
+    duration = compositor._get_audio_duration(audio_path)
+    
+    timings = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        compositor._run_ffmpeg(image_path, audio_path, output_path, duration)
+        timings.append(time.perf_counter() - start)
+    
+    size_bytes = os.path.getsize(output_path)
+    clip_sec = compositor._get_audio_duration(output_path) or duration
+    return {
+        "profile": name,
+        "encode_sec": statistics.median(timings),
+        "bytes": size_bytes,
+        "kbps": size_bytes * 8 / 1000 / clip_sec if clip_sec > 0 else 0.0,
+    }
+
+
+def print_report(results: List[Dict[str, Any]], seconds: float, size: Tuple[int, int]):
+    """ベンチマーク結果を表示"""
+    print(f"\n📊 エンコード結果 ({size[0]}x{size[1]}, {seconds:g}秒のクリップ)")
+    print("   プロファイル       エンコード(秒)   倍速     サイズ(KB)   ビットレート(kbps)")
+    for r in results:
+        speed = seconds / r["encode_sec"] if r["encode_sec"] > 0 else 0.0
+        print(f"   {r['profile']:<18} {r['encode_sec']:>12.3f} {speed:>7.1f}x {r['bytes'] // 1024:>12} {r['kbps']:>16.0f}")
+
+
+def run_bench(municipality: Optional[str] = None) -> List[Dict[str, Any]]:
+    """プロファイルごとにエンコードして結果を返す"""
+    if not shutil.which("ffmpeg"):
+        print("⚠️ ffmpeg が見つからないためエンコードのベンチマークを実行できません")
+        return []
+    
+    custom_profiles = _load_custom_profiles(municipality)
+    names = [v.strip() for v in os.getenv("BENCH_ENCODE_PROFILES", "").split(",") if v.strip()]
+    if not names:
+        names = list(BUILTIN_PROFILES) + [n for n in custom_profiles if n not in BUILTIN_PROFILES]
+    size = _parse_size(os.getenv("BENCH_ENCODE_SIZE", "1080x1080"))
+    seconds = float(os.getenv("BENCH_ENCODE_SECONDS", "8"))
+    repeat = int(os.getenv("BENCH_ENCODE_REPEAT", "3"))
+    
+    results = []
+    with tempfile.TemporaryDirectory(prefix="omo_encode_") as tmpdir:
+        image_path, audio_path = _make_inputs(tmpdir, size[0], size[1], seconds)
+        for name in names:
+            print(f"🎞️ エンコード: {name}")
+            try:
+                results.append(bench_profile(name, custom_profiles, image_path, audio_path, size, repeat, tmpdir))
+            except Exception as e:
+                print(f"⚠️ エンコード失敗 ({name}): {e}")
+    
+    print_report(results, seconds, size)
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    """メイン処理"""
+    args = list(argv if argv is not None else sys.argv[1:])
+    municipality = (args[0] if args else None) or os.getenv("MUNICIPALITY")
+    return run_bench(municipality)
+
+
+# ローカル実行
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - ベンチマーク用のインメモリ Firestore
+
+FirestoreClient のクエリ・保存ロジックはそのまま使い、
+接続 (db) だけをプロセス内の辞書に置き換える。
+トランザクションを使うリース操作はロックで同等の排他を行う
+"""
+
+import copy
+import random
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from google.cloud import firestore
+
+from backend.common.firestore import FirestoreClient, LEASE_OWNER_FIELD, LEASE_EXPIRES_FIELD
+
+
+# 比較演算子
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a not in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+    "array_contains_any": lambda a, b: isinstance(a, list) and any(v in a for v in b),
+}
+
+_MISSING = object()
+
+
+def _get_path(data: Dict[str, Any], path: str):
+    """ドット区切りのフィールドを取得 (存在しない場合は _MISSING)"""
+    value: Any = data
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return _MISSING
+        value = value[key]
+    return value
+
+
+def _set_path(data: Dict[str, Any], path: str, value):
+    """ドット区切りのフィールドを設定 (DELETE_FIELD は削除)"""
+    keys = path.split(".")
+    target = data
+    for key in keys[:-1]:
+        if not isinstance(target.get(key), dict):
+            target[key] = {}
+        target = target[key]
+    _put(target, keys[-1], value)
+
+
+def _put(target: Dict[str, Any], key: str, value):
+    """1フィールドを設定 (センチネル値を解釈)"""
+    if value is firestore.DELETE_FIELD:
+        target.pop(key, None)
+    elif value is firestore.SERVER_TIMESTAMP:
+        target[key] = time.time()
+    else:
+        target[key] = copy.deepcopy(value)
+
+
+def _merge(target: Dict[str, Any], data: Dict[str, Any]):
+    """set(merge=True) 相当のマージ (set のキーはパスではなくフィールド名)"""
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            _put(target, key, value)
+
+
+class InMemorySnapshot:
+    """DocumentSnapshot の代替"""
+    
+    def __init__(self, reference: "InMemoryDocument", data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+    
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+    
+    def get(self, field_path: str):
+        value = _get_path(self._data or {}, field_path)
+        return None if value is _MISSING else copy.deepcopy(value)
+
+
+class InMemoryDocument:
+    """DocumentReference の代替"""
+    
+    def __init__(self, collection: "InMemoryCollection", doc_id: str):
+        self._collection = collection
+        self.id = doc_id
+    
+    def get(self, field_paths: Optional[List[str]] = None, transaction=None) -> InMemorySnapshot:
+        return self._collection._get(self.id, field_paths)
+    
+    def set(self, data: Dict[str, Any], merge: bool = False):
+        self._collection._write(self.id, data, merge=merge)
+    
+    def update(self, data: Dict[str, Any]):
+        self._collection._write(self.id, data, update=True)
+    
+    def delete(self):
+        self._collection._delete(self.id)
+
+
+class InMemoryQuery:
+    """Query の代替 (where / select / limit / stream)"""
+    
+    def __init__(self, collection: "InMemoryCollection", filters=None, fields=None, limit_count=None):
+        self._collection = collection
+        self._filters = list(filters or [])
+        self._fields = fields
+        self._limit = limit_count
+    
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value=None, filter=None) -> "InMemoryQuery":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return InMemoryQuery(self._collection, self._filters + [(field_path, op_string, value)], self._fields, self._limit)
+    
+    def select(self, field_paths: List[str]) -> "InMemoryQuery":
+        return InMemoryQuery(self._collection, self._filters, list(field_paths), self._limit)
+    
+    def limit(self, count: int) -> "InMemoryQuery":
+        return InMemoryQuery(self._collection, self._filters, self._fields, count)
+    
+    def stream(self):
+        return iter(self._collection._query(self._filters, self._fields, self._limit))
+    
+    def get(self):
+        return list(self.stream())
+
+
+class InMemoryCollection(InMemoryQuery):
+    """CollectionReference の代替"""
+    
+    def __init__(self, db: "InMemoryDB", name: str):
+        super().__init__(self)
+        self._db = db
+        self.id = name
+        self._docs: Dict[str, Dict[str, Any]] = {}
+    
+    def document(self, doc_id: str) -> InMemoryDocument:
+        return InMemoryDocument(self, doc_id)
+    
+    # --- 内部操作 (db のロックと遅延を通す) ---
+    
+    def _get(self, doc_id: str, field_paths: Optional[List[str]] = None) -> InMemorySnapshot:
+        self._db.delay()
+        with self._db.lock:
+            data = self._docs.get(doc_id)
+            return InMemorySnapshot(self.document(doc_id), _project(data, field_paths))
+    
+    def _write(self, doc_id: str, data: Dict[str, Any], merge: bool = False, update: bool = False):
+        self._db.delay()
+        with self._db.lock:
+            self._apply(doc_id, data, merge, update)
+    
+    def _apply(self, doc_id: str, data: Dict[str, Any], merge: bool = False, update: bool = False):
+        current = self._docs.get(doc_id)
+        if update:
+            if current is None:
+                raise KeyError(f"No document to update: {doc_id}")
+            for path, value in data.items():
+                _set_path(current, path, value)
+        elif merge and current is not None:
+            _merge(current, data)
+        else:
+            fresh: Dict[str, Any] = {}
+            _merge(fresh, data)
+            self._docs[doc_id] = fresh
+    
+    def _delete(self, doc_id: str):
+        self._db.delay()
+        with self._db.lock:
+            self._docs.pop(doc_id, None)
+    
+    def _query(self, filters, fields, limit_count) -> List[InMemorySnapshot]:
+        self._db.delay()
+        results = []
+        with self._db.lock:
+            for doc_id, data in self._docs.items():
+                if all(_matches(data, f) for f in filters):
+                    results.append(InMemorySnapshot(self.document(doc_id), _project(data, fields)))
+                    if limit_count and len(results) >= limit_count:
+                        break
+        return results
+
+
+def _matches(data: Dict[str, Any], condition) -> bool:
+    field_path, op_string, value = condition
+    actual = _get_path(data, field_path)
+    if actual is _MISSING:
+        # Firestore は該当フィールドのない文書を条件に一致させない
+        return False
+    return _OPERATORS[op_string](actual, value)
+
+
+def _project(data: Optional[Dict[str, Any]], fields: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    """select(fields) 相当の射影"""
+    if data is None:
+        return None
+    if not fields:
+        return copy.deepcopy(data)
+    projected: Dict[str, Any] = {}
+    for path in fields:
+        value = _get_path(data, path)
+        if value is not _MISSING:
+            _set_path(projected, path, value)
+    return projected
+
+
+class InMemoryBatch:
+    """WriteBatch の代替"""
+    
+    def __init__(self, db: "InMemoryDB"):
+        self._db = db
+        self._ops = []
+    
+    def set(self, ref: InMemoryDocument, data: Dict[str, Any], merge: bool = False):
+        self._ops.append((ref, data, merge, False, False))
+    
+    def update(self, ref: InMemoryDocument, data: Dict[str, Any]):
+        self._ops.append((ref, data, False, True, False))
+    
+    def delete(self, ref: InMemoryDocument):
+        self._ops.append((ref, None, False, False, True))
+    
+    def commit(self):
+        self._db.delay()
+        with self._db.lock:
+            for ref, data, merge, update, delete in self._ops:
+                if delete:
+                    ref._collection._docs.pop(ref.id, None)
+                else:
+                    ref._collection._apply(ref.id, data, merge, update)
+        self._ops = []
+
+
+class InMemoryDB:
+    """firestore.Client の代替"""
+    
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: Optional[int] = None):
+        """
+        Args:
+            latency_ms: 1操作あたりの遅延(ミリ秒)
+            jitter_ms: 遅延のばらつき(ミリ秒、一様分布)
+            seed: 乱数シード
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.lock = threading.RLock()
+        self._collections: Dict[str, InMemoryCollection] = {}
+        self._rng = random.Random(seed)
+        self.operations = 0
+    
+    def delay(self):
+        """1操作分の遅延 (ロックの外で待つ)"""
+        with self.lock:
+            self.operations += 1
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        wait_ms = max(0.0, self.latency_ms + jitter)
+        if wait_ms:
+            time.sleep(wait_ms / 1000)
+    
+    def collection(self, name: str) -> InMemoryCollection:
+        with self.lock:
+            if name not in self._collections:
+                self._collections[name] = InMemoryCollection(self, name)
+            return self._collections[name]
+    
+    def batch(self) -> InMemoryBatch:
+        return InMemoryBatch(self)
+    
+    def get_all(self, refs, field_paths: Optional[List[str]] = None, transaction=None):
+        self.delay()
+        with self.lock:
+            return [
+                InMemorySnapshot(ref, _project(ref._collection._docs.get(ref.id), field_paths))
+                for ref in refs
+            ]
+
+
+class InMemoryFirestoreClient(FirestoreClient):
+    """インメモリの FirestoreClient (ベンチマーク用)"""
+    
+    def __init__(self, config, db: Optional[InMemoryDB] = None):
+        """
+        Args:
+            config: Configインスタンス
+            db: InMemoryDB (Noneの場合は遅延なしで作成、自治体間で共有する場合は指定)
+        """
+        self.config = config
+        self.db = db or InMemoryDB()
+        self.collection_name = config.firestore_collection_name
+    
+    def documents(self) -> Dict[str, Dict[str, Any]]:
+        """コレクションの全ドキュメント (集計用)"""
+        collection = self.get_collection()
+        with self.db.lock:
+            return copy.deepcopy(collection._docs)
+    
+    # --- リース (トランザクションの代わりにロックで排他) ---
+    
+    def claim_lease(self, doc_id: str, owner: str, ttl_sec: float):
+        collection = self.get_collection()
+        self.db.delay()
+        with self.db.lock:
+            data = collection._docs.get(doc_id)
+            if data is None or data.get("scriptStatus") is True:
+                return None
+            
+            now = time.time()
+            holder = data.get(LEASE_OWNER_FIELD)
+            if holder and holder != owner and (data.get(LEASE_EXPIRES_FIELD) or 0) > now:
+                return None
+            
+            snap = InMemorySnapshot(collection.document(doc_id), copy.deepcopy(data))
+            data[LEASE_OWNER_FIELD] = owner
+            data[LEASE_EXPIRES_FIELD] = now + ttl_sec
+            return snap
+    
+    def renew_lease(self, doc_id: str, owner: str, ttl_sec: float) -> bool:
+        collection = self.get_collection()
+        self.db.delay()
+        with self.db.lock:
+            data = collection._docs.get(doc_id)
+            if data is None or data.get(LEASE_OWNER_FIELD) != owner:
+                return False
+            data[LEASE_EXPIRES_FIELD] = time.time() + ttl_sec
+            return True
+    
+    def release_lease(self, doc_id: str, owner: str) -> bool:
+        collection = self.get_collection()
+        self.db.delay()
+        with self.db.lock:
+            data = collection._docs.get(doc_id)
+            if data is None or data.get(LEASE_OWNER_FIELD) != owner:
+                return False
+            data.pop(LEASE_OWNER_FIELD, None)
+            data.pop(LEASE_EXPIRES_FIELD, None)
+            return True
+    
+    def update_unless_leased(self, doc_id: str, data: Dict[str, Any]) -> bool:
+        collection = self.get_collection()
+        self.db.delay()
+        with self.db.lock:
+            current = collection._docs.get(doc_id)
+            if current is None or current.get("scriptStatus") is True:
+                return False
+            if current.get(LEASE_OWNER_FIELD) and (current.get(LEASE_EXPIRES_FIELD) or 0) > time.time():
+                return False
+            collection._apply(doc_id, data, update=True)
+            return True
+    
+    def _release_if_expired(self, doc_id: str) -> bool:
+        collection = self.get_collection()
+        with self.db.lock:
+            data = collection._docs.get(doc_id)
+            if data is None or (data.get(LEASE_EXPIRES_FIELD) or 0) >= time.time():
+                return False
+            data.pop(LEASE_OWNER_FIELD, None)
+            data.pop(LEASE_EXPIRES_FIELD, None)
+            return True
+    
+    def watch_pending_transform(self, on_doc):
+        raise NotImplementedError("インメモリ Firestore は変更の購読に対応していません")
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - ベンチマーク用の Gemini 代替
+
+google.generativeai (GenerativeModel) と google.genai (Client) を差し替え、
+APIキーなし・課金なしで変換パイプラインを動かす。
+応答はプロンプトの内容から種類 (ダイジェスト・台本・テロップ・シーン数など) を判定して返し、
+遅延とエラーは呼び出しの種類ごとに分布を設定できる
+"""
+
+import io
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from PIL import Image
+
+from backend.common.llm import reset_genai_clients
+from backend.transform.core.reference_images import reset_reference_cache
+
+
+# 呼び出しの種類
+KIND_TEXT = "text"
+KIND_IMAGE = "image"
+KIND_TTS = "tts"
+KIND_UPLOAD = "upload"
+
+# 既定の遅延 (中央値秒, p95秒) - 実APIのおおよその値
+DEFAULT_LATENCY = {
+    KIND_TEXT: (2.0, 6.0),
+    KIND_IMAGE: (12.0, 25.0),
+    KIND_TTS: (4.0, 9.0),
+    KIND_UPLOAD: (0.5, 1.5),
+}
+
+# Gemini TTS の出力形式 (16bit モノラル PCM, 24kHz)
+PCM_SAMPLE_RATE = 24000
+
+# 読み上げ速度 (1秒あたりの文字数)
+CHARS_PER_SEC = 6.0
+
+
+class FakeAPIError(Exception):
+    """注入したAPIエラー"""
+    pass
+
+
+class LatencyModel:
+    """対数正規分布の遅延 (中央値と p95 で指定)"""
+    
+    def __init__(self, median_sec: float, p95_sec: float, time_scale: float = 1.0):
+        """
+        Args:
+            median_sec: 遅延の中央値(秒)
+            p95_sec: 遅延の p95 (秒)
+            time_scale: 実際に待つ時間の倍率 (0.1 なら10倍速で実行)
+        """
+        self.median_sec = max(0.0, median_sec)
+        self.sigma = math.log(p95_sec / median_sec) / 1.645 if median_sec > 0 and p95_sec > median_sec else 0.0
+        self.time_scale = time_scale
+    
+    def sample(self, rng: random.Random) -> float:
+        """遅延を1回分サンプリング(秒)"""
+        if self.median_sec <= 0:
+            return 0.0
+        return self.median_sec * math.exp(self.sigma * rng.gauss(0.0, 1.0))
+    
+    def wait(self, rng: random.Random):
+        """サンプリングした遅延 × time_scale だけ待つ"""
+        delay = self.sample(rng) * self.time_scale
+        if delay > 0:
+            time.sleep(delay)
+
+
+# ========================================
+# レスポンス (両SDKで参照される属性だけを持つ)
+# ========================================
+
+class _Blob:
+    def __init__(self, data: bytes, mime_type: str):
+        self.data = data
+        self.mime_type = mime_type
+
+
+class _Part:
+    def __init__(self, text: Optional[str] = None, data: Optional[bytes] = None, mime_type: str = ""):
+        self.text = text
+        self.inline_data = _Blob(data, mime_type) if data is not None else None
+
+
+class _Content:
+    def __init__(self, parts: List[_Part]):
+        self.parts = parts
+        self.role = "model"
+
+
+class _Candidate:
+    def __init__(self, parts: List[_Part]):
+        self.content = _Content(parts)
+        self.finish_reason = 1  # STOP
+        self.safety_ratings = []
+
+
+class _UsageMetadata:
+    def __init__(self, prompt_tokens: int, candidate_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = candidate_tokens
+        self.thoughts_token_count = 0
+        self.total_token_count = prompt_tokens + candidate_tokens
+
+
+class FakeResponse:
+    """GenerateContentResponse の代替"""
+    
+    def __init__(self, parts: List[_Part], prompt_tokens: int, candidate_tokens: int):
+        self.candidates = [_Candidate(parts)]
+        self.usage_metadata = _UsageMetadata(prompt_tokens, candidate_tokens)
+        self.prompt_feedback = None
+    
+    @property
+    def parts(self) -> List[_Part]:
+        return self.candidates[0].content.parts
+    
+    @property
+    def text(self) -> Optional[str]:
+        texts = [p.text for p in self.parts if p.text]
+        return "".join(texts) if texts else None
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の概算 (日本語はおおよそ1文字1トークン弱)"""
+    return max(1, int(len(text or "") * 0.8))
+
+
+# ========================================
+# 応答の生成
+# ========================================
+
+def _first_line(text: str, limit: int = 40) -> str:
+    for line in (text or "").splitlines():
+        line = line.strip().lstrip("#").strip()
+        if line and not line.startswith(("あなたは", "以下")):
+            return line[:limit]
+    return "お知らせ"
+
+
+def _extract_title(prompt: str) -> str:
+    m = re.search(r"記事タイトル[:：]?\s*\n?\s*(.+)", prompt)
+    return m.group(1).strip()[:40] if m else _first_line(prompt)
+
+
+def _respond_digest(prompt: str) -> str:
+    title = _extract_title(prompt)
+    return json.dumps({
+        "summary": f"{title}についてのお知らせです。",
+        "dates": ["令和7年4月1日(火) 10:00〜12:00"],
+        "places": ["市役所 本庁舎"],
+        "targets": ["市内在住の方"],
+        "deadlines": ["3月25日(火)"],
+        "key_points": [
+            {"heading": "概要", "content": f"{title}の実施"},
+            {"heading": "日時", "content": "4月1日(火) 10:00〜12:00"},
+            {"heading": "申込方法", "content": "電話または窓口で申込"},
+        ],
+    }, ensure_ascii=False)
+
+
+def _respond_scene_count(prompt: str) -> str:
+    return "4"
+
+
+def _respond_script(prompt: str) -> str:
+    m = re.search(r"(\d+)\s*シーン", prompt)
+    scene_count = int(m.group(1)) if m else 4
+    title = _extract_title(prompt)
+    beats = []
+    for i in range(1, scene_count + 1):
+        text = f"{title}のお知らせ、その{i}です。4月1日の10時から市役所で開催します。"
+        prompt_text = f"A warm picture book illustration, scene {i}, mascot in a park."
+        beats.append({
+            "scene": i,
+            "text": text,
+            "narration": text,
+            "imagePrompt": prompt_text,
+            "visual_prompt": prompt_text,
+        })
+    return json.dumps({"title": f"【お知らせ】{title}", "lang": "ja", "beats": beats}, ensure_ascii=False)
+
+
+def _respond_telop(prompt: str) -> str:
+    # 台本JSON (script_json) のシーン数 = imagePrompt の数
+    scene_count = max(1, prompt.count('"imagePrompt"'))
+    return json.dumps([
+        {"scene": i, "id": i, "should_telop": True, "telop_text": f"4/1(火) 10:00〜 市役所 ({i})"}
+        for i in range(1, scene_count + 1)
+    ], ensure_ascii=False)
+
+
+def _respond_text(prompt: str) -> str:
+    title = _extract_title(prompt)
+    return f"{title}のお知らせです。4月1日(火)10時から市役所で行います。申込は3月25日まで電話または窓口で受け付けます。"
+
+
+# (プロンプトに含まれる語, 応答関数) - 上から順に判定
+TEXT_RESPONDERS: List[Tuple[str, Any]] = [
+    ("telop_text", _respond_telop),
+    ("key_points", _respond_digest),
+    ("beats", _respond_script),
+    ("半角整数", _respond_scene_count),
+]
+
+
+def make_text_response(prompt: str) -> str:
+    """プロンプトの種類に応じたテキスト応答"""
+    for keyword, responder in TEXT_RESPONDERS:
+        if keyword in prompt:
+            return responder(prompt)
+    return _respond_text(prompt)
+
+
+def make_png(aspect_ratio: str = "1:1", base: int = 512) -> bytes:
+    """アスペクト比に合わせた単色PNG"""
+    try:
+        w, h = (int(v) for v in aspect_ratio.split(":"))
+    except ValueError:
+        w, h = 1, 1
+    scale = base / max(w, h)
+    img = Image.new("RGB", (max(1, int(w * scale)), max(1, int(h * scale))), (240, 220, 180))
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def make_pcm(text: str) -> bytes:
+    """読み上げ時間相当の無音PCM"""
+    seconds = max(1.0, len(text or "") / CHARS_PER_SEC)
+    return b"\x00\x00" * int(PCM_SAMPLE_RATE * seconds)
+
+
+def _prompt_text(contents) -> str:
+    """contents (文字列 / リスト) からテキスト部分を取り出す"""
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(c for c in contents if isinstance(c, str))
+    return str(contents or "")
+
+
+# ========================================
+# SDK の代替
+# ========================================
+
+class FakeGemini:
+    """呼び出しごとの遅延・エラー注入と統計"""
+    
+    def __init__(
+        self,
+        latency: Optional[Dict[str, Tuple[float, float]]] = None,
+        error_rate: float = 0.0,
+        time_scale: float = 1.0,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            latency: {種類: (中央値秒, p95秒)} (未指定の種類は DEFAULT_LATENCY)
+            error_rate: APIエラーを返す確率 (0〜1)
+            time_scale: 実際に待つ時間の倍率
+            seed: 乱数シード (再現用)
+        """
+        latency = {**DEFAULT_LATENCY, **(latency or {})}
+        self.latency = {kind: LatencyModel(m, p, time_scale) for kind, (m, p) in latency.items()}
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+    
+    def _begin(self, kind: str, model: str):
+        """遅延を入れ、設定した確率でエラーにする"""
+        with self._lock:
+            rng = random.Random(self._rng.random())
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+            fail = rng.random() < self.error_rate
+            if fail:
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+        
+        self.latency[kind].wait(rng)
+        if fail:
+            raise FakeAPIError(f"injected error ({kind}, model={model})")
+    
+    def generate_text(self, model: str, contents) -> FakeResponse:
+        self._begin(KIND_TEXT, model)
+        prompt = _prompt_text(contents)
+        text = make_text_response(prompt)
+        return FakeResponse([_Part(text=text)], estimate_tokens(prompt), estimate_tokens(text))
+    
+    def generate_image(self, model: str, contents, aspect_ratio: str) -> FakeResponse:
+        self._begin(KIND_IMAGE, model)
+        prompt = _prompt_text(contents)
+        return FakeResponse([_Part(data=make_png(aspect_ratio), mime_type="image/png")], estimate_tokens(prompt), 1290)
+    
+    def generate_speech(self, model: str, contents) -> FakeResponse:
+        self._begin(KIND_TTS, model)
+        prompt = _prompt_text(contents)
+        return FakeResponse([_Part(data=make_pcm(prompt), mime_type="audio/L16;rate=24000")], estimate_tokens(prompt), 0)
+    
+    def upload_file(self, mime_type: str) -> "_File":
+        self._begin(KIND_UPLOAD, "files")
+        with self._lock:
+            number = self.calls[KIND_UPLOAD]
+        return _File(f"https://fake.googleapis.com/v1beta/files/ref-{number}", mime_type)
+    
+    # --- google.generativeai ---
+    
+    def generative_model(self, model_name: str, *args, **kwargs) -> "FakeGenerativeModel":
+        return FakeGenerativeModel(self, model_name)
+    
+    # --- google.genai ---
+    
+    def client(self, *args, **kwargs) -> "FakeClient":
+        return FakeClient(self)
+
+
+class FakeGenerativeModel:
+    """google.generativeai.GenerativeModel の代替"""
+    
+    def __init__(self, fake: FakeGemini, model_name: str):
+        self._fake = fake
+        self.model_name = model_name
+    
+    def generate_content(self, contents, generation_config=None, safety_settings=None, **kwargs) -> FakeResponse:
+        return self._fake.generate_text(self.model_name, contents)
+
+
+class _FakeModels:
+    def __init__(self, fake: FakeGemini):
+        self._fake = fake
+    
+    def generate_content(self, model: str, contents=None, config=None, **kwargs) -> FakeResponse:
+        modalities = [str(m).upper() for m in (getattr(config, "response_modalities", None) or [])]
+        if any("IMAGE" in m for m in modalities):
+            aspect_ratio = getattr(getattr(config, "image_config", None), "aspect_ratio", None) or "1:1"
+            return self._fake.generate_image(model, contents, aspect_ratio)
+        if any("AUDIO" in m for m in modalities):
+            return self._fake.generate_speech(model, contents)
+        return self._fake.generate_text(model, contents)
+
+
+class _File:
+    def __init__(self, uri: str, mime_type: str):
+        self.uri = uri
+        self.mime_type = mime_type
+
+
+class _FakeFiles:
+    def __init__(self, fake: FakeGemini):
+        self._fake = fake
+    
+    def upload(self, file=None, config=None, **kwargs) -> _File:
+        return self._fake.upload_file(getattr(config, "mime_type", None) or "image/png")
+
+
+class FakeClient:
+    """google.genai.Client の代替"""
+    
+    def __init__(self, fake: FakeGemini):
+        self.models = _FakeModels(fake)
+        self.files = _FakeFiles(fake)
+
+
+def install_fake_gemini(fake: FakeGemini):
+    """
+    両SDKの生成クラスを差し替える (変換器の初期化より前に呼ぶ)
+    
+    Args:
+        fake: FakeGemini
+    
+    Returns:
+        元に戻す関数
+    """
+    import google.generativeai as legacy_genai
+    from google import genai
+    
+    originals = [
+        (legacy_genai, "GenerativeModel", legacy_genai.GenerativeModel),
+        (legacy_genai, "configure", legacy_genai.configure),
+        (genai, "Client", genai.Client),
+    ]
+    
+    legacy_genai.GenerativeModel = fake.generative_model
+    legacy_genai.configure = lambda *args, **kwargs: None
+    genai.Client = fake.client
+    reset_genai_clients()  # 共有クライアントを差し替え後に作り直させる
+    reset_reference_cache()  # 実APIにアップロードした参照画像の URI を使わない
+    
+    def _restore():
+        for module, name, value in originals:
+            setattr(module, name, value)
+        reset_genai_clients()
+        reset_reference_cache()
+    
+    return _restore
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - ベンチマーク用フィクスチャの記録
+
+自治体HPの一覧ページと記事ページを取得し、fixtures/<自治体名>/ に保存する。
+一覧→詳細型 (generic スクレイパー) の情報源のみ対応
+
+使い方:
+    python backend/bench/record.py [自治体名] [記事数]
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.bench.replay_http import FIXTURES_DIR, INDEX_FILE
+from backend.common.config import get_config
+from backend.scrape.core.http import get_http_client
+from backend.scrape.sources.municipal.generic import DEFAULT_SELECTORS, compile_selector
+
+
+def record_fixtures(municipality: str, max_articles: int = 5) -> Path:
+    """
+    一覧ページと記事ページを記録
+    
+    Args:
+        municipality: 自治体名
+        max_articles: 記録する記事数
+    
+    Returns:
+        フィクスチャのディレクトリ
+    """
+    config = get_config(municipality)
+    source = next(
+        (s for s in (config._config.get("sources") or {}).values()
+         if isinstance(s, dict) and s.get("enabled") and s.get("list_url")),
+        None
+    )
+    if not source:
+        raise ValueError(f"一覧ページのある情報源がありません: {municipality}")
+    
+    http = get_http_client()
+    list_url = source["list_url"]
+    base_url = source.get("base_url", list_url)
+    selectors = {**DEFAULT_SELECTORS, **(source.get("selectors") or {})}
+    
+    directory = FIXTURES_DIR / municipality
+    directory.mkdir(parents=True, exist_ok=True)
+    
+    pages: Dict[str, str] = {}
+    
+    # 一覧ページ
+    response = http.get(list_url, timeout=20)
+    (directory / "newslist.html").write_bytes(response.content)
+    pages[list_url] = "newslist.html"
+    
+    soup = http.get_soup(list_url, timeout=20, parser=source.get("parser", "html.parser"))
+    urls: List[str] = []
+    for item in compile_selector(selectors["list_item_container"]).select(soup):
+        link = compile_selector(selectors["link"]).select_one(item)
+        if link and link.get("href"):
+            urls.append(urljoin(base_url, link["href"]))
+    
+    # 記事ページ
+    for i, url in enumerate(urls[:max_articles], start=1):
+        filename = f"article_{i:03d}.html"
+        try:
+            (directory / filename).write_bytes(http.get(url, timeout=20).content)
+            pages[url] = filename
+            print(f"💾 {filename}: {url}")
+        except Exception as e:
+            print(f"⚠️ 記事取得失敗: {url} | {e}")
+    
+    with open(directory / INDEX_FILE, "w", encoding="utf-8") as f:
+        json.dump({"list_url": list_url, "pages": pages}, f, ensure_ascii=False, indent=2)
+    
+    print(f"✅ フィクスチャ記録完了: {directory} ({len(pages) - 1} 記事)")
+    return directory
+
+
+def main(argv: Optional[List[str]] = None):
+    """メイン処理"""
+    args = list(argv if argv is not None else sys.argv[1:])
+    municipality = args[0] if args else "moriya"
+    max_articles = int(args[1]) if len(args) > 1 else 5
+    return record_fixtures(municipality, max_articles)
+
+
+# ローカル実行
+if __name__ == "__main__":
+    main()
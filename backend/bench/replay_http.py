@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - ベンチマーク用のHTTPリプレイ
+
+記録したHTMLフィクスチャ (fixtures/<自治体>/) をURLに対応付けて返す。
+記事数を増やしたい場合は、一覧ページを指定件数に複製した合成一覧を返す
+"""
+
+import json
+import random
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+
+from backend.scrape.core.http import HTTPClient
+
+
+# フィクスチャの置き場所
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# URL → ファイル名 の対応表
+INDEX_FILE = "index.json"
+
+
+class FixtureSet:
+    """1自治体分のフィクスチャ (index.json + HTMLファイル)"""
+    
+    def __init__(self, directory: Path):
+        """
+        Args:
+            directory: フィクスチャのディレクトリ
+        """
+        self.directory = Path(directory)
+        with open(self.directory / INDEX_FILE, encoding="utf-8") as f:
+            index = json.load(f)
+        
+        self.list_url: str = index["list_url"]
+        self.pages: Dict[str, str] = index["pages"]  # {URL: ファイル名}
+    
+    def read(self, url: str) -> Optional[bytes]:
+        """URLに対応するHTML (なければNone)"""
+        filename = self.pages.get(url)
+        if not filename:
+            return None
+        return (self.directory / filename).read_bytes()
+    
+    def article_urls(self) -> List[str]:
+        """記事ページのURL (一覧以外)"""
+        return [url for url in self.pages if url != self.list_url]
+
+
+def _make_response(url: str, body: bytes, status: int = 200) -> requests.Response:
+    """requests.Response を組み立てる"""
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response._content = body
+    response.encoding = "utf-8"
+    response.headers["Content-Type"] = "text/html; charset=utf-8"
+    return response
+
+
+class ReplayHTTPClient(HTTPClient):
+    """フィクスチャを返す HTTPClient"""
+    
+    def __init__(self, fixtures: FixtureSet, articles: Optional[int] = None, latency_ms: float = 0.0, seed: Optional[int] = None):
+        """
+        Args:
+            fixtures: FixtureSet
+            articles: 一覧に並べる記事数 (Noneの場合は記録どおり、多い場合は記事を複製)
+            latency_ms: 1リクエストあたりの遅延(ミリ秒)
+            seed: 乱数シード
+        """
+        super().__init__()
+        self.fixtures = fixtures
+        self.latency_ms = latency_ms
+        self._rng = random.Random(seed)
+        self.requests = 0
+        
+        # 合成記事URL → 元の記事URL
+        self._aliases: Dict[str, str] = {}
+        self._list_body = fixtures.read(fixtures.list_url) or b""
+        if articles:
+            self._list_body = self._synthesize_list(articles)
+    
+    def _synthesize_list(self, count: int) -> bytes:
+        """
+        一覧ページの項目を count 件に増やす
+        
+        記録された一覧の1項目目をひな形に、記事URLだけを変えて並べる
+        (同じ記事でもURLとタイトルが違うので別記事として保存される)
+        """
+        html = self._list_body.decode("utf-8")
+        sources = self.fixtures.article_urls()
+        if not sources:
+            return self._list_body
+        
+        # 一覧の項目 (<li ...>...</li>) を1つ取り出してひな形にする
+        items = re.findall(r"<li\b[^>]*>.*?</li>", html, flags=re.S)
+        if not items:
+            return self._list_body
+        template = items[0]
+        
+        def _href(item: str) -> str:
+            m = re.search(r'href="([^"]+)"', item)
+            return m.group(1) if m else ""
+        
+        generated = []
+        for i in range(count):
+            source = sources[i % len(sources)]
+            url = f"{source}?bench={i}"
+            self._aliases[url] = source
+            item = template.replace(_href(template), url)
+            item = re.sub(r"(<a\b[^>]*>)(.*?)(</a>)", lambda m: f"{m.group(1)}{m.group(2)} #{i}{m.group(3)}", item, count=1, flags=re.S)
+            generated.append(item)
+        
+        start = html.find(items[0])
+        end = html.find(items[-1]) + len(items[-1])
+        return (html[:start] + "\n".join(generated) + html[end:]).encode("utf-8")
+    
+    def get(self, url: str, timeout: int = 20, **kwargs) -> requests.Response:
+        self.requests += 1
+        if self.latency_ms:
+            time.sleep(max(0.0, self._rng.gauss(self.latency_ms, self.latency_ms * 0.2)) / 1000)
+        
+        if url == self.fixtures.list_url:
+            return _make_response(url, self._list_body)
+        
+        source = self._aliases.get(url, url)
+        body = self.fixtures.read(source)
+        if body is None:
+            response = _make_response(url, b"", status=404)
+            response.reason = "Not Found (fixture)"
+            response.raise_for_status()
+        
+        # 合成記事はタイトルに番号を付けて別記事にする (quick_hash も変わる)
+        if source != url:
+            suffix = url.rsplit("bench=", 1)[-1]
+            body = re.sub(rb"(</h1>)", f" #{suffix}".encode("utf-8") + rb"\1", body, count=1)
+        
+        return _make_response(url, body)
+
+
+def install_replay_http(client: ReplayHTTPClient):
+    """
+    スクレイパーが使う共有 HTTPClient を差し替える
+    
+    Returns:
+        元に戻す関数
+    """
+    from backend.scrape.core import http
+    
+    with http._http_lock:
+        original = http._http_client
+        http._http_client = client
+    
+    def _restore():
+        with http._http_lock:
+            http._http_client = original
+    
+    return _restore
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - オフラインベンチマーク
+
+記録したHTML・インメモリ Firestore・Gemini 代替でスクレイプ→変換を実行し、
+スループット(記事/分)と段階ごとの p50/p95 を出力する。
+APIキー・GCP・ネットワークは不要 (動画生成は ffmpeg がある場合のみ)
+
+使い方:
+    python backend/bench/run.py [自治体名]
+
+設定 (環境変数):
+    BENCH_ARTICLES: 記事数 (一覧を複製して増やす、既定: 20)
+    BENCH_TEXT_LATENCY / BENCH_IMAGE_LATENCY / BENCH_TTS_LATENCY: "中央値秒:p95秒"
+    BENCH_ERROR_RATE: Gemini 呼び出しのエラー率 (既定: 0)
+    BENCH_TIME_SCALE: Gemini の遅延を実際に待つ倍率 (既定: 0.05 = 20倍速)
+    BENCH_FIRESTORE_MS: Firestore 1操作の遅延ミリ秒 (既定: 20)
+    BENCH_HTTP_MS: HTTP 1リクエストの遅延ミリ秒 (既定: 50)
+    BENCH_SEED: 乱数シード (既定: 42)
+    BENCH_STAGES: 実行段階 (カンマ区切り、既定: scrape,transform)
+    BENCH_KEEP_OUTPUT: 1 の場合は生成物を storage/bench に残す (既定は一時ディレクトリ)
+    BENCH_DEDUP: 1 の場合は重複検出を有効のまま実行 (複製した記事は再利用になる)
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.bench.fake_firestore import InMemoryDB, InMemoryFirestoreClient
+from backend.bench.fake_genai import FakeGemini, KIND_TEXT, KIND_IMAGE, KIND_TTS, KIND_UPLOAD, install_fake_gemini
+from backend.bench.replay_http import FIXTURES_DIR, FixtureSet, ReplayHTTPClient, install_replay_http
+
+
+# 変換を繰り返す上限 (失敗が続く記事で終わらなくならないように)
+MAX_TRANSFORM_ROUNDS = 50
+
+# レポートに表示する段階
+REPORT_STAGES = (
+    "scrape.fetch",
+    "firestore.save",
+    "firestore.preselect",
+    "firestore.claim",
+    "transform.article",
+    "transform.run",
+    "llm.generate",
+    "image.generate",
+    "tts.generate",
+    "ffmpeg.run",
+    "storage.save",
+)
+
+
+def _parse_latency(name: str) -> Optional[Tuple[float, float]]:
+    """環境変数の "中央値:p95" を解釈 (未指定はNone)"""
+    value = os.getenv(name)
+    if not value:
+        return None
+    median, _, p95 = value.partition(":")
+    median_sec = float(median)
+    return median_sec, float(p95) if p95 else median_sec
+
+
+def _parse_names(value: Optional[str]) -> List[str]:
+    """カンマ区切りの値を分割"""
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+def _prepare_environment(municipality: str):
+    """外部サービスに接続しないよう環境変数を整える (設定の読み込みより前に呼ぶ)"""
+    os.environ["MUNICIPALITY"] = municipality
+    os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+    os.environ.pop("GCS_BUCKET_NAME", None)  # 生成物はローカル保存
+    os.environ.pop("BATCH_LIMIT", None)  # バッチ件数は記事数に合わせる (環境変数が優先のため)
+    os.environ.pop("FIRESTORE_EMULATOR_HOST", None)
+
+
+def _tune_config(config, articles: int):
+    """
+    ベンチマーク用に設定を調整
+    
+    - 一覧の取得件数と変換のバッチ件数を記事数に合わせる
+    - PDF取り込みは記録していないので無効化
+    - ffmpeg がない環境では動画生成を無効化
+    - 複製した記事は本文が同じなので重複検出を無効化 (BENCH_DEDUP=1 で有効のまま)
+    """
+    for source in (config._config.get("sources") or {}).values():
+        if not isinstance(source, dict):
+            continue
+        source["max_items"] = articles
+        if isinstance(source.get("pdf"), dict):
+            source["pdf"]["enabled"] = False
+    
+    config._config.setdefault("runner", {})["batch_limit"] = articles
+    
+    if os.getenv("BENCH_DEDUP") != "1":
+        config._config.setdefault("dedup", {})["enabled"] = False
+    
+    video = (config._config.get("transform") or {}).get("video_short")
+    if video and video.get("enabled") and not shutil.which("ffmpeg"):
+        print("⚠️ ffmpeg が見つからないため動画生成を無効化します")
+        video["enabled"] = False
+
+
+def _stage_rows(summary: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """段階ごとの集計 (ラベル違いはまとめずに表示順で並べる)"""
+    order = {stage: i for i, stage in enumerate(REPORT_STAGES)}
+    rows = [s for s in summary["stages"] if s["stage"] in order]
+    return sorted(rows, key=lambda s: (order[s["stage"]], sorted(s["labels"].items())))
+
+
+def print_report(
+    elapsed: float,
+    completed: int,
+    summary: Dict[str, Any],
+    fake: FakeGemini,
+    db: InMemoryDB,
+    http: ReplayHTTPClient
+):
+    """ベンチマーク結果を表示"""
+    print("\n📊 ベンチマーク結果")
+    print(f"   経過時間: {elapsed:.1f} 秒")
+    print(f"   変換完了: {completed} 件 ({completed / elapsed * 60:.1f} 記事/分)" if elapsed > 0 else f"   変換完了: {completed} 件")
+    
+    print("\n   段階                     件数   失敗    p50(秒)  p95(秒)  ラベル")
+    for s in _stage_rows(summary):
+        labels = ", ".join(f"{k}={v}" for k, v in sorted(s["labels"].items()))
+        print(f"   {s['stage']:<22} {s['count']:>6} {s['errors']:>6} {s['p50_sec']:>10.3f} {s['p95_sec']:>8.3f}  {labels}")
+    
+    print("\n   Gemini 呼び出し (種類: 回数 / 注入エラー)")
+    for kind in (KIND_TEXT, KIND_IMAGE, KIND_TTS, KIND_UPLOAD):
+        print(f"   {kind:<6}: {fake.calls.get(kind, 0)} / {fake.errors.get(kind, 0)}")
+    
+    print(f"\n   Firestore 操作: {db.operations} 回")
+    print(f"   HTTP リクエスト: {http.requests} 回")
+
+
+def run_bench(municipality: str) -> Dict[str, Any]:
+    """
+    1自治体分のベンチマークを実行
+    
+    Args:
+        municipality: 自治体名 (fixtures/<自治体名> の記録を使用)
+    
+    Returns:
+        {"elapsed_sec", "completed", "articles_per_min", "report"}
+    """
+    fixtures_dir = FIXTURES_DIR / municipality
+    if not (fixtures_dir / "index.json").exists():
+        raise FileNotFoundError(f"フィクスチャがありません: {fixtures_dir} (backend/bench/record.py で記録)")
+    
+    articles = int(os.getenv("BENCH_ARTICLES", "20"))
+    seed = int(os.getenv("BENCH_SEED", "42"))
+    stages = _parse_names(os.getenv("BENCH_STAGES")) or ["scrape", "transform"]
+    
+    _prepare_environment(municipality)
+    
+    # 環境変数を整えてから読み込む (設定・ストレージは読み込み時に環境を参照する)
+    from backend.common import storage
+    from backend.common.config import reload_config
+    from backend.common.metrics import get_metrics
+    from backend.scrape.main import run_scrape
+    from backend.transform.main import run_transform
+    
+    config = reload_config(municipality)
+    _tune_config(config, articles)
+    
+    latency = {
+        kind: value for kind, value in (
+            (KIND_TEXT, _parse_latency("BENCH_TEXT_LATENCY")),
+            (KIND_IMAGE, _parse_latency("BENCH_IMAGE_LATENCY")),
+            (KIND_TTS, _parse_latency("BENCH_TTS_LATENCY")),
+        ) if value
+    }
+    fake = FakeGemini(
+        latency=latency,
+        error_rate=float(os.getenv("BENCH_ERROR_RATE", "0")),
+        time_scale=float(os.getenv("BENCH_TIME_SCALE", "0.05")),
+        seed=seed
+    )
+    db = InMemoryDB(latency_ms=float(os.getenv("BENCH_FIRESTORE_MS", "20")), jitter_ms=5.0, seed=seed)
+    firestore_client = InMemoryFirestoreClient(config, db)
+    http = ReplayHTTPClient(
+        FixtureSet(fixtures_dir),
+        articles=articles,
+        latency_ms=float(os.getenv("BENCH_HTTP_MS", "50")),
+        seed=seed
+    )
+    
+    # 生成物の保存先
+    if os.getenv("BENCH_KEEP_OUTPUT") == "1":
+        output_dir = storage.LOCAL_STORAGE_DIR / "bench" / municipality
+        workspace = None
+    else:
+        workspace = tempfile.TemporaryDirectory(prefix="omo-bench-")
+        output_dir = Path(workspace.name)
+    original_storage_dir = storage.LOCAL_STORAGE_DIR
+    storage.LOCAL_STORAGE_DIR = output_dir
+    
+    restore_gemini = install_fake_gemini(fake)
+    restore_http = install_replay_http(http)
+    
+    print(f"🏁 ベンチマーク開始: {municipality} ({articles} 記事, stages={','.join(stages)})")
+    
+    metrics = get_metrics()
+    metrics.reset()
+    completed = 0
+    started = time.perf_counter()
+    try:
+        if "scrape" in stages:
+            run_scrape(config, firestore_client)
+        
+        if "transform" in stages:
+            for _ in range(MAX_TRANSFORM_ROUNDS):
+                result = run_transform(config, firestore_client)
+                completed += result["completed"]
+                if not result["targets"] or not result["completed"]:
+                    break
+        
+        elapsed = time.perf_counter() - started
+        summary = metrics.summary()
+        print_report(elapsed, completed, summary, fake, db, http)
+        report = metrics.write_report(f"bench-{municipality}")
+    
+    finally:
+        restore_http()
+        restore_gemini()
+        storage.LOCAL_STORAGE_DIR = original_storage_dir
+        if workspace is not None:
+            workspace.cleanup()
+    
+    return {
+        "elapsed_sec": round(elapsed, 2),
+        "completed": completed,
+        "articles_per_min": round(completed / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "report": report,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    """メイン処理"""
+    args = list(argv if argv is not None else sys.argv[1:])
+    municipality = (args[0] if args else None) or os.getenv("MUNICIPALITY") or "moriya"
+    return run_bench(municipality)
+
+
+# ローカル実行
+if __name__ == "__main__":
+    main()
@@ -8,12 +8,18 @@ YAMLベースの自治体設定と環境変数を統合管理
 import os
 import yaml
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 
 # 環境変数を読み込み
 load_dotenv()
 
+# 自治体設定ファイルのディレクトリ
+MUNICIPALITIES_DIR = Path(__file__).parent.parent.parent / "config" / "municipalities"
+
+# 自治体として読み込まない設定ファイル
+NON_MUNICIPALITY_CONFIGS = {"template"}
+
 
 class Config:
     """設定管理クラス"""
@@ -29,7 +35,7 @@ class Config:
         
     def _load_config(self) -> Dict[str, Any]:
         """自治体設定ファイルを読み込み"""
-        config_path = Path(__file__).parent.parent.parent / "config" / "municipalities" / f"{self.municipality}.yaml"
+        config_path = MUNICIPALITIES_DIR / f"{self.municipality}.yaml"
         
         if not config_path.exists():
             raise FileNotFoundError(
@@ -75,8 +81,9 @@ class Config:
     
     @property
     def firestore_collection_name(self) -> str:
-        """Firestoreコレクション名"""
-        return os.getenv("FIRESTORE_COLLECTION_NAME", "omo")
+        """Firestoreコレクション名 (環境変数 FIRESTORE_COLLECTION_NAME が優先、未設定時は YAMLの firestore.collection_name)"""
+        collection = os.getenv("FIRESTORE_COLLECTION_NAME")
+        return collection or (self._config.get("firestore") or {}).get("collection_name") or "omo"
     
     # ========================================
     # Google API設定
@@ -157,6 +164,10 @@ class Config:
     # 情報源設定
     # ========================================
     
+    def get_source_types(self) -> List[str]:
+        """設定されている情報源タイプの一覧"""
+        return list(self._config.get("sources", {}).keys())
+    
     def get_source_config(self, source_type: str) -> Dict[str, Any]:
         """
         情報源の設定を取得
@@ -193,6 +204,57 @@ class Config:
         """変換が有効かどうか"""
         return self.get_transform_config(transform_type).get("enabled", False)
     
+    # ========================================
+    # 配信設定
+    # ========================================
+    
+    def get_delivery_config(self, delivery_type: str) -> Dict[str, Any]:
+        """
+        配信の設定を取得
+        
+        Args:
+            delivery_type: 配信タイプ (例: "feed", "line")
+        
+        Returns:
+            設定辞書
+        """
+        return (self._config.get("delivery") or {}).get(delivery_type) or {}
+    
+    def is_delivery_enabled(self, delivery_type: str) -> bool:
+        """配信が有効かどうか"""
+        return self.get_delivery_config(delivery_type).get("enabled", False)
+    
+    # ========================================
+    # 重複記事の検出
+    # ========================================
+    
+    @property
+    def dedup_config(self) -> Dict[str, Any]:
+        """重複記事の検出設定 (enabled, threshold, window_days, reuse_on_date_change)"""
+        return self._config.get("dedup") or {}
+    
+    # ========================================
+    # 動画のエンコード設定
+    # ========================================
+    
+    @property
+    def encoder_profiles(self) -> Dict[str, Dict[str, Any]]:
+        """動画のエンコードプロファイル (組み込みのプロファイルの上書き・追加)"""
+        return self._config.get("encoder_profiles") or {}
+    
+    # ========================================
+    # 検索設定
+    # ========================================
+    
+    @property
+    def search_config(self) -> Dict[str, Any]:
+        """全文検索の設定"""
+        return self._config.get("search") or {}
+    
+    def is_search_enabled(self) -> bool:
+        """全文検索の索引を作るかどうか"""
+        return self.search_config.get("enabled", False)
+    
     # ========================================
     # その他設定
     # ========================================
@@ -202,10 +264,40 @@ class Config:
         """デバッグモード"""
         return os.getenv("DEBUG", "false").lower() in ("true", "1", "yes")
     
+    @property
+    def runner_config(self) -> Dict[str, Any]:
+        """複数自治体ランナーでの自治体ごとの設定 (YAMLの runner)"""
+        return self._config.get("runner") or {}
+    
     @property
     def batch_limit(self) -> int:
-        """バッチ処理の件数制限"""
-        return int(os.getenv("BATCH_LIMIT", "5"))
+        """バッチ処理の件数制限 (環境変数 BATCH_LIMIT が優先、未設定時は YAMLの runner.batch_limit)"""
+        return int(os.getenv("BATCH_LIMIT") or self.runner_config.get("batch_limit") or 5)
+    
+    @property
+    def transform_workers(self) -> int:
+        """1自治体内で並列に変換する記事数 (YAMLの runner.max_workers)"""
+        return max(1, int(self.runner_config.get("max_workers", 1)))
+    
+    @property
+    def preselect_limit(self) -> int:
+        """フィルタ事前評価で走査する変換待ち記事の件数上限"""
+        return int(os.getenv("PRESELECT_LIMIT", "100"))
+    
+    @property
+    def transform_max_attempts(self) -> int:
+        """同一入力での変換器ごとの最大試行回数"""
+        return int(os.getenv("TRANSFORM_MAX_ATTEMPTS", "3"))
+    
+    @property
+    def lease_ttl_sec(self) -> float:
+        """変換リースの有効期間(秒) (ハートビートで延長される)"""
+        return float(os.getenv("LEASE_TTL_SEC", "300"))
+    
+    @property
+    def worker_poll_interval_sec(self) -> float:
+        """ワーカーモードで変換対象がない場合の待機時間(秒)"""
+        return float(os.getenv("WORKER_POLL_INTERVAL_SEC", "30"))
     
     def __repr__(self) -> str:
         return f"Config(municipality='{self.municipality}', name='{self.municipality_name}')"
@@ -233,6 +325,19 @@ def get_config(municipality: Optional[str] = None) -> Config:
     return _config_instance
 
 
+def list_municipalities() -> List[str]:
+    """
+    設定ファイルがある自治体の一覧を取得
+    
+    Returns:
+        自治体名のリスト (config/municipalities/*.yaml, テンプレートを除く)
+    """
+    return sorted(
+        path.stem for path in MUNICIPALITIES_DIR.glob("*.yaml")
+        if path.stem not in NON_MUNICIPALITY_CONFIGS
+    )
+
+
 # 便利な関数
 def reload_config(municipality: Optional[str] = None) -> Config:
     """設定を再読み込み"""
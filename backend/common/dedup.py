@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 重複記事の検出 (MinHash / LSH)
+
+同じお知らせが複数のURL・カテゴリに掲載される場合に、後から保存された記事を
+先に保存された記事 (正規の記事) に紐付け、変換結果を再利用できるようにする。
+
+- スクレイプ時に本文の文字 n-gram から MinHash 署名を計算し、署名を帯 (バンド) に分けた
+  ハッシュ (lsh_bands) と一緒に保存する
+- Firestore の array-contains-any で同じバンドを持つ記事 (候補) を引き、
+  署名から推定した類似度が閾値以上のものを重複とみなす
+"""
+
+import hashlib
+import random
+import unicodedata
+from datetime import date
+from typing import Dict, Any, List, Optional
+
+from .utils import extract_dates, normalize_for_fingerprint
+
+
+# 署名の長さ・バンド数 (1バンド = 4行、類似度 0.5 前後から候補になる)
+NUM_PERM = 64
+NUM_BANDS = 16
+
+# 文字 n-gram の長さ
+SHINGLE_SIZE = 5
+
+# 候補として読む件数の上限 (array-contains-any は30値まで)
+MAX_CANDIDATES = 20
+
+# 既定の設定
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_WINDOW_DAYS = 180
+
+# 候補の読み込みで取得するフィールド
+CANDIDATE_FIELDS = ["minhash", "duplicateOf", "published_date_str", "semantic_fingerprint"]
+
+# 日付・数値が同じ場合だけ「完全な重複」とみなす (毎月の献血など、日付違いは別のお知らせ)
+EXACT_FINGERPRINT_FIELDS = ("dates", "numbers")
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# ハッシュの置換 (a * x + b mod p)、全プロセスで同じ署名になるよう固定シード
+_rng = random.Random(20240601)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+
+def _hash64(value: str) -> int:
+    digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % _MERSENNE_PRIME
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """
+    正規化したテキストの文字 n-gram
+    
+    Args:
+        text: 入力テキスト
+        size: n-gram の長さ
+    
+    Returns:
+        n-gram の集合
+    """
+    normalized = normalize_for_fingerprint(text)
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+def compute_minhash(text: str) -> List[int]:
+    """
+    MinHash 署名を計算
+    
+    Args:
+        text: 入力テキスト (タイトル + 本文)
+    
+    Returns:
+        署名 (NUM_PERM 個の整数、テキストが空なら空リスト)
+    """
+    hashes = [_hash64(s) for s in shingles(text)]
+    if not hashes:
+        return []
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def lsh_bands(signature: List[int], bands: int = NUM_BANDS) -> List[str]:
+    """
+    署名をバンドに分けてハッシュ化 (同じバンドを1つでも持つ記事が候補)
+    
+    Args:
+        signature: MinHash 署名
+        bands: バンド数
+    
+    Returns:
+        ["<バンド番号>:<ハッシュ>", ...]
+    """
+    if not signature:
+        return []
+    rows = len(signature) // bands
+    keys = []
+    for i in range(bands):
+        band = ",".join(str(v) for v in signature[i * rows:(i + 1) * rows])
+        keys.append(f"{i}:{hashlib.blake2b(band.encode('ascii'), digest_size=6).hexdigest()}")
+    return keys
+
+
+def estimate_similarity(a: List[int], b: List[int]) -> float:
+    """署名から Jaccard 類似度を推定"""
+    if not a or not b or len(a) != len(b):
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def compute_signature_fields(article: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    スクレイプ時に保存する署名フィールド
+    
+    Args:
+        article: 記事データ (title, body_text, pdf_text)
+    
+    Returns:
+        {"minhash": 署名, "lsh_bands": バンド}
+    """
+    text = "\n".join(
+        t for t in (article.get("title", ""), article.get("body_text", ""), article.get("pdf_text", "")) if t
+    )
+    signature = compute_minhash(text)
+    return {"minhash": signature, "lsh_bands": lsh_bands(signature)}
+
+
+def _published_date(value: str) -> Optional[date]:
+    """公開日の文字列を日付に変換 (解釈できない場合はNone)"""
+    for found in extract_dates(unicodedata.normalize("NFKC", value or "")):
+        parts = found.split("-")
+        if len(parts) == 3 and len(parts[0]) == 4:
+            try:
+                return date(*(int(p) for p in parts))
+            except ValueError:
+                continue
+    return None
+
+
+def is_exact_duplicate(article: Dict[str, Any], canonical: Dict[str, Any]) -> bool:
+    """日付・数値まで同じか (意味的フィンガープリントで比較)"""
+    a = article.get("semantic_fingerprint") or {}
+    b = canonical.get("semantic_fingerprint") or {}
+    if not a or not b:
+        return False
+    return all(a.get(f) == b.get(f) for f in EXACT_FINGERPRINT_FIELDS)
+
+
+def find_canonical(
+    firestore_client,
+    doc_id: str,
+    article: Dict[str, Any],
+    dedup_config: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    記事が重複している正規の記事を探す
+    
+    Args:
+        firestore_client: FirestoreClient
+        doc_id: ドキュメントID
+        article: 記事データ (minhash, lsh_bands を含む)
+        dedup_config: 重複検出の設定 (threshold, window_days)
+    
+    Returns:
+        {"duplicateOf": 正規の記事ID, "duplicateSimilarity": 類似度, "duplicateExact": 日付・数値まで同じか}
+        (重複がない場合はNone)
+    """
+    signature = article.get("minhash") or []
+    bands = article.get("lsh_bands") or []
+    if not signature or not bands:
+        return None
+    
+    threshold = float(dedup_config.get("threshold", DEFAULT_THRESHOLD))
+    window_days = int(dedup_config.get("window_days", DEFAULT_WINDOW_DAYS))
+    published = _published_date(article.get("published_date_str", ""))
+    
+    best = None
+    best_similarity = 0.0
+    for snapshot in firestore_client.query_lsh_candidates(bands, MAX_CANDIDATES, fields=CANDIDATE_FIELDS):
+        if snapshot.id == doc_id:
+            continue
+        candidate = snapshot.to_dict() or {}
+        # 自分を正規の記事としている記事には紐付けない (循環を防ぐ)
+        if candidate.get("duplicateOf") == doc_id:
+            continue
+        
+        similarity = estimate_similarity(signature, candidate.get("minhash") or [])
+        if similarity < threshold or similarity <= best_similarity:
+            continue
+        
+        # 最近の記事だけを対象にする (何年も前の同じ文面は別のお知らせとして扱う)
+        candidate_published = _published_date(candidate.get("published_date_str", ""))
+        if published and candidate_published and abs((published - candidate_published).days) > window_days:
+            continue
+        
+        best, best_similarity = (snapshot.id, candidate), similarity
+    
+    if best is None:
+        return None
+    
+    candidate_id, candidate = best
+    return {
+        "duplicateOf": candidate.get("duplicateOf") or candidate_id,  # 正規の記事に直接紐付ける
+        "duplicateSimilarity": round(best_similarity, 3),
+        "duplicateExact": is_exact_duplicate(article, candidate),
+    }
+
+
+def reusable_types(article: Dict[str, Any], dedup_config: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    正規の記事から変換結果を再利用できる変換タイプ
+    
+    Args:
+        article: 記事データ (duplicateOf, duplicateExact)
+        dedup_config: 重複検出の設定
+    
+    Returns:
+        変換タイプのリスト (Noneの場合はすべて、重複でない場合は空)
+    """
+    if not article.get("duplicateOf") or not dedup_config.get("enabled", False):
+        return []
+    if article.get("duplicateExact"):
+        return None
+    # 日付・数値が違う場合は、日付を含まない出力だけ再利用する
+    return list(dedup_config.get("reuse_on_date_change") or [])
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - プロセス内イベントバス
+
+スクレイプで記事が新規作成・更新されたときにイベントを発行し、
+変換ワーカーが保存直後から処理を始められるようにする
+"""
+
+import queue
+import threading
+from typing import Dict, Any, Callable, List, Optional
+
+
+# イベント種別
+EVENT_ARTICLE_NEW = "article.new"
+EVENT_ARTICLE_UPDATED = "article.updated"
+
+# 変換対象になるイベント
+ARTICLE_EVENTS = (EVENT_ARTICLE_NEW, EVENT_ARTICLE_UPDATED)
+
+# スクレイプの保存結果 → イベント種別
+SAVE_STATUS_EVENTS = {
+    "new": EVENT_ARTICLE_NEW,
+    "updated": EVENT_ARTICLE_UPDATED,
+}
+
+
+def make_article_event(event_type: str, doc_id: str, collection: str, municipality: str = "") -> Dict[str, Any]:
+    """
+    記事イベントを作成
+    
+    Args:
+        event_type: イベント種別
+        doc_id: ドキュメントID
+        collection: コレクション名 (自治体の識別に使う)
+        municipality: 自治体名
+    
+    Returns:
+        イベントの辞書
+    """
+    return {
+        "type": event_type,
+        "doc_id": doc_id,
+        "collection": collection,
+        "municipality": municipality,
+    }
+
+
+class EventBus:
+    """イベントバス (購読者へ同期的に配信)"""
+    
+    def __init__(self):
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+    
+    def subscribe(self, handler: Callable[[Dict[str, Any]], None]) -> Callable[[], None]:
+        """
+        イベントを購読
+        
+        Args:
+            handler: イベントを受け取る関数 (重い処理はキューに積んで別スレッドで行うこと)
+        
+        Returns:
+            購読解除用の関数
+        """
+        with self._lock:
+            self._subscribers.append(handler)
+        
+        def _unsubscribe():
+            with self._lock:
+                if handler in self._subscribers:
+                    self._subscribers.remove(handler)
+        
+        return _unsubscribe
+    
+    def publish(self, event: Dict[str, Any]):
+        """
+        イベントを発行
+        
+        Args:
+            event: イベント (make_article_event で作成)
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        
+        for handler in subscribers:
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"⚠️ イベント配信失敗 ({event.get('type')}): {e}")
+
+
+class ArticleEventQueue:
+    """
+    記事イベントを溜めるキュー (変換ワーカー用)
+    
+    同じ記事のイベントが処理前に重複して届いた場合は1件にまとめる
+    """
+    
+    def __init__(self, collection: Optional[str] = None):
+        """
+        Args:
+            collection: 受け取るコレクション (Noneの場合はすべて)
+        """
+        self.collection = collection
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+    
+    def __call__(self, event: Dict[str, Any]):
+        """EventBus の購読者として使う"""
+        if event.get("type") not in ARTICLE_EVENTS:
+            return
+        if self.collection and event.get("collection") != self.collection:
+            return
+        self.put(event["doc_id"])
+    
+    def put(self, doc_id: str):
+        """記事を追加 (処理待ちに同じ記事があれば追加しない)"""
+        with self._lock:
+            if doc_id in self._pending:
+                return
+            self._pending.add(doc_id)
+        self._queue.put(doc_id)
+    
+    def close(self):
+        """終了を通知 (get は None を返す)"""
+        self._queue.put(None)
+    
+    def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        次の記事を取得
+        
+        Args:
+            timeout: 待機時間(秒) (Noneの場合は届くまで待つ)
+        
+        Returns:
+            ドキュメントID (タイムアウト・終了時はNone)
+        """
+        try:
+            doc_id = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        
+        if doc_id is None:
+            self._queue.put(None)  # 他の取得スレッドにも終了を伝える
+            return None
+        
+        with self._lock:
+            self._pending.discard(doc_id)
+        return doc_id
+
+
+# グローバルインスタンス
+_event_bus: Optional[EventBus] = None
+_event_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """
+    イベントバスを取得
+    
+    Returns:
+        EventBus インスタンス
+    """
+    global _event_bus
+    
+    with _event_bus_lock:
+        if _event_bus is None:
+            _event_bus = EventBus()
+    
+    return _event_bus
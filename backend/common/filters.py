@@ -3,11 +3,182 @@
 OMO Platform - フィルタリング機能
 
 記事をブラックリスト/ホワイトリストでフィルタリング
+
+キーワードはフィールドごとに Aho-Corasick オートマトンへ一度だけコンパイルし、
+タイトル1回の走査で全キーワードを判定する。
+
+ルールの書式:
+    "入札"          部分一致
+    "re:^第\\d+回"   正規表現
+    "!子ども会議"    否定 (一致した場合はそのリストの判定を取り消す)
+    "!re:..."        否定の正規表現
 """
 
-from typing import Dict, Any, List, Optional
+import re
+from collections import deque
+from typing import Dict, Any, List, Optional, Iterable, Set, Pattern
+
+
+# 判定対象のフィールド
+FILTER_FIELDS = ("title", "category")
+
+REGEX_PREFIX = "re:"
+NEGATION_PREFIX = "!"
+
+
+# ========================================
+# マルチパターンマッチャ
+# ========================================
+
+class KeywordAutomaton:
+    """Aho-Corasick オートマトン (複数キーワードの同時検索)"""
+    
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Args:
+            keywords: 検索キーワード
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[str]] = [set()]
+        self.keywords: Set[str] = set()
+        
+        for keyword in keywords:
+            if keyword:
+                self._add(keyword)
+        self._build()
+    
+    def _add(self, keyword: str):
+        """トライにキーワードを追加"""
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            node = nxt
+        self._output[node].add(keyword)
+        self.keywords.add(keyword)
+    
+    def _build(self):
+        """失敗リンクを構築 (幅優先)"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._output[nxt] |= self._output[self._fail[nxt]]
+    
+    def find_all(self, text: str) -> Set[str]:
+        """
+        テキストに含まれるキーワードをすべて返す
+        
+        Args:
+            text: 検索対象テキスト
+        
+        Returns:
+            一致したキーワードの集合
+        """
+        found: Set[str] = set()
+        if not text or not self.keywords:
+            return found
+        
+        node = 0
+        for ch in text:
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            if self._output[node]:
+                found |= self._output[node]
+        return found
 
 
+class FieldRules:
+    """1フィールド分のコンパイル済みルール"""
+    
+    def __init__(self, entries: Optional[List[str]]):
+        """
+        Args:
+            entries: ルール文字列のリスト
+        """
+        self.keywords: Set[str] = set()
+        self.patterns: List[Pattern] = []
+        self.negated_keywords: Set[str] = set()
+        self.negated_patterns: List[Pattern] = []
+        
+        for entry in entries or []:
+            entry = str(entry)
+            negated = entry.startswith(NEGATION_PREFIX)
+            if negated:
+                entry = entry[len(NEGATION_PREFIX):]
+            
+            if entry.startswith(REGEX_PREFIX):
+                compiled = re.compile(entry[len(REGEX_PREFIX):])
+                (self.negated_patterns if negated else self.patterns).append(compiled)
+            elif entry:
+                (self.negated_keywords if negated else self.keywords).add(entry)
+        
+        # 単独利用時のオートマトン (FilterSet では共有オートマトンを使う)
+        self.automaton = KeywordAutomaton(self.all_keywords)
+    
+    @property
+    def all_keywords(self) -> Set[str]:
+        """肯定・否定を合わせたキーワード"""
+        return self.keywords | self.negated_keywords
+    
+    @property
+    def has_positive(self) -> bool:
+        """肯定ルールがあるか"""
+        return bool(self.keywords or self.patterns)
+    
+    @property
+    def is_empty(self) -> bool:
+        """ルールが1つもないか"""
+        return not (self.has_positive or self.negated_keywords or self.negated_patterns)
+    
+    def matches(self, text: str, found: Optional[Set[str]] = None) -> bool:
+        """
+        ルールに一致するか判定
+        
+        肯定ルールのいずれかに一致し、否定ルールのいずれにも一致しない場合にTrue。
+        否定ルールは一致を取り消すだけなので、否定ルールのみのリストは一致しない。
+        
+        Args:
+            text: 判定対象テキスト
+            found: 共有オートマトンで検出済みのキーワード (Noneの場合は自前で検索)
+        
+        Returns:
+            一致すればTrue
+        """
+        if not self.has_positive:
+            return False
+        
+        if found is None:
+            found = self.automaton.find_all(text)
+        
+        # 否定ルール
+        if found & self.negated_keywords:
+            return False
+        if any(p.search(text) for p in self.negated_patterns):
+            return False
+        
+        if found & self.keywords:
+            return True
+        return any(p.search(text) for p in self.patterns)
+
+
+# ========================================
+# 記事フィルタ
+# ========================================
+
 class ArticleFilter:
     """記事フィルタリング"""
     
@@ -24,62 +195,121 @@ class ArticleFilter:
         self.mode = filter_config.get("mode", "blacklist")
         self.blacklist = filter_config.get("blacklist", {})
         self.whitelist = filter_config.get("whitelist", {})
+        
+        # フィールドごとにコンパイル
+        self._blacklist_rules = {f: FieldRules(self.blacklist.get(f)) for f in FILTER_FIELDS}
+        self._whitelist_rules = {f: FieldRules(self.whitelist.get(f)) for f in FILTER_FIELDS}
+    
+    def keywords_for(self, field: str) -> Set[str]:
+        """フィールドで使用するキーワード (共有オートマトン構築用)"""
+        return self._blacklist_rules[field].all_keywords | self._whitelist_rules[field].all_keywords
     
-    def should_include(self, article: Dict[str, Any]) -> bool:
+    def should_include(self, article: Dict[str, Any], found: Optional[Dict[str, Set[str]]] = None) -> bool:
         """
         記事を含めるべきか判定
         
         Args:
             article: 記事データ
+            found: フィールドごとの検出済みキーワード (FilterSet から渡される)
         
         Returns:
             True: 含める, False: 除外
         """
-        title = article.get("title", "")
-        category = article.get("category", "")
+        texts = {f: article.get(f, "") or "" for f in FILTER_FIELDS}
+        found = found or {}
         
         if self.mode == "blacklist":
-            return self._check_blacklist(title, category)
+            return self._check_blacklist(texts, found)
         
         elif self.mode == "whitelist":
-            return self._check_whitelist(title, category)
+            return self._check_whitelist(texts, found)
         
         elif self.mode == "both":
             # ホワイトリスト優先
-            if self._check_whitelist(title, category):
+            if self._check_whitelist(texts, found):
                 return True
-            return self._check_blacklist(title, category)
+            return self._check_blacklist(texts, found)
         
         return True
     
-    def _check_blacklist(self, title: str, category: str) -> bool:
+    def _check_blacklist(self, texts: Dict[str, str], found: Dict[str, Set[str]]) -> bool:
         """ブラックリストチェック (該当すれば除外)"""
-        # タイトルチェック
-        title_blacklist = self.blacklist.get("title", [])
-        for keyword in title_blacklist:
-            if keyword in title:
-                return False  # 除外
-        
-        # カテゴリチェック
-        category_blacklist = self.blacklist.get("category", [])
-        for keyword in category_blacklist:
-            if keyword in category:
+        for field in FILTER_FIELDS:
+            if self._blacklist_rules[field].matches(texts[field], found.get(field)):
                 return False  # 除外
         
         return True  # 含める
     
-    def _check_whitelist(self, title: str, category: str) -> bool:
+    def _check_whitelist(self, texts: Dict[str, str], found: Dict[str, Set[str]]) -> bool:
         """ホワイトリストチェック (該当すれば含める)"""
-        # タイトルチェック
-        title_whitelist = self.whitelist.get("title", [])
-        for keyword in title_whitelist:
-            if keyword in title:
-                return True  # 含める
-        
-        # カテゴリチェック
-        category_whitelist = self.whitelist.get("category", [])
-        for keyword in category_whitelist:
-            if keyword in category:
+        for field in FILTER_FIELDS:
+            if self._whitelist_rules[field].matches(texts[field], found.get(field)):
                 return True  # 含める
         
         return False  # 除外
+
+
+def create_filter(filter_config: Optional[Dict[str, Any]]) -> Optional[ArticleFilter]:
+    """
+    フィルタ設定から ArticleFilter を作成
+    
+    Args:
+        filter_config: フィルタ設定 (空の場合はフィルタなし)
+    
+    Returns:
+        ArticleFilter (設定がなければNone)
+    """
+    return ArticleFilter(filter_config) if filter_config else None
+
+
+class FilterSet:
+    """複数の変換器フィルタをまとめて評価"""
+    
+    def __init__(self, filters: Dict[str, Optional[ArticleFilter]]):
+        """
+        Args:
+            filters: {変換タイプ: ArticleFilter or None}
+                     None はフィルタなし (常に含める)
+        """
+        self.filters = filters
+        
+        # 全フィルタのキーワードを1つのオートマトンに統合
+        self._automata = {}
+        for field in FILTER_FIELDS:
+            keywords: Set[str] = set()
+            for article_filter in filters.values():
+                if article_filter:
+                    keywords |= article_filter.keywords_for(field)
+            self._automata[field] = KeywordAutomaton(keywords)
+    
+    def evaluate(self, article: Dict[str, Any]) -> Dict[str, bool]:
+        """
+        1記事に対して全フィルタを評価 (各フィールドの走査は1回)
+        
+        Args:
+            article: 記事データ
+        
+        Returns:
+            {変換タイプ: 含めるならTrue}
+        """
+        found = {
+            field: self._automata[field].find_all(article.get(field, "") or "")
+            for field in FILTER_FIELDS
+        }
+        
+        return {
+            name: article_filter.should_include(article, found) if article_filter else True
+            for name, article_filter in self.filters.items()
+        }
+    
+    def filter_many(self, articles: Iterable[Dict[str, Any]]) -> List[Dict[str, bool]]:
+        """
+        複数記事をまとめて評価
+        
+        Args:
+            articles: 記事データのリスト
+        
+        Returns:
+            記事ごとの {変換タイプ: 含めるならTrue} のリスト
+        """
+        return [self.evaluate(article) for article in articles]
@@ -5,13 +5,33 @@ OMO Platform - Firestore操作モジュール
 Firestoreの初期化と基本操作を提供
 """
 
+import json
 import os
-from typing import Optional, Dict, Any, List
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple, Callable
 from google.cloud import firestore
 from google.cloud.firestore_v1 import FieldFilter
 import google.auth
 
 from .config import get_config
+from .utils import classify_content_change, compute_content_hash, get_current_timestamp
+
+
+# 変更履歴 (changeAudit) の保持件数
+CHANGE_AUDIT_MAX = 20
+
+# 変換リースのフィールド (ワーカー間で同じ記事を二重に変換しないため)
+LEASE_OWNER_FIELD = "leaseOwner"
+LEASE_EXPIRES_FIELD = "leaseExpiresAt"
+LEASE_FIELDS = (LEASE_OWNER_FIELD, LEASE_EXPIRES_FIELD)
+
+# 重複記事の紐付けのフィールド
+DUPLICATE_LINK_FIELDS = ("duplicateOf", "duplicateSimilarity", "duplicateExact")
+
+# 接続 (firestore.Client) は (project, database) ごとに共有
+_db_pool: Dict[Tuple[str, str], firestore.Client] = {}
+_db_lock = threading.Lock()
 
 
 class FirestoreClient:
@@ -40,6 +60,13 @@ class FirestoreClient:
             # エミュレータ接続チェック
             emulator_host = os.getenv("FIRESTORE_EMULATOR_HOST")
             
+            with _db_lock:
+                pooled = _db_pool.get((project_id, database_id))
+            if pooled is not None:
+                # 他の自治体と接続・認証を共有
+                print(f"♻️ Firestore 接続を共有: collection='{self.config.firestore_collection_name}'")
+                return pooled
+            
             if emulator_host:
                 # エミュレータ接続
                 db = firestore.Client(project=project_id)
@@ -51,6 +78,8 @@ class FirestoreClient:
                 print(f"☁️ Firestore 本番接続: project='{project_id}', database='{database_id}'")
                 print(f"   collection='{self.config.firestore_collection_name}'")
             
+            with _db_lock:
+                db = _db_pool.setdefault((project_id, database_id), db)
             return db
             
         except Exception as e:
@@ -116,8 +145,21 @@ class FirestoreClient:
         # 実際のロジックは要件に応じて調整
         return self.query_by_status("scrapeStatus", None, limit)
     
-    def query_pending_transform(self, limit: Optional[int] = None) -> List[firestore.DocumentSnapshot]:
-        """変換待ちのドキュメントを取得"""
+    def query_pending_transform(
+        self,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[firestore.DocumentSnapshot]:
+        """
+        変換待ちのドキュメントを取得
+        
+        Args:
+            limit: 取得件数制限
+            fields: 取得するフィールド (指定時はプロジェクションで本文などを読まない)
+        
+        Returns:
+            ドキュメントスナップショットのリスト
+        """
         # scriptStatus が None のものを取得
         query = self.get_collection().where(
             filter=FieldFilter("scriptStatus", "==", None)
@@ -125,6 +167,9 @@ class FirestoreClient:
             filter=FieldFilter("scrapeStatus", "in", ["new", "updated"])
         )
         
+        if fields:
+            query = query.select(fields)
+        
         if limit:
             query = query.limit(limit)
         
@@ -136,15 +181,182 @@ class FirestoreClient:
                 filter=FieldFilter("scriptStatus", "==", False)
             ).where(
                 filter=FieldFilter("scrapeStatus", "in", ["new", "updated"])
-            ).limit(limit - len(docs))
+            )
+            
+            if fields:
+                query_false = query_false.select(fields)
             
-            docs += list(query_false.stream())
+            docs += list(query_false.limit(limit - len(docs)).stream())
         
         # scraped_at でソート
         docs.sort(key=lambda d: (d.to_dict().get("scraped_at") or 0))
         
         return docs
     
+    def query_transformed(
+        self,
+        limit: int,
+        start_after: Optional[Tuple[Any, str]] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[firestore.DocumentSnapshot]:
+        """
+        変換済みのドキュメントを新しい順に取得 (カーソルページング用)
+        
+        transformedAt のないドキュメント (未変換) は並び替えの対象外になるため含まれない
+        
+        Args:
+            limit: 取得件数
+            start_after: (transformedAt, ドキュメントID) この位置より後を取得
+            fields: 取得するフィールド (指定時はプロジェクション)
+        
+        Returns:
+            ドキュメントスナップショットのリスト
+        """
+        collection = self.get_collection()
+        query = collection.order_by(
+            "transformedAt", direction=firestore.Query.DESCENDING
+        ).order_by(
+            firestore.FieldPath.document_id(), direction=firestore.Query.DESCENDING
+        )
+        
+        if start_after:
+            transformed_at, doc_id = start_after
+            query = query.start_after({
+                "transformedAt": transformed_at,
+                firestore.FieldPath.document_id(): collection.document(doc_id),
+            })
+        
+        if fields:
+            query = query.select(fields)
+        
+        return list(query.limit(limit).stream())
+    
+    def select_all(self, fields: List[str]) -> List[firestore.DocumentSnapshot]:
+        """
+        全ドキュメントの指定フィールドだけを取得 (本文を読まずに変更を検出する用)
+        
+        Args:
+            fields: 取得するフィールド (例: ["quick_hash"])
+        
+        Returns:
+            ドキュメントスナップショットのリスト
+        """
+        return list(self.get_collection().select(fields).stream())
+    
+    def query_lsh_candidates(
+        self,
+        bands: List[str],
+        limit: int,
+        fields: Optional[List[str]] = None
+    ) -> List[firestore.DocumentSnapshot]:
+        """
+        LSHのバンドを1つでも共有するドキュメントを取得 (重複記事の候補)
+        
+        Args:
+            bands: バンドのハッシュ (lsh_bands、最大30件)
+            limit: 取得件数
+            fields: 取得するフィールド (指定時はプロジェクション)
+        
+        Returns:
+            ドキュメントスナップショットのリスト
+        """
+        query = self.get_collection().where(
+            filter=FieldFilter("lsh_bands", "array_contains_any", list(bands)[:30])
+        )
+        
+        if fields:
+            query = query.select(fields)
+        
+        return list(query.limit(limit).stream())
+    
+    @staticmethod
+    def duplicate_link_fields(link: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        重複記事の紐付けの書き込み内容 (save_with_hash_check の extra_fields で記事と同時に保存)
+        
+        Args:
+            link: {"duplicateOf", "duplicateSimilarity", "duplicateExact"} (Noneの場合は紐付けを外す)
+        
+        Returns:
+            保存するフィールド
+        """
+        if link is None:
+            return {field: firestore.DELETE_FIELD for field in DUPLICATE_LINK_FIELDS}
+        return dict(link)
+    
+    def watch_pending_transform(self, on_doc: Callable[[str], None]):
+        """
+        変換待ちの記事をリアルタイムに監視 (on_snapshot)
+        
+        常駐ワーカーが、他のプロセスのスクレイプで保存された記事を
+        ポーリングを待たずに受け取るために使う
+        
+        通知しない変更:
+        - 購読開始時の初回スナップショット (変換待ちの残りはポーリングの
+          preselect_documents がフィルタ・件数上限を適用して処理する)
+        - リースのフィールドだけの変更 (取得・延長・解放)
+        - リース中の記事の変更 (変換中の途中結果の保存など)
+        
+        Args:
+            on_doc: 変換待ちになった記事のドキュメントIDを受け取る関数
+        
+        Returns:
+            監視ハンドル (unsubscribe() で停止)
+        """
+        query = self.get_collection().where(
+            filter=FieldFilter("scriptStatus", "==", None)
+        ).where(
+            filter=FieldFilter("scrapeStatus", "in", ["new", "updated"])
+        )
+        
+        # ドキュメントID → リース以外のフィールドのハッシュ
+        versions: Dict[str, str] = {}
+        initial = [True]
+        
+        def _on_snapshot(docs, changes, read_time):
+            now = time.time()
+            for change in changes:
+                doc_id = change.document.id
+                if change.type.name == "REMOVED":
+                    versions.pop(doc_id, None)
+                    continue
+                
+                data = change.document.to_dict() or {}
+                version = compute_content_hash(json.dumps(
+                    {k: v for k, v in data.items() if k not in LEASE_FIELDS},
+                    sort_keys=True, default=str, ensure_ascii=False
+                ))
+                previous = versions.get(doc_id)
+                versions[doc_id] = version
+                
+                if initial[0] or version == previous:
+                    continue
+                if data.get(LEASE_OWNER_FIELD) and (data.get(LEASE_EXPIRES_FIELD) or 0) > now:
+                    continue
+                on_doc(doc_id)
+            initial[0] = False
+        
+        print(f"👂 変換待ちの監視開始: collection='{self.collection_name}'")
+        return query.on_snapshot(_on_snapshot)
+    
+    def get_documents(self, doc_ids: List[str]) -> List[firestore.DocumentSnapshot]:
+        """
+        複数ドキュメントをまとめて取得 (指定順を維持)
+        
+        Args:
+            doc_ids: ドキュメントIDのリスト
+        
+        Returns:
+            存在するドキュメントスナップショットのリスト
+        """
+        if not doc_ids:
+            return []
+        
+        refs = [self.get_collection().document(doc_id) for doc_id in doc_ids]
+        snapshots = {snap.id: snap for snap in self.db.get_all(refs) if snap.exists}
+        
+        return [snapshots[doc_id] for doc_id in doc_ids if doc_id in snapshots]
+    
     # ========================================
     # 保存ヘルパー (変更検出付き)
     # ========================================
@@ -153,18 +365,28 @@ class FirestoreClient:
         self,
         doc_id: str,
         new_data: Dict[str, Any],
-        hash_field: str = "contentHash"
+        hash_field: str = "contentHash",
+        fingerprint_field: str = "semantic_fingerprint",
+        keep_existing: bool = False,
+        extra_fields: Optional[Callable[[str], Dict[str, Any]]] = None
     ) -> str:
         """
         ハッシュ値で変更を検出して保存
         
+        ハッシュが変わっても、意味的フィンガープリントの差分が軽微
+        (共通部品・表記揺れ・画像のみ) なら再変換トリガを立てない
+        
         Args:
             doc_id: ドキュメントID
             new_data: 新しいデータ
             hash_field: ハッシュフィールド名
+            fingerprint_field: 意味的フィンガープリントのフィールド名
+            keep_existing: 既存のドキュメントは更新しない (取得が不完全な場合、次回に再取得)
+            extra_fields: 新規・更新 (再変換する) の場合に呼び出し、同じ書き込みに加えるフィールドを返す関数
+                (引数は "new" | "updated"。変換待ちになった時点で揃っている必要があるもの)
         
         Returns:
-            "new" | "updated" | "nochange"
+            "new" | "updated" | "cosmetic" | "nochange"
         """
         doc_ref = self.get_collection().document(doc_id)
         old_doc = doc_ref.get()
@@ -177,6 +399,10 @@ class FirestoreClient:
             old_hash = old.get(hash_field)
             new_hash = new_data.get(hash_field)
             
+            if old_hash != new_hash and keep_existing:
+                print(f"⏩ 取得が不完全なため前回の内容を維持: {new_data.get('original_url', doc_id)}")
+                return "nochange"
+            
             if old_hash != new_hash:
                 # 更新
                 payload = dict(new_data)
@@ -186,12 +412,34 @@ class FirestoreClient:
                     if k in PROTECT_NONE_KEYS and payload[k] is None:
                         payload.pop(k)
                 
+                # 変更の種類を判定して履歴に残す
+                kind, changed_fields, score = classify_content_change(
+                    old.get(fingerprint_field),
+                    new_data.get(fingerprint_field) or {}
+                )
+                audit = {
+                    "kind": kind,
+                    "changedFields": changed_fields,
+                    "score": score,
+                    "at": get_current_timestamp(),
+                }
+                payload["lastChange"] = audit
+                payload["changeAudit"] = (list(old.get("changeAudit") or []) + [audit])[-CHANGE_AUDIT_MAX:]
+                
+                if kind == "cosmetic":
+                    # 内容は保存するが再変換はしない
+                    doc_ref.set(payload, merge=True)
+                    print(f"🧹 軽微な変更 (再変換なし: {', '.join(changed_fields) or '正規化後同一'}): {new_data.get('original_url', doc_id)}")
+                    return "cosmetic"
+                
                 payload["scrapeStatus"] = "updated"
                 payload["updatedAt"] = firestore.SERVER_TIMESTAMP
                 payload["scriptStatus"] = None  # 再台本化トリガ
+                if extra_fields:
+                    payload.update(extra_fields("updated"))
                 
                 doc_ref.set(payload, merge=True)
-                print(f"🆕 更新検出: {new_data.get('original_url', doc_id)}")
+                print(f"🆕 更新検出 ({', '.join(changed_fields)}): {new_data.get('original_url', doc_id)}")
                 return "updated"
             else:
                 # 変更なし
@@ -202,6 +450,8 @@ class FirestoreClient:
             payload = dict(new_data)
             payload["scrapeStatus"] = "new"
             payload.setdefault("scriptStatus", None)
+            if extra_fields:
+                payload.update(extra_fields("new"))
             
             doc_ref.set(payload)
             print(f"✨ 新規記事: {new_data.get('original_url', doc_id)}")
@@ -243,30 +493,252 @@ class FirestoreClient:
         return deleted
 
 
-# グローバルインスタンス
-_firestore_client: Optional[FirestoreClient] = None
+    def batch_update(self, updates: Dict[str, Dict[str, Any]], batch_size: int = 450) -> int:
+        """
+        複数ドキュメントを更新
+        
+        Args:
+            updates: {ドキュメントID: 更新データ}
+            batch_size: バッチサイズ
+        
+        Returns:
+            更新件数
+        """
+        total = len(updates)
+        updated = 0
+        
+        batch = self.db.batch()
+        
+        for i, (doc_id, data) in enumerate(updates.items(), start=1):
+            doc_ref = self.get_collection().document(doc_id)
+            batch.update(doc_ref, data)
+            
+            if i % batch_size == 0:
+                batch.commit()
+                updated += batch_size
+                print(f"[BATCH UPDATE] コミット: {updated}/{total}")
+                batch = self.db.batch()
+        
+        # 残りをコミット
+        if total % batch_size != 0:
+            batch.commit()
+            updated = total
+        
+        print(f"[BATCH UPDATE] 更新完了: {updated}/{total}")
+        return updated
+    
+    # ========================================
+    # 変換リース (ワーカー間の排他)
+    # ========================================
+    
+    def claim_lease(
+        self,
+        doc_id: str,
+        owner: str,
+        ttl_sec: float
+    ) -> Optional[firestore.DocumentSnapshot]:
+        """
+        記事の変換リースを取得 (トランザクション)
+        
+        他のワーカーが有効なリースを持っている記事、
+        または変換済み (scriptStatus == True) の記事は取得できない
+        
+        Args:
+            doc_id: ドキュメントID
+            owner: ワーカーID
+            ttl_sec: リースの有効期間(秒)
+        
+        Returns:
+            取得時点のドキュメントスナップショット (取得できなければNone)
+        """
+        doc_ref = self.get_collection().document(doc_id)
+        
+        @firestore.transactional
+        def _claim(transaction):
+            snap = doc_ref.get(transaction=transaction)
+            if not snap.exists:
+                return None
+            
+            data = snap.to_dict() or {}
+            if data.get("scriptStatus") is True:
+                return None  # 他のワーカーが完了済み
+            
+            now = time.time()
+            holder = data.get(LEASE_OWNER_FIELD)
+            expires_at = data.get(LEASE_EXPIRES_FIELD) or 0
+            if holder and holder != owner and expires_at > now:
+                return None  # 他のワーカーが処理中
+            
+            transaction.update(doc_ref, {
+                LEASE_OWNER_FIELD: owner,
+                LEASE_EXPIRES_FIELD: now + ttl_sec,
+            })
+            return snap
+        
+        return _claim(self.db.transaction())
+    
+    def renew_lease(self, doc_id: str, owner: str, ttl_sec: float) -> bool:
+        """
+        リースを延長 (ハートビート)
+        
+        Args:
+            doc_id: ドキュメントID
+            owner: ワーカーID
+            ttl_sec: 延長後の有効期間(秒)
+        
+        Returns:
+            延長できればTrue (他のワーカーに奪われていればFalse)
+        """
+        doc_ref = self.get_collection().document(doc_id)
+        
+        @firestore.transactional
+        def _renew(transaction):
+            snap = doc_ref.get(transaction=transaction)
+            if not snap.exists or (snap.to_dict() or {}).get(LEASE_OWNER_FIELD) != owner:
+                return False
+            transaction.update(doc_ref, {LEASE_EXPIRES_FIELD: time.time() + ttl_sec})
+            return True
+        
+        return _renew(self.db.transaction())
+    
+    def release_lease(self, doc_id: str, owner: str) -> bool:
+        """
+        リースを解放
+        
+        Args:
+            doc_id: ドキュメントID
+            owner: ワーカーID
+        
+        Returns:
+            解放できればTrue (自分のリースでなければFalse)
+        """
+        doc_ref = self.get_collection().document(doc_id)
+        
+        @firestore.transactional
+        def _release(transaction):
+            snap = doc_ref.get(transaction=transaction)
+            if not snap.exists or (snap.to_dict() or {}).get(LEASE_OWNER_FIELD) != owner:
+                return False
+            transaction.update(doc_ref, {
+                LEASE_OWNER_FIELD: firestore.DELETE_FIELD,
+                LEASE_EXPIRES_FIELD: firestore.DELETE_FIELD,
+            })
+            return True
+        
+        return _release(self.db.transaction())
+    
+    def update_unless_leased(self, doc_id: str, data: Dict[str, Any]) -> bool:
+        """
+        リース中・変換済みでない記事だけを更新 (トランザクション)
+        
+        リースを取らずに書き込む処理 (フィルタで除外した記事の処理済み化など) が、
+        その間に記事を取得したワーカーの状態を上書きしないようにする
+        
+        Args:
+            doc_id: ドキュメントID
+            data: 更新データ (ドット区切りのフィールドパス可)
+        
+        Returns:
+            更新できればTrue (他のワーカーが処理中・完了済みならFalse)
+        """
+        doc_ref = self.get_collection().document(doc_id)
+        
+        @firestore.transactional
+        def _update(transaction):
+            snap = doc_ref.get(transaction=transaction)
+            if not snap.exists:
+                return False
+            
+            current = snap.to_dict() or {}
+            if current.get("scriptStatus") is True:
+                return False
+            if current.get(LEASE_OWNER_FIELD) and (current.get(LEASE_EXPIRES_FIELD) or 0) > time.time():
+                return False
+            
+            transaction.update(doc_ref, data)
+            return True
+        
+        return _update(self.db.transaction())
+    
+    def release_expired_leases(self, limit: int = 450) -> int:
+        """
+        期限切れのリースを解放 (クラッシュしたワーカーの記事を再取得可能にする)
+        
+        Args:
+            limit: 1回で確認する最大件数
+        
+        Returns:
+            解放件数
+        """
+        query = self.get_collection().where(
+            filter=FieldFilter(LEASE_EXPIRES_FIELD, "<", time.time())
+        ).select([LEASE_EXPIRES_FIELD]).limit(limit)
+        
+        released = 0
+        for snap in query.stream():
+            # 照会後に他のワーカーが取り直した場合は解放しない
+            if self._release_if_expired(snap.id):
+                released += 1
+        
+        if released:
+            print(f"🧹 期限切れリースを解放: {released} 件")
+        return released
+    
+    def _release_if_expired(self, doc_id: str) -> bool:
+        """期限切れのままであればリースを解放 (トランザクション)"""
+        doc_ref = self.get_collection().document(doc_id)
+        
+        @firestore.transactional
+        def _release(transaction):
+            snap = doc_ref.get(transaction=transaction)
+            if not snap.exists:
+                return False
+            if ((snap.to_dict() or {}).get(LEASE_EXPIRES_FIELD) or 0) >= time.time():
+                return False
+            transaction.update(doc_ref, {
+                LEASE_OWNER_FIELD: firestore.DELETE_FIELD,
+                LEASE_EXPIRES_FIELD: firestore.DELETE_FIELD,
+            })
+            return True
+        
+        return _release(self.db.transaction())
+
+
+# グローバルインスタンス (コレクションごと)
+_firestore_clients: Dict[str, FirestoreClient] = {}
+_clients_lock = threading.Lock()
 
 
 def get_firestore_client(config=None) -> FirestoreClient:
     """
     Firestoreクライアントを取得
     
+    コレクション (自治体) ごとに1つのクライアントを返す。
+    接続そのものは全自治体で共有される
+    
     Args:
-        config: Configインスタンス
+        config: Configインスタンス (Noneの場合は自動取得)
     
     Returns:
         FirestoreClient インスタンス
     """
-    global _firestore_client
+    config = config or get_config()
+    key = config.firestore_collection_name
     
-    if _firestore_client is None:
-        _firestore_client = FirestoreClient(config)
+    with _clients_lock:
+        client = _firestore_clients.get(key)
+    if client is not None:
+        return client
     
-    return _firestore_client
+    client = FirestoreClient(config)
+    with _clients_lock:
+        return _firestore_clients.setdefault(key, client)
 
 
 def reload_firestore_client(config=None) -> FirestoreClient:
     """Firestoreクライアントを再初期化"""
-    global _firestore_client
-    _firestore_client = FirestoreClient(config)
-    return _firestore_client
+    config = config or get_config()
+    client = FirestoreClient(config)
+    with _clients_lock:
+        _firestore_clients[config.firestore_collection_name] = client
+    return client
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 変換リースのハートビート
+
+長時間かかる変換 (動画生成など) の間、リースを定期的に延長する。
+延長できなかった場合 (他のワーカーに奪われた場合) は lost を立てる。
+変換側は lost を見て、奪われた記事への生成・書き込みをやめる
+"""
+
+import os
+import socket
+import threading
+import uuid
+from typing import Optional
+
+
+def make_worker_id(prefix: str = "worker") -> str:
+    """
+    ワーカーIDを生成 (ホスト名・PID・ランダム値)
+    
+    Args:
+        prefix: 接頭辞
+    
+    Returns:
+        ワーカーID
+    """
+    return f"{prefix}-{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class LeaseHeartbeat:
+    """リースを定期的に延長するバックグラウンドスレッド"""
+    
+    def __init__(
+        self,
+        firestore_client,
+        doc_id: str,
+        owner: str,
+        ttl_sec: float,
+        interval_sec: Optional[float] = None
+    ):
+        """
+        Args:
+            firestore_client: FirestoreClient
+            doc_id: ドキュメントID
+            owner: ワーカーID
+            ttl_sec: リースの有効期間(秒)
+            interval_sec: 延長間隔(秒) (Noneの場合は ttl_sec の1/3)
+        """
+        self.firestore_client = firestore_client
+        self.doc_id = doc_id
+        self.owner = owner
+        self.ttl_sec = ttl_sec
+        self.interval_sec = interval_sec or max(1.0, ttl_sec / 3)
+        self.lost = False
+        
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def __enter__(self):
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"lease-heartbeat-{self.doc_id[:16]}",
+            daemon=True
+        )
+        self._thread.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval_sec)
+        return False
+    
+    def confirm(self) -> bool:
+        """
+        今すぐ延長してリースを保持しているか確認 (最終結果の書き込み前に使う)
+        
+        Returns:
+            保持していればTrue (一時的なエラーの場合は lost の状態を返す)
+        """
+        if self.lost:
+            return False
+        try:
+            if not self.firestore_client.renew_lease(self.doc_id, self.owner, self.ttl_sec):
+                print(f"⚠️ リースを失いました: {self.doc_id}")
+                self.lost = True
+        except Exception as e:
+            print(f"⚠️ リース確認失敗: {self.doc_id} | {e}")
+        return not self.lost
+    
+    def _run(self):
+        while not self._stop.wait(self.interval_sec):
+            try:
+                if not self.firestore_client.renew_lease(self.doc_id, self.owner, self.ttl_sec):
+                    print(f"⚠️ リースを失いました: {self.doc_id}")
+                    self.lost = True
+                    return
+            except Exception as e:
+                # 一時的なエラーは次の周期で再試行 (有効期間内なら問題ない)
+                print(f"⚠️ リース延長失敗: {self.doc_id} | {e}")
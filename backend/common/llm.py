@@ -3,24 +3,76 @@
 OMO Platform - LLM操作モジュール
 
 Gemini APIの初期化と基本操作を提供
+
+Gemini SDK (google.generativeai / google.genai) の読み込みとクライアントの作成は
+最初の生成時まで遅らせる (Cloud Functions のコールドスタートを短くするため)
 """
 
 import time
 import random
-from typing import Optional, Dict, Any
-import google.generativeai as genai
-from google.generativeai.types import GenerationConfig, HarmCategory, HarmBlockThreshold
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Optional, Dict, Any, TYPE_CHECKING
 
 from .config import get_config
+from .metrics import span
+from .ratelimit import get_rate_limiter
+from .usage import record_usage
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+    from google import genai as google_genai
+    from google.generativeai.types import GenerationConfig
+
 
+# Gemini のレート制限の名前 (環境変数 RATE_LIMIT_<NAME>_CONCURRENCY / RATE_LIMIT_<NAME>_RPM で設定)
+LIMIT_TEXT = "gemini"
+LIMIT_IMAGE = "gemini_image"
+LIMIT_TTS = "gemini_tts"
 
-# デフォルトのセーフティ設定
-DEFAULT_SAFETY_SETTINGS = {
-    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-}
+
+@contextmanager
+def gemini_request(model_name: str, limit: str = LIMIT_TEXT, stage: str = "llm.generate", **labels):
+    """
+    Gemini API の1リクエスト分の実行枠を取得して処理時間を計測
+    
+    Gemini を呼ぶ箇所はすべてこれを通す (全自治体・全スレッドで共有するレート制限を1か所で適用)
+    
+    例:
+        with gemini_request(model_name):
+            response = model.generate_content(prompt)
+    
+    Args:
+        model_name: モデル名 (計測のラベル)
+        limit: レート制限の名前 (テキスト: gemini / 画像: gemini_image / 音声: gemini_tts)
+        stage: 計測の段階名
+        **labels: 計測のラベル
+    """
+    with get_rate_limiter(limit), span(stage, model=model_name, **labels) as s:
+        yield s
+
+
+@lru_cache(maxsize=None)
+def build_safety_settings(threshold: str = "BLOCK_ONLY_HIGH") -> Dict[Any, Any]:
+    """
+    セーフティ設定 (4カテゴリすべてに同じしきい値、しきい値ごとに1回だけ生成)
+    
+    Args:
+        threshold: HarmBlockThreshold の名前 (例: "BLOCK_ONLY_HIGH", "BLOCK_NONE")
+    
+    Returns:
+        {HarmCategory: HarmBlockThreshold}
+    """
+    from google.generativeai.types import HarmCategory, HarmBlockThreshold
+    
+    value = getattr(HarmBlockThreshold, threshold)
+    return {
+        HarmCategory.HARM_CATEGORY_HARASSMENT: value,
+        HarmCategory.HARM_CATEGORY_HATE_SPEECH: value,
+        HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: value,
+        HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: value,
+    }
 
 
 class LLMClient:
@@ -34,11 +86,23 @@ class LLMClient:
         """
         self.config = config or get_config()
         self.model_name = model_name or self.config.gemini_model_name
-        self.model = self._init_gemini()
+        self._model: Optional["genai.GenerativeModel"] = None
+        self._model_lock = threading.Lock()
     
-    def _init_gemini(self) -> genai.GenerativeModel:
+    @property
+    def model(self) -> "genai.GenerativeModel":
+        """GenerativeModel (最初の生成時に初期化)"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._init_gemini()
+        return self._model
+    
+    def _init_gemini(self) -> "genai.GenerativeModel":
         """Gemini APIを初期化"""
         try:
+            import google.generativeai as genai
+            
             api_key = self.config.google_api_key
             genai.configure(api_key=api_key)
             
@@ -57,10 +121,11 @@ class LLMClient:
     def generate(
         self,
         prompt: str,
-        generation_config: Optional[GenerationConfig] = None,
+        generation_config: Optional["GenerationConfig"] = None,
         safety_settings: Optional[Dict] = None,
         retry: int = 3,
-        retry_base_delay: float = 1.0
+        retry_base_delay: float = 1.0,
+        purpose: Optional[str] = None
     ):
         """
         コンテンツを生成
@@ -71,22 +136,25 @@ class LLMClient:
             safety_settings: セーフティ設定
             retry: リトライ回数
             retry_base_delay: リトライ基本遅延(秒)
+            purpose: 用途 (使用量の集計用、例: "long_map")
         
         Returns:
             GenerateContentResponse
         """
         if safety_settings is None:
-            safety_settings = DEFAULT_SAFETY_SETTINGS
+            safety_settings = build_safety_settings()
         
         last_exc: Optional[Exception] = None
         
         for i in range(retry):
             try:
-                response = self.model.generate_content(
-                    prompt,
-                    generation_config=generation_config,
-                    safety_settings=safety_settings,
-                )
+                with gemini_request(self.model_name):
+                    response = self.model.generate_content(
+                        prompt,
+                        generation_config=generation_config,
+                        safety_settings=safety_settings,
+                    )
+                record_usage(self.model_name, response, purpose=purpose)
                 return response
                 
             except Exception as e:
@@ -168,16 +236,18 @@ class LLMClient:
     # ========================================
     
     @staticmethod
-    def get_text_config(max_tokens: int = 16) -> GenerationConfig:
+    def get_text_config(max_tokens: int = 16) -> "GenerationConfig":
         """短いテキスト生成用の設定"""
+        from google.generativeai.types import GenerationConfig
         return GenerationConfig(
             temperature=0.0,
             max_output_tokens=max_tokens
         )
     
     @staticmethod
-    def get_json_config(max_tokens: int = 10240) -> GenerationConfig:
+    def get_json_config(max_tokens: int = 10240) -> "GenerationConfig":
         """JSON生成用の設定"""
+        from google.generativeai.types import GenerationConfig
         return GenerationConfig(
             temperature=0.2,
             top_p=0.9,
@@ -186,8 +256,9 @@ class LLMClient:
         )
     
     @staticmethod
-    def get_creative_config(max_tokens: int = 8192) -> GenerationConfig:
+    def get_creative_config(max_tokens: int = 8192) -> "GenerationConfig":
         """クリエイティブな生成用の設定"""
+        from google.generativeai.types import GenerationConfig
         return GenerationConfig(
             temperature=0.7,
             top_p=0.95,
@@ -196,34 +267,38 @@ class LLMClient:
         )
 
 
-# グローバルインスタンス
-_llm_client: Optional[LLMClient] = None
+# グローバルインスタンス (モデル名ごと)
+_llm_clients: Dict[str, LLMClient] = {}
+_llm_lock = threading.Lock()
 
 
 def get_llm_client(config=None, model_name: Optional[str] = None) -> LLMClient:
     """
     LLMクライアントを取得
     
+    モデル名ごとに1つのクライアントをプロセス全体で共有する
+    (Gemini の設定は自治体に依存しないため、複数自治体でも共有可能)
+    
     Args:
         config: Configインスタンス
-        model_name: モデル名
+        model_name: モデル名 (Noneの場合は設定のデフォルト)
     
     Returns:
         LLMClient インスタンス
     """
-    global _llm_client
+    key = model_name or ""
     
-    if _llm_client is None:
-        _llm_client = LLMClient(config, model_name)
-    
-    return _llm_client
+    with _llm_lock:
+        if key not in _llm_clients:
+            _llm_clients[key] = LLMClient(config, model_name)
+        return _llm_clients[key]
 
 
 def reload_llm_client(config=None, model_name: Optional[str] = None) -> LLMClient:
     """LLMクライアントを再初期化"""
-    global _llm_client
-    _llm_client = LLMClient(config, model_name)
-    return _llm_client
+    with _llm_lock:
+        _llm_clients[model_name or ""] = LLMClient(config, model_name)
+        return _llm_clients[model_name or ""]
 
 
 def create_llm_client(model_name: str, config=None) -> LLMClient:
@@ -238,3 +313,34 @@ def create_llm_client(model_name: str, config=None) -> LLMClient:
         新しいLLMClient インスタンス
     """
     return LLMClient(config, model_name)
+
+
+# google-genai クライアント (APIキーごと、画像生成・TTSで共有)
+_genai_clients: Dict[str, "google_genai.Client"] = {}
+_genai_lock = threading.Lock()
+
+
+def get_genai_client(api_key: str) -> "google_genai.Client":
+    """
+    google-genai クライアントを取得
+    
+    初回の呼び出し時に SDK を読み込んで作成し、以降はプロセス全体で共有する
+    (変換器ごとにクライアントを作らない)
+    
+    Args:
+        api_key: Google API Key
+    
+    Returns:
+        google.genai.Client
+    """
+    with _genai_lock:
+        if api_key not in _genai_clients:
+            from google import genai
+            _genai_clients[api_key] = genai.Client(api_key=api_key)
+        return _genai_clients[api_key]
+
+
+def reset_genai_clients():
+    """共有している google-genai クライアントを破棄 (次の取得時に作り直す)"""
+    with _genai_lock:
+        _genai_clients.clear()
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 処理時間の計測
+
+パイプラインの各段階 (Firestore・Gemini・画像生成・TTS・FFmpeg・保存) の
+処理時間を span で計測し、実行ごとに p50/p95 のレポート (JSON) を出力する。
+Gemini の使用量 (トークン数など、backend.common.usage で記録) も同じレポートに集計する。
+METRICS_OPENMETRICS_PATH を指定すると OpenMetrics 形式のテキストも出力する
+"""
+
+import json
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+
+# レポートの出力先 (既定: storage/metrics)
+DEFAULT_REPORT_DIR = Path(__file__).parent.parent.parent / "storage" / "metrics"
+
+# 系列ごとに保持する計測値の上限 (超えたらリザーバサンプリング)
+MAX_SAMPLES = 10000
+
+# 系列のキー: (段階名, ((ラベル名, 値), ...))
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    パーセンタイル (最近傍順位法)
+    
+    Args:
+        values: 計測値 (ソート済み)
+        q: 0〜1
+    
+    Returns:
+        パーセンタイル値 (空の場合は0)
+    """
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, math.ceil(q * len(values)) - 1))
+    return values[index]
+
+
+class _Series:
+    """1系列分の計測値"""
+    
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.amount = 0.0
+        self.samples: List[float] = []
+    
+    def add(self, seconds: float, ok: bool, amount: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.amount += amount
+        if not ok:
+            self.errors += 1
+        
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(seconds)
+        else:
+            index = random.randrange(self.count)
+            if index < MAX_SAMPLES:
+                self.samples[index] = seconds
+
+
+class Span:
+    """計測中の区間 (with span(...) as s で取得)"""
+    
+    def __init__(self, stage: str, labels: Dict[str, Any]):
+        self.stage = stage
+        self.labels = labels
+        self.ok = True
+        self.amount = 0.0  # 処理量 (バイト数など、スループット計算用)
+        self.started = time.perf_counter()
+
+
+class MetricsRecorder:
+    """段階ごとの処理時間を集計"""
+    
+    def __init__(self):
+        self._series: Dict[SeriesKey, _Series] = {}
+        self._usage: Dict[Tuple[Tuple[str, str], ...], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+    
+    @contextmanager
+    def span(self, stage: str, **labels):
+        """
+        区間の処理時間を計測
+        
+        例外が発生した区間はエラーとして数える
+        (戻り値で失敗を返す処理は s.ok = False を設定)
+        
+        Args:
+            stage: 段階名 (例: "llm.generate", "storage.save")
+            **labels: ラベル (例: model="gemini-2.5-flash")
+        """
+        s = Span(stage, labels)
+        try:
+            yield s
+        except BaseException:
+            s.ok = False
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - s.started, s.ok, s.amount, **s.labels)
+    
+    def record(self, stage: str, seconds: float, ok: bool = True, amount: float = 0.0, **labels):
+        """
+        計測値を追加
+        
+        Args:
+            stage: 段階名
+            seconds: 処理時間(秒)
+            ok: 成功したか
+            amount: 処理量 (バイト数など)
+            **labels: ラベル
+        """
+        key = (stage, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None)))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.add(seconds, ok, amount)
+    
+    def record_usage(self, usage: Dict[str, float], **labels):
+        """
+        Gemini の使用量を加算
+        
+        Args:
+            usage: {項目: 値} (calls, prompt_tokens, candidate_tokens など)
+            **labels: ラベル (model, transformer, purpose)
+        """
+        key = tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+        with self._lock:
+            totals = self._usage.setdefault(key, {})
+            for field, value in usage.items():
+                totals[field] = totals.get(field, 0) + value
+    
+    def reset(self):
+        """計測値を消去して計測を再開"""
+        with self._lock:
+            self._series.clear()
+            self._usage.clear()
+            self.started_at = time.time()
+            self._started = time.perf_counter()
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        集計結果
+        
+        Returns:
+            {"started_at", "elapsed_sec", "stages": [{stage, labels, count, errors, p50, p95, ...}],
+             "usage": [{labels, calls, prompt_tokens, ...}] (トークン数の多い順)}
+        """
+        elapsed = time.perf_counter() - self._started
+        
+        with self._lock:
+            items = [(key, s.count, s.errors, s.total, s.max, s.amount, sorted(s.samples)) for key, s in self._series.items()]
+            usage = [dict(totals, labels=dict(key)) for key, totals in self._usage.items()]
+        
+        stages = []
+        for (stage, labels), count, errors, total, max_sec, amount, samples in sorted(items):
+            entry = {
+                "stage": stage,
+                "labels": dict(labels),
+                "count": count,
+                "errors": errors,
+                "total_sec": round(total, 3),
+                "mean_sec": round(total / count, 3) if count else 0.0,
+                "p50_sec": round(percentile(samples, 0.50), 3),
+                "p95_sec": round(percentile(samples, 0.95), 3),
+                "max_sec": round(max_sec, 3),
+                "per_min": round(count / elapsed * 60, 2) if elapsed > 0 else 0.0,
+            }
+            if amount:
+                entry["amount"] = amount
+                entry["amount_per_sec"] = round(amount / total, 1) if total > 0 else 0.0
+            stages.append(entry)
+        
+        return {
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "elapsed_sec": round(elapsed, 3),
+            "stages": stages,
+            "usage": sorted(usage, key=lambda u: u.get("total_tokens", 0), reverse=True),
+        }
+    
+    def to_openmetrics(self, prefix: str = "omo") -> str:
+        """
+        OpenMetrics 形式のテキスト
+        
+        Args:
+            prefix: メトリクス名の接頭辞
+        
+        Returns:
+            OpenMetrics テキスト (# EOF で終わる)
+        """
+        summary = self.summary()
+        duration = f"{prefix}_stage_duration_seconds"
+        errors = f"{prefix}_stage_errors"
+        
+        lines = [
+            f"# TYPE {duration} summary",
+            f"# UNIT {duration} seconds",
+            f"# HELP {duration} Pipeline stage duration.",
+        ]
+        for entry in summary["stages"]:
+            labels = _format_labels(entry["stage"], entry["labels"])
+            for q, field in (("0.5", "p50_sec"), ("0.95", "p95_sec")):
+                lines.append(f'{duration}{{{labels},quantile="{q}"}} {entry[field]}')
+            lines.append(f"{duration}_sum{{{labels}}} {entry['total_sec']}")
+            lines.append(f"{duration}_count{{{labels}}} {entry['count']}")
+        
+        lines += [
+            f"# TYPE {errors} counter",
+            f"# HELP {errors} Pipeline stage failures.",
+        ]
+        for entry in summary["stages"]:
+            labels = _format_labels(entry["stage"], entry["labels"])
+            lines.append(f"{errors}_total{{{labels}}} {entry['errors']}")
+        
+        tokens = f"{prefix}_gemini_tokens"
+        lines += [
+            f"# TYPE {tokens} counter",
+            f"# HELP {tokens} Gemini tokens by model and transformer.",
+        ]
+        for entry in summary["usage"]:
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(entry["labels"].items()))
+            for kind in ("prompt", "candidate", "thoughts"):
+                lines.append(f'{tokens}_total{{{labels},kind="{kind}"}} {entry.get(f"{kind}_tokens", 0)}')
+        
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+    
+    def write_report(self, run_name: str, report_dir: Optional[str] = None) -> Optional[str]:
+        """
+        実行レポートを出力
+        
+        JSON は METRICS_REPORT_DIR (既定: storage/metrics) に、
+        OpenMetrics は METRICS_OPENMETRICS_PATH 指定時のみ出力する
+        
+        Args:
+            run_name: 実行名 (例: "transform-moriya")
+            report_dir: 出力先ディレクトリ (Noneの場合は環境変数または既定値)
+        
+        Returns:
+            JSONレポートのパス (計測値がない場合はNone)
+        """
+        summary = self.summary()
+        if not summary["stages"] and not summary["usage"]:
+            return None
+        
+        summary["run"] = run_name
+        
+        directory = Path(report_dir or os.getenv("METRICS_REPORT_DIR") or DEFAULT_REPORT_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.fromtimestamp(self.started_at).strftime("%Y%m%d-%H%M%S")
+        path = directory / f"{run_name}-{stamp}.json"
+        
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        
+        openmetrics_path = os.getenv("METRICS_OPENMETRICS_PATH")
+        if openmetrics_path:
+            Path(openmetrics_path).parent.mkdir(parents=True, exist_ok=True)
+            with open(openmetrics_path, "w", encoding="utf-8") as f:
+                f.write(self.to_openmetrics())
+        
+        print(f"📊 計測レポート: {path}")
+        for entry in summary["stages"]:
+            labels = ",".join(f"{k}={v}" for k, v in entry["labels"].items())
+            print(
+                f"   {entry['stage']}{f' [{labels}]' if labels else ''}: "
+                f"{entry['count']} 回 p50={entry['p50_sec']}s p95={entry['p95_sec']}s "
+                f"計 {entry['total_sec']}s" + (f" (失敗 {entry['errors']})" if entry["errors"] else "")
+            )
+        
+        for entry in summary["usage"]:
+            labels = ",".join(f"{k}={v}" for k, v in entry["labels"].items())
+            print(
+                f"   🪙 [{labels}]: {entry.get('calls', 0)} 回 "
+                f"入力 {entry.get('prompt_tokens', 0)} / 出力 {entry.get('candidate_tokens', 0)} / 思考 {entry.get('thoughts_tokens', 0)} tokens"
+                + (f", 画像 {entry['images']}枚" if entry.get("images") else "")
+                + (f", 音声 {entry['audio_sec']:.1f}秒" if entry.get("audio_sec") else "")
+            )
+        
+        return str(path)
+
+
+def _format_labels(stage: str, labels: Dict[str, str]) -> str:
+    """OpenMetrics のラベル文字列"""
+    pairs = [("stage", stage)] + sorted(labels.items())
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# グローバルインスタンス
+_metrics: Optional[MetricsRecorder] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRecorder:
+    """
+    プロセス共通の計測器を取得
+    
+    Returns:
+        MetricsRecorder インスタンス
+    """
+    global _metrics
+    
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRecorder()
+    
+    return _metrics
+
+
+def span(stage: str, **labels):
+    """
+    区間の処理時間を計測 (get_metrics().span の短縮形)
+    
+    例:
+        with span("llm.generate", model=model_name):
+            response = model.generate_content(prompt)
+    """
+    return get_metrics().span(stage, **labels)
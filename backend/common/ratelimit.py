@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - レート制限
+
+外部API (Gemini など) の同時実行数と毎分リクエスト数をプロセス全体で制限する。
+複数自治体を1プロセスで処理する場合も、APIクォータは全自治体で共有される
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from .metrics import get_metrics
+
+
+class RateLimiter:
+    """同時実行数 + 毎分リクエスト数の制限"""
+    
+    def __init__(self, name: str, max_concurrency: int = 0, requests_per_minute: float = 0):
+        """
+        Args:
+            name: 制限対象の名前 (ログ用)
+            max_concurrency: 最大同時実行数 (0以下は無制限)
+            requests_per_minute: 毎分リクエスト数 (0以下は無制限)
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        
+        self._semaphore = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+        
+        # トークンバケット (最大1分間分までバースト可)
+        self._lock = threading.Lock()
+        self._capacity = max(1.0, requests_per_minute) if requests_per_minute > 0 else 0.0
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+    
+    def acquire(self):
+        """実行枠を取得 (空くまで待機)"""
+        started = time.perf_counter()
+        
+        if self._semaphore:
+            self._semaphore.acquire()
+        
+        try:
+            self._wait_for_token()
+        except BaseException:
+            if self._semaphore:
+                self._semaphore.release()
+            raise
+        
+        # 制限による待ち時間 (APIの処理時間と分けて計測)
+        get_metrics().record("ratelimit.wait", time.perf_counter() - started, name=self.name)
+    
+    def release(self):
+        """実行枠を解放"""
+        if self._semaphore:
+            self._semaphore.release()
+    
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+    
+    def _wait_for_token(self):
+        """毎分リクエスト数の制限 (トークンが補充されるまで待機)"""
+        if self.requests_per_minute <= 0:
+            return
+        
+        rate_per_sec = self.requests_per_minute / 60.0
+        
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * rate_per_sec)
+                self._updated = now
+                
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                
+                wait = (1.0 - self._tokens) / rate_per_sec
+            
+            time.sleep(wait)
+
+
+# グローバルインスタンス (名前ごと)
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    name: str,
+    max_concurrency: Optional[int] = None,
+    requests_per_minute: Optional[float] = None
+) -> RateLimiter:
+    """
+    名前ごとのレート制限を取得
+    
+    初回作成時の設定は環境変数 RATE_LIMIT_<NAME>_CONCURRENCY / RATE_LIMIT_<NAME>_RPM が優先
+    
+    Args:
+        name: 制限対象の名前 (例: "gemini", "gemini_image")
+        max_concurrency: 最大同時実行数 (初回のみ有効)
+        requests_per_minute: 毎分リクエスト数 (初回のみ有効)
+    
+    Returns:
+        RateLimiter インスタンス
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        
+        if limiter is None:
+            env_prefix = f"RATE_LIMIT_{name.upper()}"
+            concurrency = int(os.getenv(f"{env_prefix}_CONCURRENCY", max_concurrency or 0))
+            rpm = float(os.getenv(f"{env_prefix}_RPM", requests_per_minute or 0))
+            limiter = RateLimiter(name, concurrency, rpm)
+            _limiters[name] = limiter
+        
+        return limiter
@@ -8,17 +8,24 @@ Cloud Storage (GCS) またはローカルファイルシステムへの保存を
 import os
 from pathlib import Path
 from typing import Optional
-from google.cloud import storage
+from urllib.parse import quote
 from backend.common.config import get_config
+from backend.common.metrics import span
 
 # ローカル保存先 (エミュレータ用)
 LOCAL_STORAGE_DIR = Path(__file__).parent.parent.parent / "storage"
 
 def get_storage_client():
-    """GCSクライアントを取得"""
+    """GCSクライアントを取得 (google.cloud.storage はGCS保存時まで読み込まない)"""
+    from google.cloud import storage
     return storage.Client()
 
-def save_file(data: bytes, filename: str, content_type: str = "application/octet-stream") -> str:
+def save_file(
+    data: bytes,
+    filename: str,
+    content_type: str = "application/octet-stream",
+    cache_control: Optional[str] = None
+) -> str:
     """
     ファイルを保存する
     
@@ -26,6 +33,7 @@ def save_file(data: bytes, filename: str, content_type: str = "application/octet
         data: ファイルデータ (bytes)
         filename: 保存ファイル名 (例: "images/foo.png")
         content_type: MIMEタイプ
+        cache_control: GCSオブジェクトの Cache-Control (Noneの場合はバケットの既定)
     
     Returns:
         保存先パス (gs://... または local://...)
@@ -33,10 +41,37 @@ def save_file(data: bytes, filename: str, content_type: str = "application/octet
     config = get_config()
     
     # エミュレータ環境、またはデバッグモードでGCSバケット未設定の場合はローカル保存
-    if os.getenv("FIRESTORE_EMULATOR_HOST") or not os.getenv("GCS_BUCKET_NAME"):
-        return _save_local(data, filename)
+    if _use_local_storage():
+        with span("storage.save", backend="local") as s:
+            s.amount = len(data)
+            return _save_local(data, filename)
     else:
-        return _save_gcs(data, filename, content_type, os.getenv("GCS_BUCKET_NAME"))
+        with span("storage.save", backend="gcs") as s:
+            s.amount = len(data)
+            return _save_gcs(data, filename, content_type, os.getenv("GCS_BUCKET_NAME"), cache_control)
+
+def load_file(filename: str) -> Optional[bytes]:
+    """
+    save_file で保存したファイルを読み込む
+    
+    Args:
+        filename: 保存ファイル名 (例: "feeds/moriya/feed.json")
+    
+    Returns:
+        ファイルデータ (存在しない場合はNone)
+    """
+    if _use_local_storage():
+        with span("storage.load", backend="local"):
+            file_path = LOCAL_STORAGE_DIR / filename
+            return file_path.read_bytes() if file_path.is_file() else None
+    else:
+        with span("storage.load", backend="gcs"):
+            blob = get_storage_client().bucket(os.getenv("GCS_BUCKET_NAME")).blob(filename)
+            return blob.download_as_bytes() if blob.exists() else None
+
+def _use_local_storage() -> bool:
+    """ローカル保存するかどうか (エミュレータ環境、またはGCSバケット未設定)"""
+    return bool(os.getenv("FIRESTORE_EMULATOR_HOST") or not os.getenv("GCS_BUCKET_NAME"))
 
 def _save_local(data: bytes, filename: str) -> str:
     """ローカルに保存"""
@@ -50,13 +85,53 @@ def _save_local(data: bytes, filename: str) -> str:
     print(f"💾 ローカル保存: {file_path}")
     return f"local://{file_path}"
 
-def _save_gcs(data: bytes, filename: str, content_type: str, bucket_name: str) -> str:
+def _save_gcs(data: bytes, filename: str, content_type: str, bucket_name: str, cache_control: Optional[str] = None) -> str:
     """GCSに保存"""
     client = get_storage_client()
     bucket = client.bucket(bucket_name)
     blob = bucket.blob(filename)
+    if cache_control:
+        blob.cache_control = cache_control
     
     blob.upload_from_string(data, content_type=content_type)
     
     print(f"☁️ GCS保存: gs://{bucket_name}/{filename}")
     return f"gs://{bucket_name}/{filename}"
+
+def public_url(storage_path: str, local_prefix: str = "/media") -> Optional[str]:
+    """
+    保存先パスを配信用URLに変換
+    
+    gs://バケット/パス は MEDIA_BASE_URL (CDN等) があればその配下、
+    なければ https://storage.googleapis.com/バケット/パス。
+    local://... はローカル保存先からの相対パスを local_prefix 配下に置く
+    
+    Args:
+        storage_path: save_file の戻り値 (gs://... または local://...)
+        local_prefix: ローカル保存ファイルのURL接頭辞
+    
+    Returns:
+        URL (変換できない場合はNone)
+    """
+    if not isinstance(storage_path, str):
+        return None
+    
+    if storage_path.startswith("gs://"):
+        bucket, _, path = storage_path[len("gs://"):].partition("/")
+        base_url = os.getenv("MEDIA_BASE_URL")
+        if base_url:
+            return f"{base_url.rstrip('/')}/{quote(path)}"
+        return f"https://storage.googleapis.com/{bucket}/{quote(path)}"
+    
+    if storage_path.startswith("local://"):
+        file_path = Path(storage_path[len("local://"):])
+        try:
+            relative = file_path.resolve().relative_to(LOCAL_STORAGE_DIR.resolve())
+        except ValueError:
+            return None
+        return f"{local_prefix.rstrip('/')}/{quote(relative.as_posix())}"
+    
+    if storage_path.startswith(("http://", "https://")):
+        return storage_path
+    
+    return None
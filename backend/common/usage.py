@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - Gemini使用量の記録
+
+Gemini呼び出しごとのトークン数・画像枚数・音声秒数を
+記事ごとの台帳 (UsageLedger) と実行全体の集計 (計測レポート) に記録する。
+台帳と変換器名は contextvars で受け渡すため、呼び出し側で引き回す必要はない
+(スレッドプールで実行する場合は contextvars.copy_context() で引き継ぐ)
+"""
+
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+from .metrics import get_metrics
+
+
+# 使用量の項目
+USAGE_FIELDS = ("calls", "prompt_tokens", "candidate_tokens", "thoughts_tokens", "total_tokens", "images", "audio_sec")
+
+# 現在の記事の台帳・変換器名
+_current_ledger: contextvars.ContextVar[Optional["UsageLedger"]] = contextvars.ContextVar("usage_ledger", default=None)
+_current_transformer: contextvars.ContextVar[str] = contextvars.ContextVar("usage_transformer", default="")
+
+
+def _empty_usage() -> Dict[str, float]:
+    return {field: 0 for field in USAGE_FIELDS}
+
+
+def extract_token_counts(response) -> Dict[str, int]:
+    """
+    レスポンスの usage_metadata からトークン数を取得
+    
+    google.generativeai / google.genai のどちらのレスポンスにも対応
+    
+    Args:
+        response: GenerateContentResponse
+    
+    Returns:
+        {"prompt_tokens", "candidate_tokens", "thoughts_tokens", "total_tokens"}
+    """
+    meta = getattr(response, "usage_metadata", None)
+    if meta is None:
+        return {}
+    
+    def _get(name: str) -> int:
+        return int(getattr(meta, name, 0) or 0)
+    
+    counts = {
+        "prompt_tokens": _get("prompt_token_count"),
+        "candidate_tokens": _get("candidates_token_count"),
+        "thoughts_tokens": _get("thoughts_token_count"),
+        "total_tokens": _get("total_token_count"),
+    }
+    if not counts["total_tokens"]:
+        counts["total_tokens"] = counts["prompt_tokens"] + counts["candidate_tokens"] + counts["thoughts_tokens"]
+    return counts
+
+
+class UsageLedger:
+    """1記事分の使用量 (変換器 → モデル → 項目)"""
+    
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+    
+    def add(self, transformer: str, model: str, usage: Dict[str, float]):
+        """
+        使用量を加算
+        
+        Args:
+            transformer: 変換タイプ (変換器の外からの呼び出しは "other")
+            model: モデル名
+            usage: {項目: 値}
+        """
+        with self._lock:
+            models = self._entries.setdefault(transformer or "other", {})
+            totals = models.setdefault(model, _empty_usage())
+            for field, value in usage.items():
+                totals[field] = totals.get(field, 0) + value
+    
+    def for_transformer(self, transformer: str) -> Dict[str, Dict[str, float]]:
+        """
+        変換器ごとの使用量
+        
+        Returns:
+            {モデル名: {項目: 値}}
+        """
+        with self._lock:
+            models = self._entries.get(transformer, {})
+            return {
+                model: {k: round(v, 2) if isinstance(v, float) else v for k, v in totals.items()}
+                for model, totals in models.items()
+            }
+    
+    def transformers(self):
+        """使用量のある変換タイプ"""
+        with self._lock:
+            return list(self._entries)
+
+
+@contextmanager
+def usage_scope(ledger: UsageLedger):
+    """
+    この範囲の Gemini 呼び出しを ledger に記録
+    
+    Args:
+        ledger: 記事の台帳
+    """
+    token = _current_ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _current_ledger.reset(token)
+
+
+@contextmanager
+def transformer_scope(transform_type: str):
+    """
+    この範囲の Gemini 呼び出しを変換タイプに紐づける
+    
+    Args:
+        transform_type: 変換タイプ (例: "text_script")
+    """
+    token = _current_transformer.set(transform_type)
+    try:
+        yield
+    finally:
+        _current_transformer.reset(token)
+
+
+def record_usage(
+    model: str,
+    response=None,
+    images: int = 0,
+    audio_sec: float = 0.0,
+    purpose: Optional[str] = None
+):
+    """
+    Gemini 呼び出し1回分の使用量を記録
+    
+    Args:
+        model: モデル名
+        response: GenerateContentResponse (トークン数の取得元、Noneの場合は0)
+        images: 生成した画像枚数
+        audio_sec: 生成した音声の秒数
+        purpose: 用途 (例: "telop", "scene_count") プロンプト別の集計用
+    """
+    try:
+        usage: Dict[str, Any] = {"calls": 1, "images": images, "audio_sec": audio_sec}
+        usage.update(extract_token_counts(response))
+        
+        transformer = _current_transformer.get()
+        
+        ledger = _current_ledger.get()
+        if ledger is not None:
+            ledger.add(transformer, model, usage)
+        
+        get_metrics().record_usage(usage, model=model, transformer=transformer or None, purpose=purpose)
+    except Exception as e:
+        # 記録の失敗で変換を止めない
+        print(f"⚠️ 使用量の記録失敗 ({model}): {e}")
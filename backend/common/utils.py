@@ -8,7 +8,8 @@ OMO Platform - ユーティリティモジュール
 import hashlib
 import re
 import json
-from typing import Optional, Dict, Any
+import unicodedata
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime, timezone
 
 
@@ -60,6 +61,222 @@ def compute_quick_hash(
     return hashlib.sha256(base.encode("utf-8")).hexdigest()
 
 
+# ========================================
+# 意味的フィンガープリント (変更検出)
+# ========================================
+
+# ページ共通部品 (パンくず・フッター・ナビゲーション) とみなす行
+BOILERPLATE_LINE_PATTERNS = [
+    re.compile(r"^(ホーム|トップページ|TOP)\s*[>＞»]"),
+    re.compile(r"[>＞»].*[>＞»]"),  # パンくずリスト
+    re.compile(r"^(このページの|ページの)?(先頭|トップ)へ(戻る)?$"),
+    re.compile(r"^(印刷|印刷する|ページを印刷)$"),
+    re.compile(r"^(更新日|最終更新日|掲載日|ページ番号|ページID)[:：]?"),
+    re.compile(r"^(このページに関する)?お問い合わせ(先)?$"),
+    re.compile(r"(Adobe|Acrobat)\s*Reader"),
+    re.compile(r"^PDF(形式の)?ファイルをご覧いただく"),
+    re.compile(r"^(このページの情報は)?役に立ちましたか"),
+    re.compile(r"^(閲覧数|アクセス数)[:：]?"),
+]
+
+# 日付・時刻
+DATE_PATTERNS = [
+    re.compile(r"(令和|平成)(\d+|元)年(\d+)月(\d+)日"),
+    re.compile(r"(\d{4})年(\d+)月(\d+)日"),
+    re.compile(r"(\d{4})[/.-](\d{1,2})[/.-](\d{1,2})"),
+    re.compile(r"(\d+)月(\d+)日"),
+    re.compile(r"(\d{1,2})[:時](\d{2})分?"),
+]
+
+NUMBER_PATTERN = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+# フィールドごとの重み (合計が閾値以上なら意味のある変更)
+FINGERPRINT_FIELD_WEIGHTS = {
+    "title": 3.0,
+    "dates": 3.0,
+    "numbers": 2.0,
+    "pdfs": 2.0,
+    "pdf_text": 2.0,
+    "body": 1.0,
+    "published": 1.0,
+    "images": 0.5,
+}
+SEMANTIC_CHANGE_THRESHOLD = 1.0
+
+# フィンガープリントの計算方法のバージョン
+FINGERPRINT_VERSION = 2
+# 前のバージョンから計算方法を変えたフィールド (バージョンが違う保存済みの値とは比較しない)
+RECOMPUTED_FIELDS = ("dates",)
+
+# 変換の入力に影響するフィールド
+SEMANTIC_FIELDS = ("title", "body", "dates", "numbers", "pdfs")
+
+# PDF取り込み時のみ付与されるフィールド (未取り込みの記事のフィンガープリントは変えない)
+OPTIONAL_SEMANTIC_FIELDS = ("pdf_text",)
+
+
+def strip_boilerplate_lines(text: str) -> List[str]:
+    """
+    NFKC正規化し、空行と共通部品の行 (パンくず・更新日など) を除いた行
+    
+    Args:
+        text: 入力テキスト
+    
+    Returns:
+        本文の行のリスト
+    """
+    lines = []
+    for line in unicodedata.normalize("NFKC", text or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if any(p.search(line) for p in BOILERPLATE_LINE_PATTERNS):
+            continue
+        lines.append(line)
+    return lines
+
+
+def normalize_for_fingerprint(text: str) -> str:
+    """
+    フィンガープリント用にテキストを正規化
+    
+    NFKC正規化・共通部品の行の除去・空白の除去を行う
+    
+    Args:
+        text: 入力テキスト
+    
+    Returns:
+        正規化されたテキスト
+    """
+    if not text:
+        return ""
+    
+    text = "".join(strip_boilerplate_lines(text))
+    
+    # 数値の桁区切りと空白・改行の揺れを無視
+    text = re.sub(r"(?<=\d),(?=\d{3})", "", text)
+    return re.sub(r"\s+", "", text).lower()
+
+
+def extract_dates(text: str) -> List[str]:
+    """
+    テキストから日付・時刻を抽出 (出現順、重複除去)
+    
+    Args:
+        text: 入力テキスト (NFKC正規化済みを推奨)
+    
+    Returns:
+        日付・時刻文字列のリスト
+    """
+    found = []
+    remaining = text or ""
+    
+    for pattern in DATE_PATTERNS:
+        for m in pattern.finditer(remaining):
+            value = "-".join(g for g in m.groups() if g)
+            if value not in found:
+                found.append(value)
+        # 同じ箇所を短いパターンで二重に拾わないよう除去
+        remaining = pattern.sub(" ", remaining)
+    
+    return found
+
+
+def extract_numbers(text: str) -> List[str]:
+    """
+    テキストから数値を抽出 (金額・人数・電話番号など)
+    
+    Args:
+        text: 入力テキスト (NFKC正規化済みを推奨)
+    
+    Returns:
+        数値文字列のリスト (カンマ除去済み)
+    """
+    return [m.group(0).replace(",", "") for m in NUMBER_PATTERN.finditer(text or "")]
+
+
+def fingerprint_dates(body_text: str) -> str:
+    """
+    本文の日付・時刻のハッシュ (意味的フィンガープリントの dates)
+    
+    日付は行内の空白を残して抽出する (共通部品の「最終更新日」などは含めない)
+    
+    Args:
+        body_text: 本文テキスト
+    
+    Returns:
+        SHA256ハッシュ(先頭16文字)
+    """
+    return compute_content_hash(*extract_dates("\n".join(strip_boilerplate_lines(body_text))))[:16]
+
+
+def compute_semantic_fingerprint(
+    body_text: str,
+    pdf_links: list,
+    image_links: list,
+    page_title: str = "",
+    published_date: str = ""
+) -> Dict[str, str]:
+    """
+    意味的フィンガープリントを計算 (フィールドごとのハッシュ)
+    
+    Args:
+        body_text: 本文テキスト
+        pdf_links: PDFリンクのリスト
+        image_links: 画像リンクのリスト
+        page_title: ページタイトル
+        published_date: 公開日
+    
+    Returns:
+        {フィールド名: SHA256ハッシュ(先頭16文字)}
+    """
+    normalized_body = normalize_for_fingerprint(body_text)
+    
+    def _h(*parts) -> str:
+        return compute_content_hash(*parts)[:16]
+    
+    return {
+        "title": _h(normalize_for_fingerprint(page_title)),
+        "body": _h(normalized_body),
+        "dates": fingerprint_dates(body_text),
+        "numbers": _h(*extract_numbers(normalized_body)),
+        "published": _h(normalize_for_fingerprint(published_date)),
+        "pdfs": _h(*sorted(set(pdf_links or []))),
+        "images": _h(*sorted(set(image_links or []))),
+        "version": FINGERPRINT_VERSION,
+    }
+
+
+def classify_content_change(
+    old_fingerprint: Optional[Dict[str, str]],
+    new_fingerprint: Dict[str, str]
+) -> Tuple[str, List[str], float]:
+    """
+    フィンガープリントの差分から変更の種類を判定
+    
+    Args:
+        old_fingerprint: 保存済みのフィンガープリント
+        new_fingerprint: 新しいフィンガープリント
+    
+    Returns:
+        (種類, 変更されたフィールド, スコア)
+        種類は "semantic" (再変換が必要) または "cosmetic" (表記揺れ・共通部品のみ)
+    """
+    if not old_fingerprint:
+        return "semantic", ["no_previous_fingerprint"], SEMANTIC_CHANGE_THRESHOLD
+    
+    # 計算方法が変わったフィールドは比較しない (内容の変更は body などで検出される)
+    skipped = RECOMPUTED_FIELDS if old_fingerprint.get("version") != new_fingerprint.get("version") else ()
+    changed = [
+        field for field in FINGERPRINT_FIELD_WEIGHTS
+        if field not in skipped and old_fingerprint.get(field) != new_fingerprint.get(field)
+    ]
+    score = sum(FINGERPRINT_FIELD_WEIGHTS[field] for field in changed)
+    
+    kind = "semantic" if score >= SEMANTIC_CHANGE_THRESHOLD else "cosmetic"
+    return kind, changed, score
+
+
 # ========================================
 # JSON処理
 # ========================================
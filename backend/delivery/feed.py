@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 静的フィード (JSON Feed / RSS)
+
+変換済みの最新記事 (簡潔テキスト・画像・動画のURL) を静的ファイルとしてストレージに書き出す。
+配信先はデータベースを参照せず、CDN・静的ファイルとして読むだけで済む。
+
+前回の書き出し内容はマニフェスト (manifest.json) に残しておき、
+記事のバージョン (quick_hash + transformedAt) が変わったエントリだけ Firestore から読み直す。
+並びも内容も変わらなければ何も書き出さない
+"""
+
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from xml.sax.saxutils import escape
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.common.firestore import get_firestore_client
+from backend.common.metrics import span
+from backend.common.storage import load_file, public_url, save_file
+from backend.search.tokenizer import parse_date
+
+
+# フィードの保存先 (feeds/<自治体>/...)
+FEED_DIR = "feeds"
+FEED_JSON = "feed.json"
+FEED_RSS = "rss.xml"
+MANIFEST = "manifest.json"
+
+# マニフェストの形式 (変わったら全エントリを作り直す)
+MANIFEST_VERSION = 3
+
+# 公開日 (日付のみ) のタイムゾーン
+PUBLISHED_TZ = timezone(timedelta(hours=9))
+
+# 既定の件数
+DEFAULT_MAX_ITEMS = 50
+
+# 一覧 (変更検出) で読むフィールド
+VERSION_FIELDS = ["quick_hash", "transformedAt"]
+
+# エントリに載せる画像・動画 (優先するアスペクト比の順)
+IMAGE_KEYS = ("image_path_1x1", "image_path_16x9", "image_path_9x16")
+VIDEO_KEYS = ("video_path_9_16", "video_path_16_9", "video_path_1_1")
+
+# 画像のバリアントがある場合に載せる形式 (フィードリーダーの対応が広い順)
+FEED_IMAGE_FORMATS = ("jpeg", "webp")
+
+# enclosure の MIMEタイプ (拡張子から判定)
+IMAGE_MIME_TYPES = {".jpg": "image/jpeg", ".webp": "image/webp", ".avif": "image/avif"}
+
+
+def entry_version(data: Dict[str, Any]) -> str:
+    """
+    エントリのバージョン (本文が変わると quick_hash が、変換結果が変わると transformedAt が変わる)
+    
+    Args:
+        data: ドキュメントの辞書
+    """
+    transformed_at = data.get("transformedAt")
+    stamp = transformed_at.isoformat() if isinstance(transformed_at, datetime) else str(transformed_at or "")
+    return f"{data.get('quick_hash') or ''}:{stamp}"
+
+
+def _first_url(result: Optional[Dict[str, Any]], keys) -> Optional[str]:
+    """変換結果から最初に見つかったメディアのURL"""
+    if not isinstance(result, dict):
+        return None
+    for key in keys:
+        url = public_url(result.get(key))
+        if url:
+            return url
+    return None
+
+
+def _image_url(result: Optional[Dict[str, Any]]) -> Optional[str]:
+    """エントリの画像URL (バリアントがあれば元の PNG より軽い形式の最大幅)"""
+    if not isinstance(result, dict):
+        return None
+    variants = result.get("variants") or {}
+    for key in IMAGE_KEYS:
+        candidates = variants.get(key.replace("image_path_", ""), [])
+        for fmt in FEED_IMAGE_FORMATS:
+            sized = sorted((v for v in candidates if v.get("format") == fmt), key=lambda v: v.get("width", 0), reverse=True)
+            url = public_url(sized[0].get("path")) if sized else None
+            if url:
+                return url
+    return _first_url(result, IMAGE_KEYS)
+
+
+def _published_at(data: Dict[str, Any]) -> Optional[str]:
+    """
+    記事の公開日時 (ISO 8601)
+    
+    お知らせの公開日 (日付のみ、日本時間の0時とする) を使い、
+    解釈できない場合はスクレイプ日時
+    """
+    published = parse_date(data.get("published_date_str") or "")
+    if published:
+        return datetime.fromisoformat(published).replace(tzinfo=PUBLISHED_TZ).isoformat()
+    scraped_at = data.get("scraped_at")
+    return scraped_at.isoformat() if isinstance(scraped_at, datetime) else None
+
+
+def build_entry(doc_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    記事からフィードのエントリ (JSON Feed の item 形式) を作成
+    
+    Args:
+        doc_id: ドキュメントID
+        data: ドキュメントの辞書
+    
+    Returns:
+        エントリ
+    """
+    transformed_content = data.get("transformedContent") or {}
+    transformed_at = data.get("transformedAt")
+    
+    simple = transformed_content.get("text_simple") or {}
+    entry = {
+        "id": doc_id,
+        "url": data.get("original_url", ""),
+        "title": data.get("title", ""),
+        "content_text": simple.get("content") or data.get("title", ""),
+        "date_published": _published_at(data),
+        # 変換し直した日時 (再変換・重複記事の再利用で公開日は変えない)
+        "date_modified": transformed_at.isoformat() if isinstance(transformed_at, datetime) else None,
+        "tags": [data["category"]] if data.get("category") else [],
+    }
+    
+    image = _image_url(transformed_content.get("image_single"))
+    if image:
+        entry["image"] = image
+    
+    video = _first_url(transformed_content.get("video_short"), VIDEO_KEYS)
+    if video:
+        entry["attachments"] = [{"url": video, "mime_type": "video/mp4"}]
+    
+    return entry
+
+
+class FeedBuilder:
+    """静的フィードの差分更新"""
+    
+    def __init__(self, config, firestore_client=None):
+        """
+        Args:
+            config: Configインスタンス
+            firestore_client: FirestoreClient (Noneの場合は自治体のコレクションで取得)
+        """
+        self.config = config
+        self.firestore_client = firestore_client or get_firestore_client(config)
+        
+        feed_config = config.get_delivery_config("feed")
+        self.max_items = int(feed_config.get("max_items", DEFAULT_MAX_ITEMS))
+        self.cache_control = feed_config.get("cache_control", "public, max-age=60")
+        self.base_path = f"{FEED_DIR}/{config.municipality}"
+    
+    def build(self) -> Dict[str, Any]:
+        """
+        フィードを更新
+        
+        Returns:
+            {"entries": 件数, "rebuilt": 読み直した件数, "reused": 再利用した件数, "written": 書き出したか}
+        """
+        # 最新N件のバージョンだけを読む (本文・変換結果は読まない)
+        with span("firestore.list", source="feed"):
+            docs = self.firestore_client.query_transformed(self.max_items, fields=VERSION_FIELDS)
+        versions = [(doc.id, entry_version(doc.to_dict() or {})) for doc in docs]
+        
+        previous = self._load_manifest()
+        current = set(versions)
+        reusable = {
+            item["id"]: item["entry"]
+            for item in previous
+            if (item.get("id"), item.get("version")) in current
+        }
+        
+        # 変わったエントリだけ読み直す
+        changed_ids = [doc_id for doc_id, _ in versions if doc_id not in reusable]
+        rebuilt = {}
+        if changed_ids:
+            with span("firestore.get", source="feed") as s:
+                s.amount = len(changed_ids)
+                snapshots = self.firestore_client.get_documents(changed_ids)
+            for snapshot in snapshots:
+                rebuilt[snapshot.id] = build_entry(snapshot.id, snapshot.to_dict() or {})
+        
+        items = []
+        for doc_id, version in versions:
+            entry = reusable.get(doc_id) or rebuilt.get(doc_id)
+            if entry:
+                items.append({"id": doc_id, "version": version, "entry": entry})
+        
+        summary = {
+            "entries": len(items),
+            "rebuilt": len(rebuilt),
+            "reused": len(items) - len(rebuilt),
+            "written": False,
+        }
+        
+        if [(i["id"], i["version"]) for i in items] == [(i.get("id"), i.get("version")) for i in previous]:
+            print(f"📰 フィード変更なし: {len(items)} 件")
+            return summary
+        
+        entries = [item["entry"] for item in items]
+        with span("feed.write", municipality=self.config.municipality):
+            self._save(FEED_JSON, self.render_json_feed(entries), "application/feed+json")
+            self._save(FEED_RSS, self.render_rss(entries), "application/rss+xml")
+            # マニフェストは最後に書く (途中で失敗したら次回すべて作り直す)
+            self._save(MANIFEST, json.dumps(
+                {"version": MANIFEST_VERSION, "items": items},
+                ensure_ascii=False, separators=(",", ":")
+            ).encode("utf-8"), "application/json")
+        
+        summary["written"] = True
+        print(f"📰 フィード更新: {len(items)} 件 (読み直し {summary['rebuilt']} / 再利用 {summary['reused']})")
+        return summary
+    
+    def _load_manifest(self) -> List[Dict[str, Any]]:
+        """前回書き出したエントリ (なければ空)"""
+        raw = load_file(f"{self.base_path}/{MANIFEST}")
+        if not raw:
+            return []
+        
+        try:
+            manifest = json.loads(raw)
+        except ValueError:
+            print("⚠️ フィードのマニフェストが壊れているため作り直します")
+            return []
+        
+        if manifest.get("version") != MANIFEST_VERSION:
+            return []
+        return manifest.get("items") or []
+    
+    def _save(self, filename: str, data: bytes, content_type: str) -> str:
+        return save_file(data, f"{self.base_path}/{filename}", content_type, cache_control=self.cache_control)
+    
+    # ========================================
+    # 書き出し
+    # ========================================
+    
+    def render_json_feed(self, entries: List[Dict[str, Any]]) -> bytes:
+        """JSON Feed 1.1"""
+        home_page_url = self.config.get_source_config("municipal_hp").get("base_url", "")
+        feed = {
+            "version": "https://jsonfeed.org/version/1.1",
+            "title": f"{self.config.municipality_name} お知らせ",
+            "home_page_url": home_page_url,
+            "language": "ja",
+            "items": entries,
+        }
+        return json.dumps(feed, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    
+    def render_rss(self, entries: List[Dict[str, Any]]) -> bytes:
+        """RSS 2.0"""
+        home_page_url = self.config.get_source_config("municipal_hp").get("base_url", "")
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<rss version="2.0">',
+            "<channel>",
+            f"<title>{escape(self.config.municipality_name)} お知らせ</title>",
+            f"<link>{escape(home_page_url)}</link>",
+            f"<description>{escape(self.config.municipality_name)}のお知らせ</description>",
+            "<language>ja</language>",
+        ]
+        
+        for entry in entries:
+            lines.append("<item>")
+            lines.append(f"<title>{escape(entry.get('title', ''))}</title>")
+            if entry.get("url"):
+                lines.append(f"<link>{escape(entry['url'])}</link>")
+            lines.append(f'<guid isPermaLink="false">{escape(entry["id"])}</guid>')
+            lines.append(f"<description>{escape(entry.get('content_text', ''))}</description>")
+            if entry.get("date_published"):
+                published = datetime.fromisoformat(entry["date_published"])
+                lines.append(f"<pubDate>{format_datetime(published)}</pubDate>")
+            for tag in entry.get("tags", []):
+                lines.append(f"<category>{escape(tag)}</category>")
+            # RSS の enclosure は1件のみ (動画を優先)
+            enclosure = (entry.get("attachments") or [None])[0]
+            if enclosure is None and entry.get("image"):
+                extension = Path(entry["image"].split("?")[0]).suffix.lower()
+                enclosure = {"url": entry["image"], "mime_type": IMAGE_MIME_TYPES.get(extension, "image/png")}
+            if enclosure:
+                lines.append(f'<enclosure url="{escape(enclosure["url"])}" length="0" type="{enclosure["mime_type"]}"/>')
+            lines.append("</item>")
+        
+        lines += ["</channel>", "</rss>"]
+        return "\n".join(lines).encode("utf-8")
+
+
+def build_feeds(config, firestore_client=None) -> Dict[str, Any]:
+    """
+    1自治体分のフィードを更新
+    
+    Args:
+        config: Configインスタンス
+        firestore_client: FirestoreClient (Noneの場合は自治体のコレクションで取得)
+    
+    Returns:
+        FeedBuilder.build の結果 (フィードが無効の場合は空)
+    """
+    if not config.is_delivery_enabled("feed"):
+        print("⚠️ フィード配信が無効です")
+        return {}
+    return FeedBuilder(config, firestore_client).build()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - Deliveryオーケストレーター
+
+変換済みの記事を配信用の静的フィードに書き出す (Transform の後に実行)
+"""
+
+import sys
+from pathlib import Path
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.common.config import get_config
+from backend.common.metrics import get_metrics
+from backend.delivery.feed import build_feeds
+
+
+def main():
+    """メイン処理"""
+    print("🚀 OMO Platform - Delivery開始")
+    
+    # 設定を初期化 (環境変数 MUNICIPALITY の自治体)
+    config = get_config()
+    get_metrics().reset()  # ウォームスタートで前回の計測を引き継がない
+    try:
+        build_feeds(config)
+    finally:
+        get_metrics().write_report(f"delivery-{config.municipality}")
+
+
+# Cloud Functions用ハンドラ
+def main_handler(request):
+    """
+    Cloud Functions (Gen2) 用HTTPハンドラ
+    
+    Args:
+        request: flask.Request
+    
+    Returns:
+        (response_body, status_code)
+    """
+    try:
+        main()
+        return ("OK", 200)
+    except Exception as e:
+        print(f"⚠️ main_handler 例外: {e}")
+        return (f"ERROR: {e}", 500)
+
+
+# ローカル実行
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 複数自治体ランナー
+
+config/municipalities/*.yaml の全自治体を1プロセスで処理する。
+HTTP・Firestore接続・Geminiクライアントは全自治体で共有し、
+自治体ごとの処理は並列に実行する (自治体ごとの件数・並列数は YAML の runner で設定)
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.common.config import Config, list_municipalities
+from backend.common.firestore import get_firestore_client
+from backend.common.metrics import get_metrics
+from backend.delivery.feed import build_feeds
+from backend.search.indexer import StreamIndexer, update_index
+from backend.scrape.main import run_scrape
+from backend.transform.main import run_transform
+from backend.runner.pipeline import run_pipeline
+
+
+# 実行ステージ (順番に実行)
+STAGES = ("scrape", "transform", "feed", "search")
+
+
+def load_tenant_configs(municipalities: Optional[Sequence[str]] = None) -> Dict[str, Config]:
+    """
+    自治体ごとの設定を読み込む
+    
+    Args:
+        municipalities: 自治体名のリスト (Noneの場合は全自治体)
+    
+    Returns:
+        {自治体名: Config}
+    
+    Raises:
+        ValueError: 複数の自治体が同じコレクションを使う設定の場合
+    """
+    names = list(municipalities or list_municipalities())
+    configs = {name: Config(name) for name in names}
+    
+    # コレクションが重複すると他自治体の記事を変換してしまうため禁止
+    owners: Dict[str, str] = {}
+    for name, config in configs.items():
+        collection = config.firestore_collection_name
+        if collection in owners:
+            raise ValueError(
+                f"自治体 {owners[collection]} と {name} が同じコレクション '{collection}' を使用しています。"
+                f" YAMLの firestore.collection_name で自治体ごとに分けてください"
+                f" (環境変数 FIRESTORE_COLLECTION_NAME が設定されているとすべての自治体に適用されます)。"
+            )
+        owners[collection] = name
+    
+    return configs
+
+
+class MultiTenantRunner:
+    """複数自治体ランナー"""
+    
+    def __init__(self, configs: Dict[str, Config], max_workers: Optional[int] = None):
+        """
+        Args:
+            configs: {自治体名: Config}
+            max_workers: 同時に処理する自治体数 (Noneの場合は環境変数 RUNNER_MAX_WORKERS、既定4)
+        """
+        self.configs = configs
+        self.max_workers = max_workers or int(os.getenv("RUNNER_MAX_WORKERS", "4"))
+    
+    def run(self, stages: Sequence[str] = STAGES) -> Dict[str, Dict[str, Any]]:
+        """
+        全自治体を並列に処理
+        
+        Args:
+            stages: 実行するステージ ("scrape", "transform", "feed", "search")
+        
+        Returns:
+            {自治体名: 実行結果}
+        """
+        if not self.configs:
+            print("⚠️ 処理対象の自治体がありません")
+            return {}
+        
+        workers = max(1, min(self.max_workers, len(self.configs)))
+        print(f"🏙️ 複数自治体ランナー: {len(self.configs)} 自治体 (並列 {workers})")
+        
+        results: Dict[str, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.run_tenant, name, config, stages): name
+                for name, config in self.configs.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                results[name] = future.result()
+        
+        failed = [name for name, result in results.items() if result.get("error")]
+        print(f"\n✅ 全自治体完了: {len(results) - len(failed)}/{len(results)} 成功")
+        if failed:
+            print(f"⚠️ 失敗: {', '.join(sorted(failed))}")
+        
+        return results
+    
+    def run_tenant(self, name: str, config: Config, stages: Sequence[str]) -> Dict[str, Any]:
+        """
+        1自治体のステージを順に実行
+        
+        Args:
+            name: 自治体名
+            config: Configインスタンス
+            stages: 実行するステージ
+        
+        Returns:
+            {"scrape": 件数, "transform": {...}, "feed": {...}, "search": {...}, "elapsed_sec": 秒, "error": エラー文字列}
+        """
+        result: Dict[str, Any] = {}
+        started = time.monotonic()
+        
+        try:
+            firestore_client = get_firestore_client(config)
+            
+            search_enabled = "search" in stages and config.is_search_enabled()
+            
+            # スクレイプで保存された記事をその場で検索索引に追加
+            indexer = StreamIndexer(config, firestore_client) if search_enabled and "scrape" in stages else None
+            if indexer:
+                indexer.start()
+            
+            try:
+                if "scrape" in stages and "transform" in stages:
+                    # スクレイプで保存された記事から順に変換を開始
+                    print(f"\n⚡ [{name}] Scrape + Transform開始")
+                    result.update(run_pipeline(config, firestore_client))
+                
+                elif "scrape" in stages:
+                    print(f"\n📥 [{name}] Scrape開始")
+                    result["scrape"] = run_scrape(config, firestore_client)
+                
+                elif "transform" in stages:
+                    print(f"\n🔄 [{name}] Transform開始")
+                    result["transform"] = run_transform(config, firestore_client)
+            finally:
+                if indexer:
+                    indexer.close()
+                    result["search"] = {"streamed": indexer.indexed, "documents": len(indexer.index)}
+            
+            # スクレイプしない場合は Firestore の記事との差分で索引を更新
+            if search_enabled and indexer is None:
+                result["search"] = update_index(config, firestore_client)
+            
+            # 変換結果が変わった記事だけフィードを更新
+            if "feed" in stages and config.is_delivery_enabled("feed"):
+                result["feed"] = build_feeds(config, firestore_client)
+        
+        except Exception as e:
+            print(f"❌ [{name}] 処理エラー: {e}")
+            result["error"] = str(e)
+        
+        result["elapsed_sec"] = round(time.monotonic() - started, 2)
+        return result
+
+
+def _parse_names(value: Optional[str]) -> List[str]:
+    """カンマ区切りの自治体名を分割"""
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    メイン処理
+    
+    対象の自治体はコマンドライン引数または環境変数 MUNICIPALITIES (カンマ区切り) で指定。
+    未指定の場合は config/municipalities の全自治体
+    """
+    print("🚀 OMO Platform - 複数自治体ランナー開始")
+    
+    names = list(argv if argv is not None else sys.argv[1:]) or _parse_names(os.getenv("MUNICIPALITIES"))
+    stages = _parse_names(os.getenv("RUNNER_STAGES")) or list(STAGES)
+    
+    configs = load_tenant_configs(names or None)
+    get_metrics().reset()  # ウォームスタートで前回の計測を引き継がない
+    try:
+        return MultiTenantRunner(configs).run(stages)
+    finally:
+        get_metrics().write_report("multi_tenant")
+
+
+# Cloud Functions用ハンドラ
+def main_handler(request):
+    """
+    Cloud Functions (Gen2) 用HTTPハンドラ
+    
+    Args:
+        request: flask.Request
+    
+    Returns:
+        (response_body, status_code)
+    """
+    try:
+        results = main([])
+        failed = [name for name, result in results.items() if result.get("error")]
+        if failed:
+            return (f"PARTIAL: failed={','.join(sorted(failed))}", 500)
+        return ("OK", 200)
+    except Exception as e:
+        print(f"⚠️ main_handler 例外: {e}")
+        return (f"ERROR: {e}", 500)
+
+
+# ローカル実行
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - スクレイプと変換の並行実行
+
+スクレイプが記事を保存するたびに発行するイベントを受け取り、
+スクレイプの完了を待たずに変換を始める。
+スクレイプ完了後は、それ以前から残っている変換待ちの記事を通常どおり処理する
+"""
+
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Any
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.common.config import get_config
+from backend.common.events import ArticleEventQueue, get_event_bus
+from backend.common.filters import FilterSet, create_filter
+from backend.common.firestore import get_firestore_client
+from backend.common.lease import make_worker_id
+from backend.common.metrics import get_metrics
+from backend.scrape.main import run_scrape
+from backend.transform.main import (
+    TRANSFORM_TYPES,
+    create_transformers,
+    process_document,
+    run_transform,
+)
+
+
+def run_pipeline(config, firestore_client=None) -> Dict[str, Any]:
+    """
+    1自治体分のスクレイプと変換を並行して実行
+    
+    Args:
+        config: Configインスタンス
+        firestore_client: FirestoreClient (Noneの場合は自治体のコレクションで取得)
+    
+    Returns:
+        {"scrape": 件数, "streamed": イベント経由で変換した件数, "transform": {...}}
+    """
+    firestore_client = firestore_client or get_firestore_client(config)
+    result: Dict[str, Any] = {"streamed": 0}
+    
+    enabled_types = [t for t in TRANSFORM_TYPES if config.is_transform_enabled(t)]
+    filter_set = FilterSet({
+        t: create_filter(config.get_transform_config(t).get("filters", {}))
+        for t in enabled_types
+    })
+    transformers = create_transformers(config) if enabled_types else {}
+    
+    # この自治体の記事イベントだけを受け取る
+    events = ArticleEventQueue(config.firestore_collection_name)
+    unsubscribe = get_event_bus().subscribe(events)
+    
+    streamed_lock = threading.Lock()
+    
+    def _consume():
+        owner = make_worker_id(f"{config.municipality}-stream")
+        while True:
+            doc_id = events.get()
+            if doc_id is None:
+                return
+            if not transformers:
+                continue
+            if process_document(doc_id, transformers, filter_set, config, firestore_client, owner) is not None:
+                with streamed_lock:
+                    result["streamed"] += 1
+    
+    consumers = [
+        threading.Thread(target=_consume, name=f"stream-{config.municipality}-{i}", daemon=True)
+        for i in range(config.transform_workers)
+    ]
+    for consumer in consumers:
+        consumer.start()
+    
+    try:
+        result["scrape"] = run_scrape(config, firestore_client)
+    finally:
+        # スクレイプ完了 → キューに残った記事を処理し終えたら停止
+        unsubscribe()
+        events.close()
+        for consumer in consumers:
+            consumer.join()
+    
+    print(f"⚡ スクレイプと並行して変換: {result['streamed']} 件")
+    
+    # スクレイプ前から残っている変換待ち・再試行分
+    result["transform"] = run_transform(config, firestore_client, transformers)
+    return result
+
+
+def main():
+    """メイン処理"""
+    print("🚀 OMO Platform - Pipeline開始 (スクレイプと変換を並行実行)")
+    
+    # 設定を初期化 (環境変数 MUNICIPALITY の自治体)
+    config = get_config()
+    get_metrics().reset()  # ウォームスタートで前回の計測を引き継がない
+    try:
+        run_pipeline(config)
+    finally:
+        get_metrics().write_report(f"pipeline-{config.municipality}")
+
+
+# ローカル実行
+if __name__ == "__main__":
+    main()
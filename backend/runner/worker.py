@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 変換ワーカー (常駐モード)
+
+変換待ちの記事をリース付きで取得して変換し続ける。
+リースにより複数のワーカー (複数コンテナ) を同時に動かしても
+同じ記事を二重に変換しない。クラッシュしたワーカーの記事は
+リースの期限切れ後に他のワーカーが再取得する
+
+WORKER_LISTEN=true の場合は Firestore の変更を購読し、
+スクレイプが保存した記事をポーリングを待たずに変換する
+"""
+
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.common.config import Config, get_config
+from backend.common.events import ArticleEventQueue
+from backend.common.filters import FilterSet, create_filter
+from backend.common.firestore import get_firestore_client
+from backend.common.lease import make_worker_id
+from backend.common.metrics import get_metrics
+from backend.transform.main import (
+    TRANSFORM_TYPES,
+    create_transformers,
+    preselect_documents,
+    process_document,
+)
+
+
+class TransformWorker:
+    """1自治体分の常駐変換ワーカー"""
+    
+    def __init__(
+        self,
+        config: Config,
+        firestore_client=None,
+        concurrency: Optional[int] = None,
+        listen: Optional[bool] = None
+    ):
+        """
+        Args:
+            config: Configインスタンス
+            firestore_client: FirestoreClient (Noneの場合は自治体のコレクションで取得)
+            concurrency: 同時に変換する記事数 (Noneの場合は WORKER_CONCURRENCY または runner.max_workers)
+            listen: Firestoreの変更を購読するか (Noneの場合は環境変数 WORKER_LISTEN)
+        """
+        self.config = config
+        self.firestore_client = firestore_client or get_firestore_client(config)
+        self.concurrency = concurrency or int(os.getenv("WORKER_CONCURRENCY", config.transform_workers))
+        
+        enabled_types = [t for t in TRANSFORM_TYPES if config.is_transform_enabled(t)]
+        self.filter_set = FilterSet({
+            t: create_filter(config.get_transform_config(t).get("filters", {}))
+            for t in enabled_types
+        })
+        
+        # 変換器 (Geminiクライアントなど) は起動時に1回だけ初期化
+        self.transformers = create_transformers(config)
+        
+        # スレッドごとに別のワーカーIDを使う
+        self.owners = [make_worker_id(config.municipality) for _ in range(self.concurrency)]
+        
+        if listen is None:
+            listen = os.getenv("WORKER_LISTEN", "false").lower() == "true"
+        self.listen = listen
+    
+    def run_once(self) -> int:
+        """
+        変換待ちの記事を1回分処理
+        
+        Returns:
+            変換を完了した記事数 (失敗・再試行待ちの記事は数えない)
+        """
+        # クラッシュしたワーカーのリースを回収
+        self.firestore_client.release_expired_leases()
+        
+        doc_ids = preselect_documents(self.config, self.firestore_client, self.filter_set)
+        if not doc_ids:
+            return 0
+        
+        # 記事をスレッドに割り振る (スレッドごとに固有のワーカーID)
+        buckets: List[List[str]] = [doc_ids[i::self.concurrency] for i in range(self.concurrency)]
+        
+        def _run(index: int) -> int:
+            processed = 0
+            for doc_id in buckets[index]:
+                result = process_document(
+                    doc_id,
+                    self.transformers,
+                    self.filter_set,
+                    self.config,
+                    self.firestore_client,
+                    self.owners[index]
+                )
+                if result:
+                    processed += 1
+            return processed
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return sum(executor.map(_run, range(self.concurrency)))
+    
+    def _start_listener(self):
+        """
+        変換待ちになった記事の通知を受けて変換するスレッドを起動
+        
+        Returns:
+            (イベントキュー, Firestoreの購読, 変換スレッドのリスト)
+        """
+        events = ArticleEventQueue()
+        watch = self.firestore_client.watch_pending_transform(events.put)
+        
+        def _consume(owner: str):
+            while True:
+                doc_id = events.get()
+                if doc_id is None:
+                    return
+                try:
+                    process_document(
+                        doc_id,
+                        self.transformers,
+                        self.filter_set,
+                        self.config,
+                        self.firestore_client,
+                        owner
+                    )
+                except Exception as e:
+                    print(f"❌ [{self.config.municipality}] 変換エラー: {doc_id} | {e}")
+        
+        # ポーリング側とは別のワーカーIDを使う (同じ記事を同時に取りにいっても片方だけが取得)
+        consumers = [
+            threading.Thread(
+                target=_consume,
+                args=(make_worker_id(f"{self.config.municipality}-listen"),),
+                name=f"listen-{self.config.municipality}-{i}",
+                daemon=True
+            )
+            for i in range(self.concurrency)
+        ]
+        for consumer in consumers:
+            consumer.start()
+        
+        return events, watch, consumers
+    
+    def run_forever(self, stop_event: threading.Event):
+        """
+        停止されるまで変換を続ける
+        
+        Args:
+            stop_event: 停止イベント (SIGTERM などでセット)
+        """
+        name = self.config.municipality
+        mode = "購読+ポーリング" if self.listen else "ポーリング"
+        print(f"👷 [{name}] ワーカー開始 ({mode}, 並列 {self.concurrency}, リース {self.config.lease_ttl_sec:.0f}秒)")
+        
+        listener = self._start_listener() if self.listen and self.transformers else None
+        
+        while not stop_event.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                print(f"❌ [{name}] ワーカーエラー: {e}")
+                processed = 0
+            
+            # 完了した記事がなければ待機 (失敗し続ける記事をすぐに取り直さない)
+            if processed == 0:
+                stop_event.wait(self.config.worker_poll_interval_sec)
+        
+        if listener:
+            events, watch, consumers = listener
+            watch.unsubscribe()
+            events.close()
+            for consumer in consumers:
+                consumer.join()
+        
+        print(f"🛑 [{name}] ワーカー停止")
+
+
+def _load_configs() -> Dict[str, Config]:
+    """対象自治体の設定 (MUNICIPALITIES 指定時は複数、未指定時は MUNICIPALITY)"""
+    names = [v.strip() for v in os.getenv("MUNICIPALITIES", "").split(",") if v.strip()]
+    if not names:
+        config = get_config()
+        return {config.municipality: config}
+    
+    from backend.runner.multi_tenant import load_tenant_configs
+    return load_tenant_configs(names)
+
+
+def main():
+    """メイン処理 (SIGTERM / SIGINT で停止)"""
+    print("🚀 OMO Platform - Transformワーカー開始")
+    
+    stop_event = threading.Event()
+    
+    def _stop(signum, frame):
+        print(f"🛑 停止シグナル受信 ({signum}): 処理中の記事が終わり次第停止します")
+        stop_event.set()
+    
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    
+    workers = [TransformWorker(config) for config in _load_configs().values()]
+    
+    threads = [
+        threading.Thread(target=worker.run_forever, args=(stop_event,), name=f"worker-{worker.config.municipality}")
+        for worker in workers
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    # 起動から停止までの計測レポート
+    get_metrics().write_report("worker")
+
+
+# ローカル実行
+if __name__ == "__main__":
+    main()
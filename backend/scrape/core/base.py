@@ -80,6 +80,7 @@ class MunicipalScraper(BaseScraper):
             - pdf_links: PDFリンクのリスト
             - image_links: 画像リンクのリスト
             - quick_hash: 軽量ハッシュ
+            - semantic_fingerprint: 意味的フィンガープリント
         """
         pass
 
@@ -5,9 +5,114 @@ OMO Platform - HTTP共通処理モジュール
 スクレイピング用のHTTP操作を提供
 """
 
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
 import requests
-from typing import Optional, Dict
-from bs4 import BeautifulSoup, UnicodeDammit
+from requests.adapters import HTTPAdapter
+from pathlib import Path
+from typing import Optional, Dict, IO, Tuple
+from bs4 import BeautifulSoup, FeatureNotFound, UnicodeDammit
+
+
+# HTTPキャッシュの保存先 (ETag / Last-Modified による再検証)
+DEFAULT_HTTP_CACHE_DIR = Path(__file__).parent.parent.parent.parent / "storage" / "cache" / "http"
+
+# ストリーミングダウンロードの読み込み単位
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# ホストごとのコネクションプール上限 (複数自治体・PDF並列取得で共有)
+DEFAULT_POOL_MAXSIZE = 16
+
+
+class DownloadTooLargeError(Exception):
+    """ダウンロードサイズが上限を超えた"""
+    pass
+
+
+class HTTPCache:
+    """条件付きGET用のディスクキャッシュ"""
+    
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Args:
+            cache_dir: キャッシュディレクトリ (Noneの場合は環境変数 HTTP_CACHE_DIR またはデフォルト)
+        """
+        self.cache_dir = Path(cache_dir or os.getenv("HTTP_CACHE_DIR") or DEFAULT_HTTP_CACHE_DIR)
+    
+    def _paths(self, url: str):
+        """URLに対応する (本文, メタ情報) のパス"""
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.bin", self.cache_dir / f"{key}.json"
+    
+    def get_validators(self, url: str) -> Dict[str, str]:
+        """再検証用のリクエストヘッダーを取得"""
+        body_path, meta_path = self._paths(url)
+        if not (body_path.exists() and meta_path.exists()):
+            return {}
+        
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+        
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+    
+    def load(self, url: str) -> Optional[bytes]:
+        """キャッシュ済みの本文を取得"""
+        body_path, _ = self._paths(url)
+        if not body_path.exists():
+            return None
+        return body_path.read_bytes()
+    
+    def open_body(self, url: str) -> Optional[IO[bytes]]:
+        """キャッシュ済みの本文をファイルとして開く (メモリに載せない)"""
+        body_path, _ = self._paths(url)
+        if not body_path.exists():
+            return None
+        return open(body_path, "rb")
+    
+    def store(self, url: str, response: requests.Response, content: bytes):
+        """レスポンスをキャッシュに保存 (検証子がない場合は保存しない)"""
+        self.store_file(url, response, io.BytesIO(content))
+    
+    def store_file(self, url: str, response: requests.Response, fileobj: IO[bytes]):
+        """
+        ファイルの内容をキャッシュに保存 (チャンク単位でコピー)
+        
+        Args:
+            url: URL
+            response: 検証子を含むレスポンス
+            fileobj: 本文 (先頭から読み込む。読み込み後は先頭に戻す)
+        """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not (etag or last_modified):
+            return
+        
+        body_path, meta_path = self._paths(url)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fileobj.seek(0)
+            with open(body_path, "wb") as f:
+                shutil.copyfileobj(fileobj, f, STREAM_CHUNK_SIZE)
+            meta_path.write_text(
+                json.dumps({"url": url, "etag": etag, "last_modified": last_modified}),
+                encoding="utf-8"
+            )
+        except Exception as e:
+            print(f"⚠️ HTTPキャッシュ保存失敗: {url} | {e}")
+        finally:
+            fileobj.seek(0)
 
 
 class HTTPClient:
@@ -21,6 +126,14 @@ class HTTPClient:
         self.user_agent = user_agent or "OMO-Platform/1.0 (+https://github.com/YOUR_USERNAME/omo-platform)"
         self.session = requests.Session()
         self.session.headers.update({"User-Agent": self.user_agent})
+        
+        # 並列取得時に接続を使い回せるようプールを広げる
+        pool_maxsize = int(os.getenv("HTTP_POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE))
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        self.cache = HTTPCache()
     
     def get(
         self,
@@ -58,7 +171,7 @@ class HTTPClient:
         Args:
             url: URL
             timeout: タイムアウト(秒)
-            parser: HTMLパーサー
+            parser: HTMLパーサー ("lxml" が未インストールの場合は "html.parser")
         
         Returns:
             BeautifulSoup
@@ -69,12 +182,16 @@ class HTTPClient:
         dammit = UnicodeDammit(response.content, is_html=True)
         html = dammit.unicode_markup or response.text
         
-        return BeautifulSoup(html, parser)
+        try:
+            return BeautifulSoup(html, parser)
+        except FeatureNotFound:
+            return BeautifulSoup(html, "html.parser")
     
     def download_binary(
         self,
         url: str,
-        timeout: int = 60
+        timeout: int = 60,
+        use_cache: bool = False
     ) -> bytes:
         """
         バイナリファイルをダウンロード
@@ -82,16 +199,121 @@ class HTTPClient:
         Args:
             url: URL
             timeout: タイムアウト(秒)
+            use_cache: HTTPキャッシュを使用 (変更がなければ304で再取得を省略)
         
         Returns:
             バイナリデータ
         """
-        response = self.get(url, timeout=timeout)
-        return response.content
+        if not use_cache:
+            response = self.get(url, timeout=timeout)
+            return response.content
+        
+        headers = self.cache.get_validators(url)
+        response = self.session.get(url, timeout=timeout, headers=headers)
+        
+        if response.status_code == 304:
+            cached = self.cache.load(url)
+            if cached is not None:
+                return cached
+            # キャッシュ本文が消えている場合は検証子なしで取り直す
+            response = self.get(url, timeout=timeout)
+        
+        response.raise_for_status()
+        content = response.content
+        self.cache.store(url, response, content)
+        return content
+    
+    def download_to_spool(
+        self,
+        url: str,
+        timeout: int = 60,
+        max_bytes: int = 50 * 1024 * 1024,
+        spool_bytes: int = 4 * 1024 * 1024,
+        use_cache: bool = False
+    ) -> Tuple[IO[bytes], str]:
+        """
+        ファイルをストリーミングで一時ファイルにダウンロード
+        
+        spool_bytes までメモリ上に保持し、超えるとディスクに書き出すため、
+        ファイルサイズによらずメモリ使用量は一定に収まる
+        
+        Args:
+            url: URL
+            timeout: タイムアウト(秒)
+            max_bytes: 最大サイズ (超えた場合は DownloadTooLargeError)
+            spool_bytes: メモリ上に保持する最大サイズ
+            use_cache: HTTPキャッシュを使用 (変更がなければ304で再取得を省略)
+        
+        Returns:
+            (先頭にシーク済みのファイルオブジェクト, SHA256ハッシュ)
+            ファイルオブジェクトは呼び出し側で close すること
+        
+        Raises:
+            DownloadTooLargeError: サイズ上限超過
+            requests.HTTPError: HTTPエラー
+        """
+        headers = self.cache.get_validators(url) if use_cache else {}
+        response = self.session.get(url, timeout=timeout, headers=headers, stream=True)
+        
+        try:
+            if response.status_code == 304:
+                cached = self.cache.open_body(url)
+                if cached is not None:
+                    with cached:
+                        return _spool_stream(
+                            iter(lambda: cached.read(STREAM_CHUNK_SIZE), b""),
+                            max_bytes, spool_bytes, url
+                        )
+                # キャッシュ本文が消えている場合は検証子なしで取り直す
+                response.close()
+                response = self.session.get(url, timeout=timeout, stream=True)
+            
+            response.raise_for_status()
+            
+            # Content-Length で事前に判定できる場合は本文を読まない
+            length = response.headers.get("Content-Length")
+            if length and length.isdigit() and int(length) > max_bytes:
+                raise DownloadTooLargeError(f"{url}: {int(length)} bytes > {max_bytes} bytes")
+            
+            spool, digest = _spool_stream(
+                response.iter_content(chunk_size=STREAM_CHUNK_SIZE),
+                max_bytes, spool_bytes, url
+            )
+        finally:
+            response.close()
+        
+        if use_cache:
+            self.cache.store_file(url, response, spool)
+        
+        return spool, digest
+
+
+def _spool_stream(chunks, max_bytes: int, spool_bytes: int, url: str) -> Tuple[IO[bytes], str]:
+    """チャンクを一時ファイルに書き込み、SHA256を計算"""
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+    sha256 = hashlib.sha256()
+    total = 0
+    
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            total += len(chunk)
+            if total > max_bytes:
+                raise DownloadTooLargeError(f"{url}: > {max_bytes} bytes")
+            sha256.update(chunk)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    
+    spool.seek(0)
+    return spool, sha256.hexdigest()
 
 
 # グローバルインスタンス
 _http_client: Optional[HTTPClient] = None
+_http_lock = threading.Lock()
 
 
 def get_http_client(user_agent: Optional[str] = None) -> HTTPClient:
@@ -106,7 +328,8 @@ def get_http_client(user_agent: Optional[str] = None) -> HTTPClient:
     """
     global _http_client
     
-    if _http_client is None:
-        _http_client = HTTPClient(user_agent)
+    with _http_lock:
+        if _http_client is None:
+            _http_client = HTTPClient(user_agent)
     
     return _http_client
@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - PDF添付ファイル取り込み
+
+記事の pdf_links をダウンロードしてテキストを抽出する。
+ページ数は Document AI の上限設定 (docai_max_pages / docai_over_limit_policy) に従う
+"""
+
+import io
+import json
+import os
+import sys
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional, IO, Iterator
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from backend.scrape.core.http import get_http_client, DownloadTooLargeError
+from backend.common.config import get_config
+from backend.common.utils import compute_content_hash, normalize_for_fingerprint
+
+
+# 抽出テキストのキャッシュ (PDF内容のハッシュ単位)
+DEFAULT_PDF_CACHE_DIR = Path(__file__).parent.parent.parent.parent / "storage" / "cache" / "pdf_text"
+
+
+# ========================================
+# OCRバックエンド
+# ========================================
+
+class OCRBackend(ABC):
+    """PDFテキスト抽出バックエンド基底クラス"""
+    
+    name = "base"
+    
+    @abstractmethod
+    def iter_pages(self, pdf_file: IO[bytes], max_pages: int) -> Iterator[str]:
+        """
+        PDFからページごとのテキストを順に抽出
+        
+        Args:
+            pdf_file: PDFファイル (シーク可能なファイルオブジェクト)
+            max_pages: 抽出する最大ページ数
+        
+        Yields:
+            ページのテキスト
+        """
+        pass
+
+
+class LocalPDFBackend(OCRBackend):
+    """PyPDF2によるローカル抽出 (テキスト埋め込みPDF向け)"""
+    
+    name = "local"
+    
+    def iter_pages(self, pdf_file: IO[bytes], max_pages: int) -> Iterator[str]:
+        for text in iter_pdf_pages(pdf_file, max_pages):
+            yield text
+
+
+class DocumentAIBackend(OCRBackend):
+    """Document AI OCR (スキャンPDF向け)"""
+    
+    name = "documentai"
+    
+    def __init__(self, app_config=None):
+        self.app_config = app_config or get_config()
+        self._client = None
+    
+    @property
+    def client(self):
+        """Document AIクライアント (遅延初期化)"""
+        if self._client is None:
+            from google.cloud import documentai
+            location = self.app_config.docai_location
+            self._client = documentai.DocumentProcessorServiceClient(
+                client_options={"api_endpoint": f"{location}-documentai.googleapis.com"}
+            )
+        return self._client
+    
+    def iter_pages(self, pdf_file: IO[bytes], max_pages: int) -> Iterator[str]:
+        from google.cloud import documentai
+        
+        processor_id = self.app_config.docai_processor_id
+        if not processor_id:
+            raise ValueError("DOCAI_PROCESSOR_ID が設定されていません")
+        
+        name = self.client.processor_path(
+            self.app_config.firestore_project_id,
+            self.app_config.docai_location,
+            processor_id
+        )
+        
+        # 上限を超えるページは送らない (送信データは max_pages 分に収まる)
+        content = _truncate_pdf(pdf_file, max_pages)
+        
+        result = self.client.process_document(
+            request=documentai.ProcessRequest(
+                name=name,
+                raw_document=documentai.RawDocument(content=content, mime_type="application/pdf")
+            )
+        )
+        document = result.document
+        
+        for page in document.pages[:max_pages]:
+            segments = page.layout.text_anchor.text_segments
+            text = "".join(
+                document.text[int(seg.start_index):int(seg.end_index)]
+                for seg in segments
+            )
+            yield text.strip()
+
+
+# バックエンド登録
+OCR_BACKENDS = {
+    LocalPDFBackend.name: LocalPDFBackend,
+    DocumentAIBackend.name: DocumentAIBackend,
+}
+
+
+def iter_pdf_pages(pdf_file: IO[bytes], max_pages: int) -> Iterator[str]:
+    """
+    PDFのテキストを1ページずつ抽出 (max_pages で打ち切り)
+    
+    PdfReader はページを参照時に読み込むため、
+    未処理のページがメモリに展開されることはない
+    
+    Args:
+        pdf_file: PDFファイル (シーク可能なファイルオブジェクト)
+        max_pages: 抽出する最大ページ数
+    
+    Yields:
+        ページのテキスト (抽出失敗時は空文字)
+    """
+    from PyPDF2 import PdfReader
+    
+    pdf_file.seek(0)
+    reader = PdfReader(pdf_file)
+    for index in range(min(len(reader.pages), max_pages)):
+        try:
+            yield (reader.pages[index].extract_text() or "").strip()
+        except Exception as e:
+            print(f"⚠️ PDFページ抽出失敗 ({index + 1}ページ): {e}")
+            yield ""
+
+
+def _truncate_pdf(pdf_file: IO[bytes], max_pages: int) -> bytes:
+    """先頭 max_pages ページのみのPDFを作成"""
+    from PyPDF2 import PdfReader, PdfWriter
+    
+    pdf_file.seek(0)
+    reader = PdfReader(pdf_file)
+    if len(reader.pages) <= max_pages:
+        pdf_file.seek(0)
+        return pdf_file.read()
+    
+    writer = PdfWriter()
+    for page in reader.pages[:max_pages]:
+        writer.add_page(page)
+    
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def count_pdf_pages(pdf_file: IO[bytes]) -> int:
+    """PDFのページ数を取得"""
+    from PyPDF2 import PdfReader
+    
+    pdf_file.seek(0)
+    return len(PdfReader(pdf_file).pages)
+
+
+# ========================================
+# 取り込みステージ
+# ========================================
+
+class PDFIngestor:
+    """PDF添付ファイルの取り込み"""
+    
+    def __init__(self, pdf_config: Dict[str, Any], app_config=None):
+        """
+        Args:
+            pdf_config: PDF設定 (情報源設定の "pdf")
+                {
+                    "enabled": bool,
+                    "ocr_backend": "local" | "documentai",
+                    "ocr_fallback": "documentai",  # ローカル抽出が空の場合
+                    "max_pdfs": 5,
+                    "max_workers": 4,
+                    "max_chars": 20000,
+                    "max_download_mb": 50,  # これを超えるPDFは取り込まない
+                    "spool_mb": 4           # これを超える分は一時ファイルに退避
+                }
+            app_config: Configインスタンス
+        """
+        self.app_config = app_config or get_config()
+        self.enabled = pdf_config.get("enabled", False)
+        self.max_pdfs = pdf_config.get("max_pdfs", 5)
+        self.max_workers = pdf_config.get("max_workers", 4)
+        self.max_chars = pdf_config.get("max_chars", 20000)
+        self.max_download_bytes = int(pdf_config.get("max_download_mb", 50) * 1024 * 1024)
+        self.spool_bytes = int(pdf_config.get("spool_mb", 4) * 1024 * 1024)
+        self.max_pages = self.app_config.docai_max_pages
+        self.over_limit_policy = self.app_config.docai_over_limit_policy
+        
+        self.backend = self._create_backend(pdf_config.get("ocr_backend", "local"))
+        fallback = pdf_config.get("ocr_fallback")
+        self.fallback_backend = self._create_backend(fallback) if fallback else None
+        
+        self.cache_dir = Path(os.getenv("PDF_CACHE_DIR") or DEFAULT_PDF_CACHE_DIR)
+        self.http = get_http_client()
+    
+    def _create_backend(self, name: str) -> OCRBackend:
+        """バックエンドを作成"""
+        backend_cls = OCR_BACKENDS.get(name)
+        if backend_cls is None:
+            raise ValueError(f"未対応のOCRバックエンド: {name}")
+        if backend_cls is DocumentAIBackend:
+            return backend_cls(self.app_config)
+        return backend_cls()
+    
+    def process(self, article: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        記事のPDFを取り込み、pdf_text / pdf_attachments を付与
+        
+        Args:
+            article: スクレイプした記事データ
+        
+        Returns:
+            更新した記事データ
+        """
+        if not self.enabled:
+            return article
+        
+        pdf_links = sorted(article.get("pdf_links") or [])[:self.max_pdfs]
+        if not pdf_links:
+            return article
+        
+        print(f"📑 PDF取り込み: {len(pdf_links)} 件")
+        
+        # 添付ファイルごとに並列処理
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(pdf_links)))) as executor:
+            attachments = list(executor.map(self._process_pdf, pdf_links))
+        
+        texts = [a.pop("text") for a in attachments]
+        pdf_text = "\n\n".join(t for t in texts if t)
+        
+        article["pdf_text"] = pdf_text[:self.max_chars]
+        article["pdf_attachments"] = attachments
+        # ダウンロードに失敗したPDFがある (一時的な失敗で pdf_text が欠けた内容を保存しない)
+        article["pdf_incomplete"] = any(a.get("status") == "failed" for a in attachments)
+        
+        # PDFの内容変更も意味のある変更として検出する
+        # (quick_hash はページの本文とリンク集合だけなので、同じURLのPDFの差し替えも拾えるよう抽出結果を含める)
+        if article["pdf_text"]:
+            pdf_text_hash = compute_content_hash(normalize_for_fingerprint(article["pdf_text"]))[:16]
+            fingerprint = article.get("semantic_fingerprint")
+            if isinstance(fingerprint, dict):
+                fingerprint["pdf_text"] = pdf_text_hash
+            if article.get("quick_hash"):
+                article["quick_hash"] = compute_content_hash(article["quick_hash"], "|PDF_TEXT|", pdf_text_hash)
+        
+        return article
+    
+    def _process_pdf(self, url: str) -> Dict[str, Any]:
+        """1つのPDFを処理"""
+        attachment: Dict[str, Any] = {"url": url, "status": "ok", "text": ""}
+        
+        try:
+            pdf_file, content_hash = self.http.download_to_spool(
+                url,
+                timeout=60,
+                max_bytes=self.max_download_bytes,
+                spool_bytes=self.spool_bytes,
+                use_cache=True
+            )
+        except DownloadTooLargeError as e:
+            print(f"   ⏭️ サイズ上限超過のためスキップ: {e}")
+            attachment["status"] = "skipped_too_large"
+            return attachment
+        except Exception as e:
+            print(f"   ⚠️ PDFダウンロード失敗: {url} | {e}")
+            attachment["status"] = "failed"
+            return attachment
+        
+        with pdf_file:
+            attachment["sha256"] = content_hash
+            
+            # 抽出済みならキャッシュを使用
+            cached = self._load_cache(content_hash)
+            if cached is not None:
+                attachment.update(cached)
+                print(f"   ⏩ PDFキャッシュ使用: {url}")
+                return attachment
+            
+            try:
+                page_count = count_pdf_pages(pdf_file)
+                attachment["pages"] = page_count
+                
+                if page_count > self.max_pages and self.over_limit_policy == "skip":
+                    print(f"   ⏭️ ページ上限超過のためスキップ ({page_count} > {self.max_pages}): {url}")
+                    attachment["status"] = "skipped_over_limit"
+                    return attachment
+                
+                extracted, text = self._extract(pdf_file)
+                attachment["extracted_pages"] = extracted
+                attachment["text"] = text
+                if page_count > self.max_pages:
+                    attachment["status"] = "truncated"
+                
+                self._store_cache(content_hash, attachment)
+                print(f"   ✅ PDF抽出: {url} ({extracted}/{page_count}ページ, {len(text)}文字)")
+            
+            except Exception as e:
+                print(f"   ⚠️ PDF取り込み失敗: {url} | {e}")
+                attachment["status"] = "failed"
+        
+        return attachment
+    
+    def _extract(self, pdf_file: IO[bytes]):
+        """
+        テキスト抽出 (空ならフォールバックバックエンドで再試行)
+        
+        Returns:
+            (抽出したページ数, テキスト)
+        """
+        extracted, text = self._collect_pages(self.backend, pdf_file)
+        
+        if not text and self.fallback_backend:
+            print(f"   🔍 テキストなし -> {self.fallback_backend.name} でOCR")
+            extracted, text = self._collect_pages(self.fallback_backend, pdf_file)
+        
+        return extracted, text
+    
+    def _collect_pages(self, backend: OCRBackend, pdf_file: IO[bytes]):
+        """ページを順に読み、max_chars に達した時点で打ち切る"""
+        parts: List[str] = []
+        length = 0
+        extracted = 0
+        
+        for text in backend.iter_pages(pdf_file, self.max_pages):
+            extracted += 1
+            if not text:
+                continue
+            parts.append(text)
+            length += len(text) + 1
+            if length >= self.max_chars:
+                break
+        
+        return extracted, "\n".join(parts)[:self.max_chars]
+    
+    # ========================================
+    # 抽出テキストキャッシュ
+    # ========================================
+    
+    def _cache_path(self, content_hash: str) -> Path:
+        return self.cache_dir / f"{content_hash}_{self.backend.name}_{self.max_pages}_{self.max_chars}.json"
+    
+    def _load_cache(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        path = self._cache_path(content_hash)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            return None
+    
+    def _store_cache(self, content_hash: str, attachment: Dict[str, Any]):
+        cached = {k: v for k, v in attachment.items() if k not in ("url",)}
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._cache_path(content_hash).write_text(
+                json.dumps(cached, ensure_ascii=False),
+                encoding="utf-8"
+            )
+        except Exception as e:
+            print(f"⚠️ PDFキャッシュ保存失敗: {e}")
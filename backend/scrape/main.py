@@ -6,75 +6,153 @@ OMO Platform - Scrapeオーケストレーター
 """
 
 import sys
+from functools import partial
 from pathlib import Path
+from typing import Dict, Any
 
 # パスを追加 (Cloud Functionsでも動作するように)
-sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from common.config import get_config
-from common.firestore import get_firestore_client
-from scrape.sources.municipal.moriya import MoriyaScraper
+from backend.common.config import get_config
+from backend.common.dedup import compute_signature_fields, find_canonical
+from backend.common.firestore import get_firestore_client
+from backend.common.events import SAVE_STATUS_EVENTS, get_event_bus, make_article_event
+from backend.common.metrics import get_metrics, span
+from backend.scrape.sources.registry import build_scrapers
+from backend.scrape.core.pdf import PDFIngestor
 
 
-def main():
-    """メイン処理"""
-    print("🚀 OMO Platform - Scrape開始")
+def run_scrape(config, firestore_client=None) -> int:
+    """
+    1自治体分のスクレイピングを実行
     
-    # 設定とクライアントを初期化
-    config = get_config()
-    firestore_client = get_firestore_client(config)
+    Args:
+        config: Configインスタンス
+        firestore_client: FirestoreClient (Noneの場合は自治体のコレクションで取得)
+    
+    Returns:
+        新規・更新された記事数
+    """
+    firestore_client = firestore_client or get_firestore_client(config)
+    event_bus = get_event_bus()
     
     print(f"📍 自治体: {config.municipality_name}")
     print(f"📦 コレクション: {config.firestore_collection_name}")
     
-    # スクレイパーを初期化
-    scrapers = []
-    
-    # 自治体HP
-    if config.is_source_enabled("municipal_website"):
-        municipal_config = config.get_source_config("municipal_website")
-        print(f"   [DEBUG] Municipal Config: {municipal_config}")
-        scraper_type = municipal_config.get("scraper", "moriya")
-        
-        if scraper_type == "moriya":
-            scrapers.append(MoriyaScraper(municipal_config))
-        else:
-            print(f"⚠️ 未対応のスクレイパー: {scraper_type}")
-    
-    # TODO: SNSスクレイパーを追加
-    # if config.is_source_enabled("twitter"):
-    #     twitter_config = config.get_source_config("twitter")
-    #     scrapers.append(TwitterScraper(twitter_config))
+    # スクレイパーを初期化 (sources 設定から生成)
+    scrapers = build_scrapers(config)
+    
+    # 重複記事の検出 (MinHash 署名を保存し、同じお知らせに紐付ける)
+    dedup_config = config.dedup_config
+    dedup_enabled = dedup_config.get("enabled", False)
+    
+    # TODO: SNSスクレイパーを追加 (registry に登録すれば設定で有効化できる)
     
     if not scrapers:
         print("⚠️ 有効なスクレイパーがありません")
-        return
+        return 0
     
     # スクレイピング実行
     total_articles = 0
     
     for scraper in scrapers:
         try:
-            articles = scraper.scrape()
+            # PDF添付ファイルの取り込み (情報源ごとの設定)
+            pdf_config = scraper.config.get("pdf", {})
+            pdf_ingestor = PDFIngestor(pdf_config, config) if pdf_config.get("enabled") else None
+            
+            source_type = scraper.get_source_type()
+            with span("scrape.fetch", source=source_type):
+                articles = scraper.scrape()
             
             # Firestoreに保存
             for article in articles:
                 doc_id = article.pop("doc_id")
                 
-                # 変更検出付き保存
-                status = firestore_client.save_with_hash_check(
-                    doc_id=doc_id,
-                    new_data=article,
-                    hash_field="quick_hash"
-                )
+                if pdf_ingestor:
+                    with span("scrape.pdf", source=source_type):
+                        article = pdf_ingestor.process(article)
+                
+                if dedup_enabled:
+                    article.update(compute_signature_fields(article))
+                
+                # 重複の紐付けは記事と同じ書き込みで保存する (変換待ちになった時点で
+                # duplicateOf があれば、すぐに取得したワーカーも正規の記事の結果を再利用する)
+                link_fields = None
+                if dedup_enabled:
+                    link_fields = partial(_duplicate_link, firestore_client, doc_id, article, dedup_config=dedup_config)
+                
+                # 変更検出付き保存 (PDFの取得に失敗した場合、既存の記事は前回の内容のまま)
+                with span("firestore.save") as s:
+                    status = firestore_client.save_with_hash_check(
+                        doc_id=doc_id,
+                        new_data=article,
+                        hash_field="quick_hash",
+                        keep_existing=article.pop("pdf_incomplete", False),
+                        extra_fields=link_fields
+                    )
+                    s.labels["status"] = status
                 
                 if status in ("new", "updated"):
                     total_articles += 1
+                    
+                    # 保存直後に変換を始められるようイベントを発行
+                    event_bus.publish(make_article_event(
+                        SAVE_STATUS_EVENTS[status],
+                        doc_id,
+                        config.firestore_collection_name,
+                        config.municipality
+                    ))
             
         except Exception as e:
             print(f"❌ スクレイパーエラー ({scraper.get_source_type()}): {e}")
     
     print(f"\n✅ Scrape完了: {total_articles} 件処理")
+    return total_articles
+
+
+def _duplicate_link(firestore_client, doc_id: str, article: Dict[str, Any], status: str, dedup_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    重複している正規の記事を探し、保存と同じ書き込みに加える紐付けを返す
+    
+    Args:
+        firestore_client: FirestoreClient
+        doc_id: ドキュメントID
+        article: 保存する記事データ
+        status: 保存結果 ("new" | "updated")
+        dedup_config: 重複検出の設定
+    
+    Returns:
+        紐付けのフィールド (紐付けない場合は空、更新で重複でなくなった場合は削除)
+    """
+    try:
+        with span("scrape.dedup"):
+            link = find_canonical(firestore_client, doc_id, article, dedup_config)
+    except Exception as e:
+        print(f"⚠️ 重複記事の検出失敗: {doc_id} | {e}")
+        return {}
+    
+    if link:
+        kind = "同一" if link["duplicateExact"] else "日付違い"
+        print(f"🔗 重複記事 ({kind}, 類似度 {link['duplicateSimilarity']}): {doc_id} → {link['duplicateOf']}")
+        return firestore_client.duplicate_link_fields(link)
+    if status == "updated":
+        # 更新で内容が変わった場合は以前の紐付けを外す
+        return firestore_client.duplicate_link_fields(None)
+    return {}
+
+
+def main():
+    """メイン処理"""
+    print("🚀 OMO Platform - Scrape開始")
+    
+    # 設定を初期化 (環境変数 MUNICIPALITY の自治体)
+    config = get_config()
+    get_metrics().reset()  # ウォームスタートで前回の計測を引き継がない
+    try:
+        run_scrape(config)
+    finally:
+        get_metrics().write_report(f"scrape-{config.municipality}")
 
 
 # Cloud Functions用ハンドラ
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 汎用自治体HPスクレイパー
+
+一覧ページ → 記事詳細ページ の構成の自治体HPを、
+YAMLのセレクタ設定だけでスクレイピングする
+"""
+
+import hashlib
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Any
+from urllib.parse import urljoin
+
+import soupsieve
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from backend.scrape.core.base import MunicipalScraper
+from backend.scrape.core.http import get_http_client
+from backend.common.utils import compute_quick_hash, compute_semantic_fingerprint, clean_image_urls
+
+
+# セレクタのデフォルト値
+DEFAULT_SELECTORS = {
+    "list_item_container": "div.list_item",
+    "date": "span.date",
+    "link": "a",
+    "title": "h1.page_title",
+    "content_body": "div.main_content",
+    "pdf_link": 'a[href$=".pdf"], a[href$=".PDF"]',
+    "image": "img[src]",
+}
+
+
+@lru_cache(maxsize=256)
+def compile_selector(selector: str) -> soupsieve.SoupSieve:
+    """
+    CSSセレクタをコンパイル (同じセレクタは1回だけ)
+    
+    Args:
+        selector: CSSセレクタ
+    
+    Returns:
+        コンパイル済みセレクタ
+    """
+    return soupsieve.compile(selector)
+
+
+class GenericMunicipalScraper(MunicipalScraper):
+    """汎用自治体HPスクレイパー (設定駆動)"""
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: 情報源設定
+                {
+                    "enabled": bool,
+                    "source_id": "moriya_municipal",  # doc_id の接頭辞・category
+                    "display_name": "守谷市",
+                    "base_url": "...",
+                    "list_url": "...",
+                    "parser": "lxml",
+                    "selectors": {...},
+                    "max_items": 10
+                }
+        """
+        super().__init__(config)
+        self.http = get_http_client()
+        
+        self.source_id = config.get("source_id", "municipal")
+        self.display_name = config.get("display_name", self.source_id)
+        self.base_url = config.get("base_url", "")
+        self.list_url = config.get("list_url", "")
+        self.parser = config.get("parser", "lxml")
+        self.max_items = config.get("max_items", config.get("max_per_site", 10))
+        
+        # セレクタは実行前に1回だけコンパイル
+        self.selectors = {**DEFAULT_SELECTORS, **(config.get("selectors") or {})}
+        self.compiled = {key: compile_selector(sel) for key, sel in self.selectors.items()}
+    
+    def get_source_type(self) -> str:
+        """情報源タイプを取得"""
+        return self.source_id
+    
+    def scrape(self) -> List[Dict[str, Any]]:
+        """
+        スクレイピングを実行
+        
+        Returns:
+            スクレイプされた記事のリスト
+        """
+        if not self.is_enabled():
+            print(f"⏩ {self.display_name}スクレイパーは無効です")
+            return []
+        
+        print(f"\n--- {self.display_name}公式HP ---")
+        
+        # 一覧取得
+        news_list = self.get_news_list()
+        
+        # 記事詳細を取得
+        articles = []
+        for info in news_list[:self.max_items]:
+            try:
+                article = self.get_article_detail(
+                    url=info["url"],
+                    list_title=info.get("list_title", ""),
+                    published_date=info.get("date", "")
+                )
+                
+                article["doc_id"] = self.make_doc_id(info["url"])
+                article["category"] = self.source_id
+                article["original_url"] = info["url"]
+                article["published_date_str"] = info.get("date", "")
+                article["list_title"] = info.get("list_title", "")
+                
+                articles.append(article)
+            
+            except Exception as e:
+                print(f"❌ 記事取得エラー: {info['url']} | {e}")
+        
+        print(f"✅ {self.display_name}: {len(articles)} 件取得")
+        return articles
+    
+    def make_doc_id(self, url: str) -> str:
+        """記事URLからドキュメントIDを生成"""
+        return f"{self.source_id}_{hashlib.sha256(url.encode()).hexdigest()}"
+    
+    def get_news_list(self) -> List[Dict[str, Any]]:
+        """
+        お知らせ一覧を取得
+        
+        Returns:
+            お知らせ情報のリスト
+        """
+        try:
+            soup = self.http.get_soup(self.list_url, timeout=20, parser=self.parser)
+            
+            date_sel = self.compiled["date"]
+            link_sel = self.compiled["link"]
+            
+            results = []
+            for item in self.compiled["list_item_container"].select(soup):
+                date_el = date_sel.select_one(item)
+                link_el = link_sel.select_one(item)
+                
+                if not (date_el and link_el):
+                    continue
+                
+                href = link_el.get("href")
+                if not href:
+                    continue
+                
+                results.append({
+                    "url": urljoin(self.base_url, href),
+                    "date": date_el.get_text(strip=True),
+                    "list_title": link_el.get_text(strip=True)
+                })
+            
+            print(f"📄 一覧取得: {len(results)} 件")
+            return results
+        
+        except Exception as e:
+            print(f"⚠️ 一覧取得失敗: {e}")
+            return []
+    
+    def get_article_detail(
+        self,
+        url: str,
+        list_title: str,
+        published_date: str
+    ) -> Dict[str, Any]:
+        """
+        記事詳細を取得
+        
+        Args:
+            url: 記事URL
+            list_title: 一覧ページでのタイトル
+            published_date: 公開日文字列
+        
+        Returns:
+            記事詳細データ
+        """
+        soup = self.http.get_soup(url, timeout=20, parser=self.parser)
+        
+        # タイトル
+        title_el = self.compiled["title"].select_one(soup)
+        page_title = title_el.get_text(strip=True) if title_el else (list_title or "タイトル不明")
+        
+        # 本文
+        content_body = self.compiled["content_body"].select_one(soup)
+        body_text = ""
+        pdf_links = []
+        image_links = []
+        
+        if content_body:
+            # 本文テキスト
+            body_text = content_body.get_text(separator="\n", strip=True)
+            body_lines = [ln.strip() for ln in body_text.splitlines()]
+            body_text = "\n".join([ln for ln in body_lines if ln])
+            
+            # PDFリンク
+            for a in self.compiled["pdf_link"].select(content_body):
+                href = a.get("href")
+                if href:
+                    pdf_links.append(urljoin(self.base_url, href))
+            
+            # 画像リンク
+            for img in self.compiled["image"].select(content_body):
+                src = img.get("src")
+                if src:
+                    image_links.append(urljoin(self.base_url, src))
+        
+        # ノイズ画像除去
+        image_links = clean_image_urls(image_links)
+        pdf_links = list(set(pdf_links))
+        
+        # 軽量ハッシュ計算
+        quick_hash = compute_quick_hash(
+            body_text=body_text,
+            pdf_links=pdf_links,
+            image_links=image_links,
+            page_title=page_title,
+            published_date=published_date
+        )
+        
+        # 意味的フィンガープリント (軽微な変更で再変換しないため)
+        semantic_fingerprint = compute_semantic_fingerprint(
+            body_text=body_text,
+            pdf_links=pdf_links,
+            image_links=image_links,
+            page_title=page_title,
+            published_date=published_date
+        )
+        
+        return {
+            "title": page_title,
+            "body_text": body_text,
+            "pdf_links": pdf_links,
+            "image_links": image_links,
+            "quick_hash": quick_hash,
+            "semantic_fingerprint": semantic_fingerprint,
+        }
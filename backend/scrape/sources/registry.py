@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - スクレイパーレジストリ
+
+YAMLの sources 設定からスクレイパーを生成する。
+新しい自治体は設定の追加だけで対応できる (scraper: "generic")
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Type
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from backend.scrape.core.base import BaseScraper
+from backend.scrape.sources.municipal.generic import GenericMunicipalScraper
+from backend.scrape.sources.municipal.moriya import MoriyaScraper
+
+
+# scraper 名 → クラス
+SCRAPER_REGISTRY: Dict[str, Type[BaseScraper]] = {
+    "generic": GenericMunicipalScraper,
+    "moriya": MoriyaScraper,
+}
+
+# scraper 未指定時の情報源ごとのデフォルト
+DEFAULT_SCRAPERS = {
+    "municipal_website": "moriya",
+    "municipal_hp": "generic",
+}
+
+
+def register_scraper(name: str, scraper_cls: Type[BaseScraper]):
+    """
+    スクレイパーを登録
+    
+    Args:
+        name: 設定の scraper に書く名前
+        scraper_cls: スクレイパークラス
+    """
+    SCRAPER_REGISTRY[name] = scraper_cls
+
+
+def create_scraper(source_type: str, source_config: Dict[str, Any]) -> Optional[BaseScraper]:
+    """
+    情報源設定からスクレイパーを生成
+    
+    Args:
+        source_type: 情報源タイプ (sources のキー)
+        source_config: 情報源設定
+    
+    Returns:
+        スクレイパー (未対応の場合はNone)
+    """
+    scraper_type = source_config.get("scraper") or DEFAULT_SCRAPERS.get(source_type)
+    scraper_cls = SCRAPER_REGISTRY.get(scraper_type)
+    
+    if scraper_cls is None:
+        print(f"⚠️ 未対応のスクレイパー: {source_type} ({scraper_type})")
+        return None
+    
+    return scraper_cls(source_config)
+
+
+def build_scrapers(config) -> List[BaseScraper]:
+    """
+    有効な情報源すべてのスクレイパーを生成
+    
+    Args:
+        config: Configインスタンス
+    
+    Returns:
+        スクレイパーのリスト
+    """
+    scrapers = []
+    for source_type in config.get_source_types():
+        if not config.is_source_enabled(source_type):
+            continue
+        
+        scraper = create_scraper(source_type, config.get_source_config(source_type))
+        if scraper:
+            scrapers.append(scraper)
+    
+    return scrapers
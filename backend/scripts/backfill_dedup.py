@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 重複検出フィールドのバックフィル
+
+重複記事の検出を有効にする前に保存された記事は、内容が変わらない限り
+スクレイプで再保存されない (nochange) ため、MinHash 署名を持たず候補に現れない。
+既存の記事に対して次を書き込む (変換の状態・結果には触れない):
+- minhash / lsh_bands: ない記事のみ
+- semantic_fingerprint.dates / version: 古いバージョンのフィンガープリントのみ
+  (共通部品の「最終更新日」を含まない日付で計算し直し、完全な重複を判定できるようにする)
+
+使い方:
+    python backend/scripts/backfill_dedup.py [--dry-run]
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, Any
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.common.config import get_config
+from backend.common.dedup import compute_signature_fields
+from backend.common.firestore import get_firestore_client
+from backend.common.utils import FINGERPRINT_VERSION, fingerprint_dates
+
+
+# 読み込むフィールド (署名の計算に本文を使う)
+BACKFILL_FIELDS = ["title", "body_text", "pdf_text", "minhash", "semantic_fingerprint"]
+
+
+def backfill_updates(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    1記事分の更新内容
+    
+    Args:
+        data: ドキュメントの辞書 (BACKFILL_FIELDS)
+    
+    Returns:
+        更新データ (更新不要の場合は空)
+    """
+    updates: Dict[str, Any] = {}
+    
+    if not data.get("minhash") and (data.get("title") or data.get("body_text")):
+        updates.update(compute_signature_fields(data))
+    
+    fingerprint = data.get("semantic_fingerprint")
+    if isinstance(fingerprint, dict) and fingerprint.get("version") != FINGERPRINT_VERSION:
+        updates["semantic_fingerprint.dates"] = fingerprint_dates(data.get("body_text", ""))
+        updates["semantic_fingerprint.version"] = FINGERPRINT_VERSION
+    
+    return updates
+
+
+def backfill(dry_run: bool = False) -> int:
+    """
+    既存の記事に重複検出のフィールドを書き込む
+    
+    Args:
+        dry_run: Trueの場合は件数の表示のみ
+    
+    Returns:
+        更新した (dry_run の場合は更新が必要な) 記事数
+    """
+    config = get_config()
+    firestore_client = get_firestore_client(config)
+    
+    print(f"📍 自治体: {config.municipality_name}")
+    print(f"📦 コレクション: {config.firestore_collection_name}")
+    
+    updates = {}
+    signatures = 0
+    fingerprints = 0
+    for snapshot in firestore_client.select_all(BACKFILL_FIELDS):
+        update = backfill_updates(snapshot.to_dict() or {})
+        if not update:
+            continue
+        updates[snapshot.id] = update
+        signatures += "minhash" in update
+        fingerprints += "semantic_fingerprint.version" in update
+    
+    print(f"🔍 更新対象: {len(updates)} 件 (署名 {signatures} 件, フィンガープリント {fingerprints} 件)")
+    
+    if dry_run or not updates:
+        return len(updates)
+    
+    return firestore_client.batch_update(updates)
+
+
+def main():
+    """メイン処理"""
+    print("🚀 OMO Platform - 重複検出フィールドのバックフィル")
+    backfill(dry_run="--dry-run" in sys.argv[1:])
+
+
+# ローカル実行
+if __name__ == "__main__":
+    main()
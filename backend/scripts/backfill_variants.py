@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 画像バリアントのバックフィル
+
+バリアント (WebP・JPEG などと幅違いのサムネイル) を有効にする前に生成した画像は、
+記事が変わらない限り変換し直されないため variants を持たない。
+保存済みの PNG を読み込んでバリアントを作り、transformedContent.image_single.variants
+だけを書き込む (画像生成モデルは呼ばない。変換の状態・他の結果には触れない)。
+
+使い方:
+    python backend/scripts/backfill_variants.py [--dry-run]
+"""
+
+import posixpath
+import sys
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.common.config import get_config
+from backend.common.firestore import get_firestore_client
+from backend.common.storage import load_file
+from backend.transform.image.variants import VariantBuilder, shutdown_pool
+
+
+# 読み込むフィールド (画像のパスだけ)
+BACKFILL_FIELDS = ["transformedContent.image_single"]
+
+# 画像のキーの接頭辞 (例: image_path_16x9)
+IMAGE_KEY_PREFIX = "image_path_"
+
+# 途中で止まっても作成済みの分が残るよう、この件数ごとに書き込む
+FLUSH_EVERY = 50
+
+
+def _stored_images(result: Dict[str, Any]) -> Dict[str, str]:
+    """
+    結果に保存されている画像のファイル名
+    
+    Returns:
+        {キー (例: "1x1"): 保存ファイル名 (例: "images/タイトル_eye_catch_1x1.png")}
+    """
+    images = {}
+    for key, path in result.items():
+        if not key.startswith(IMAGE_KEY_PREFIX) or not isinstance(path, str) or not path:
+            continue
+        # gs://バケット/images/... または local://.../images/... (ファイル名に "/" は含まれない)
+        images[key[len(IMAGE_KEY_PREFIX):]] = f"images/{posixpath.basename(path)}"
+    return images
+
+
+def _filename_prefix(key: str, filename: str) -> Optional[str]:
+    """保存ファイル名からバリアントの接頭辞 (例: "images/タイトル_eye_catch")"""
+    suffix = f"_{key}.png"
+    return filename[:-len(suffix)] if filename.endswith(suffix) else None
+
+
+def backfill_targets(snapshots) -> Dict[str, Tuple[Dict[str, str], str]]:
+    """
+    バリアントのない画像結果
+    
+    Returns:
+        {ドキュメントID: ({キー: 保存ファイル名}, 接頭辞)}
+    """
+    targets = {}
+    for snapshot in snapshots:
+        result = ((snapshot.to_dict() or {}).get("transformedContent") or {}).get("image_single")
+        if not isinstance(result, dict) or result.get("variants"):
+            continue
+        images = _stored_images(result)
+        if not images:
+            continue
+        key, filename = next(iter(images.items()))
+        prefix = _filename_prefix(key, filename)
+        if prefix is None:
+            print(f"⚠️ ファイル名を解釈できません: {snapshot.id} ({filename})")
+            continue
+        targets[snapshot.id] = (images, prefix)
+    return targets
+
+
+def build_variants(builder: VariantBuilder, images: Dict[str, str], prefix: str) -> Dict[str, Any]:
+    """保存済みの PNG を読み込んでバリアントを作成・保存"""
+    loaded = {}
+    for key, filename in images.items():
+        data = load_file(filename)
+        if data:
+            loaded[key] = data
+        else:
+            print(f"⚠️ 画像が見つかりません: {filename}")
+    return builder.build(loaded, prefix)
+
+
+def backfill(dry_run: bool = False) -> int:
+    """
+    既存の画像結果にバリアントを書き込む
+    
+    Args:
+        dry_run: Trueの場合は件数の表示のみ
+    
+    Returns:
+        更新した (dry_run の場合は更新が必要な) 記事数
+    """
+    config = get_config()
+    builder = VariantBuilder(config.get_transform_config("image_single").get("variants", {}))
+    
+    print(f"📍 自治体: {config.municipality_name}")
+    print(f"📦 コレクション: {config.firestore_collection_name}")
+    
+    if not builder.enabled:
+        print("⚠️ image_single.variants が無効のためバックフィルしません")
+        return 0
+    
+    firestore_client = get_firestore_client(config)
+    targets = backfill_targets(firestore_client.select_all(BACKFILL_FIELDS))
+    print(f"🔍 更新対象: {len(targets)} 件")
+    
+    if dry_run or not targets:
+        return len(targets)
+    
+    updated = 0
+    updates = {}
+    try:
+        for i, (doc_id, (images, prefix)) in enumerate(targets.items(), start=1):
+            print(f"🖼️ [{i}/{len(targets)}] {prefix}")
+            try:
+                variants = build_variants(builder, images, prefix)
+            except Exception as e:
+                print(f"⚠️ バリアント作成失敗: {doc_id} | {e}")
+                continue
+            if variants:
+                updates[doc_id] = {"transformedContent.image_single.variants": variants}
+            if len(updates) >= FLUSH_EVERY:
+                updated += firestore_client.batch_update(updates)
+                updates = {}
+        if updates:
+            updated += firestore_client.batch_update(updates)
+    finally:
+        shutdown_pool()
+    
+    print(f"✅ バリアントを書き込みました: {updated} 件")
+    return updated
+
+
+def main():
+    """メイン処理"""
+    print("🚀 OMO Platform - 画像バリアントのバックフィル")
+    backfill(dry_run="--dry-run" in sys.argv[1:])
+
+
+# ローカル実行
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - エントリポイントの import 時間チェック
+
+python -X importtime で各エントリポイントを新しいプロセスで読み込み、
+import 時間が予算内か、起動時に読み込まない約束のモジュール
+(Gemini SDK / PIL / google.cloud.storage) が読み込まれていないかを確認する。
+Cloud Functions のコールドスタートの悪化を検出するためのもの
+
+使い方:
+    python backend/scripts/check_import_time.py [モジュール ...]
+
+設定 (環境変数):
+    IMPORT_TIME_BUDGET_MS: エントリポイントごとの import 時間の上限 (既定: 1500)
+    IMPORT_TIME_REPEAT: 計測回数 (最小値で判定、既定: 3)
+
+終了コード:
+    0: すべて予算内, 1: 予算超過または遅延対象モジュールの読み込みあり
+"""
+
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# プロジェクトルート
+ROOT_DIR = Path(__file__).parent.parent.parent
+
+# 計測するエントリポイント
+DEFAULT_ENTRY_POINTS = [
+    "backend.scrape.main",
+    "backend.transform.main",
+    "backend.runner.pipeline",
+    "backend.runner.worker",
+]
+
+# 起動時に読み込まない (使う変換器・保存先で初めて読み込む) モジュール
+DEFERRED_MODULES = [
+    "google.generativeai",
+    "google.genai",
+    "google.cloud.storage",
+    "PIL",
+]
+
+# -X importtime の出力行: "import time: self [us] | cumulative | imported package"
+_LINE_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_import(module: str) -> Tuple[float, Dict[str, int]]:
+    """
+    モジュールを新しいプロセスで import して計測
+    
+    Args:
+        module: モジュール名
+    
+    Returns:
+        (import 時間ミリ秒, {読み込まれたモジュール名: 累積マイクロ秒})
+    """
+    env = dict(os.environ, PYTHONPATH=str(ROOT_DIR))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{module} の import に失敗: {result.stderr.strip().splitlines()[-1:]}")
+    
+    modules: Dict[str, int] = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if not match:
+            continue
+        cumulative = int(match.group(2))
+        name = match.group(4)
+        modules[name] = cumulative
+        # インデントのない行がトップレベルの import (累積値の合計が全体の時間)
+        if len(match.group(3)) <= 1:
+            total_us += cumulative
+    
+    return total_us / 1000, modules
+
+
+def find_deferred(modules: Dict[str, int]) -> List[str]:
+    """読み込まれた遅延対象モジュール"""
+    return [
+        prefix for prefix in DEFERRED_MODULES
+        if any(name == prefix or name.startswith(prefix + ".") for name in modules)
+    ]
+
+
+def check_entry_point(module: str, budget_ms: float, repeat: int) -> bool:
+    """
+    1エントリポイントを確認
+    
+    Returns:
+        予算内かつ遅延対象モジュールを読み込んでいなければTrue
+    """
+    best_ms: Optional[float] = None
+    modules: Dict[str, int] = {}
+    for _ in range(max(1, repeat)):
+        elapsed_ms, modules = measure_import(module)
+        best_ms = elapsed_ms if best_ms is None else min(best_ms, elapsed_ms)
+    
+    deferred = find_deferred(modules)
+    ok = best_ms <= budget_ms and not deferred
+    
+    print(f"{'✅' if ok else '❌'} {module}: {best_ms:.0f} ms (予算 {budget_ms:.0f} ms)")
+    if deferred:
+        print(f"   起動時に読み込まれたモジュール: {', '.join(deferred)}")
+    
+    # 累積時間の大きいトップレベルのパッケージ
+    top = sorted(
+        ((name, us) for name, us in modules.items() if "." not in name),
+        key=lambda item: item[1],
+        reverse=True
+    )[:5]
+    for name, us in top:
+        print(f"   {us / 1000:>8.1f} ms  {name}")
+    
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """メイン処理"""
+    args = list(argv if argv is not None else sys.argv[1:])
+    entry_points = args or DEFAULT_ENTRY_POINTS
+    budget_ms = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+    repeat = int(os.getenv("IMPORT_TIME_REPEAT", "3"))
+    
+    print(f"⏱️ import 時間チェック ({len(entry_points)} エントリポイント)")
+    
+    failed = []
+    for module in entry_points:
+        try:
+            if not check_entry_point(module, budget_ms, repeat):
+                failed.append(module)
+        except Exception as e:
+            print(f"❌ {module}: {e}")
+            failed.append(module)
+    
+    if failed:
+        print(f"\n❌ 予算超過・遅延対象の読み込み: {', '.join(failed)}")
+        return 1
+    
+    print("\n✅ すべてのエントリポイントが予算内です")
+    return 0
+
+
+# ローカル実行
+if __name__ == "__main__":
+    sys.exit(main())
@@ -39,12 +39,17 @@ def reset_transform_fields():
     
     # リセット対象のフィールド
     reset_fields = [
+        "text_digest",
         "text_simple",
         "text_easy",
         "image_single",
         "text_script",
         "video_short",
         "transformStatus",
+        "transformedAt",
+        "usage",
+        "leaseOwner",
+        "leaseExpiresAt",
     ]
     
     # バッチ処理
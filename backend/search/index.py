@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 全文検索の転置索引
+
+バイグラム → (記事番号, 出現位置) の転置索引。
+ファイル形式 (可変長整数 = varint、記事番号・位置は差分で格納):
+
+    MAGIC
+    varint(ヘッダ長) ヘッダ(JSON: 記事の一覧 [[ID, タイトル, 公開日, バージョン], ...])
+    varint(トークン数)
+    トークンごと: varint(長さ) トークン(UTF-8) varint(ポスティング長) ポスティング
+    ポスティング: varint(記事数) 記事ごと: varint(記事番号の差分) varint(出現数) varint(位置の差分)...
+
+読み込み時はポスティングをバイト列のまま保持し、検索で使うトークンだけ展開する。
+追加・更新した記事は差分 (メモリ上) に積み、保存時に削除済みの記事を除いて書き直す
+"""
+
+import json
+import re
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from backend.common.storage import load_file, save_file
+from backend.search.tokenizer import parse_date, tokenize
+
+
+MAGIC = b"OMOSIDX1"
+
+# 索引の保存先 (search/<自治体>/index.bin)
+INDEX_DIR = "search"
+INDEX_FILE = "index.bin"
+
+# 検索語 (ダブルクォートで囲むとスペースを含むフレーズ)
+_QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+Postings = Dict[int, List[int]]
+
+
+# ========================================
+# varint
+# ========================================
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, offset: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def encode_postings(postings: Postings) -> bytes:
+    """ポスティングをバイト列に変換"""
+    out = bytearray()
+    _write_varint(out, len(postings))
+    previous_doc = 0
+    for doc_num in sorted(postings):
+        positions = postings[doc_num]
+        _write_varint(out, doc_num - previous_doc)
+        _write_varint(out, len(positions))
+        previous_pos = 0
+        for pos in positions:
+            _write_varint(out, pos - previous_pos)
+            previous_pos = pos
+        previous_doc = doc_num
+    return bytes(out)
+
+
+def decode_postings(data) -> Postings:
+    """バイト列からポスティングを復元"""
+    postings: Postings = {}
+    count, offset = _read_varint(data, 0)
+    doc_num = 0
+    for _ in range(count):
+        delta, offset = _read_varint(data, offset)
+        doc_num += delta
+        n, offset = _read_varint(data, offset)
+        positions = []
+        pos = 0
+        for _ in range(n):
+            delta, offset = _read_varint(data, offset)
+            pos += delta
+            positions.append(pos)
+        postings[doc_num] = positions
+    return postings
+
+
+# ========================================
+# 転置索引
+# ========================================
+
+class SearchIndex:
+    """記事の転置索引 (スレッドセーフ)"""
+    
+    def __init__(self):
+        # 記事番号 → [ID, タイトル, 公開日, バージョン] (削除済みは None)
+        self._docs: List[Optional[List[str]]] = []
+        self._doc_nums: Dict[str, int] = {}
+        # 読み込んだ索引 (トークン → ポスティングのバイト列)
+        self._base: Dict[str, memoryview] = {}
+        # 読み込み後に追加した記事 (トークン → ポスティング)
+        self._delta: Dict[str, Postings] = {}
+        self._lock = threading.RLock()
+        self.dirty = False
+    
+    def __len__(self) -> int:
+        return len(self._doc_nums)
+    
+    def version(self, doc_id: str) -> Optional[str]:
+        """索引済みの記事のバージョン (未登録はNone)"""
+        with self._lock:
+            doc_num = self._doc_nums.get(doc_id)
+            return self._docs[doc_num][3] if doc_num is not None else None
+    
+    def doc_ids(self) -> List[str]:
+        """索引済みの記事ID"""
+        with self._lock:
+            return list(self._doc_nums)
+    
+    def add_document(self, doc_id: str, data: Dict[str, Any]) -> bool:
+        """
+        記事を索引に追加 (登録済みの場合は置き換え)
+        
+        Args:
+            doc_id: ドキュメントID
+            data: ドキュメントの辞書 (title, body_text, published_date_str, quick_hash)
+        
+        Returns:
+            索引を更新したか (バージョンが同じ場合は何もしない)
+        """
+        version = data.get("quick_hash") or ""
+        title = data.get("title", "")
+        text = "\n".join(t for t in (title, data.get("body_text", ""), data.get("pdf_text", "")) if t)
+        tokens = tokenize(text)
+        
+        with self._lock:
+            if doc_id in self._doc_nums and self._docs[self._doc_nums[doc_id]][3] == version:
+                return False
+            self.remove_document(doc_id)
+            
+            doc_num = len(self._docs)
+            self._docs.append([doc_id, title, parse_date(data.get("published_date_str", "")) or "", version])
+            self._doc_nums[doc_id] = doc_num
+            
+            for token, pos in tokens:
+                self._delta.setdefault(token, {}).setdefault(doc_num, []).append(pos)
+            
+            self.dirty = True
+            return True
+    
+    def remove_document(self, doc_id: str) -> bool:
+        """記事を索引から外す (ポスティングは保存時に取り除く)"""
+        with self._lock:
+            doc_num = self._doc_nums.pop(doc_id, None)
+            if doc_num is None:
+                return False
+            self._docs[doc_num] = None
+            self.dirty = True
+            return True
+    
+    def postings(self, token: str) -> Postings:
+        """トークンのポスティング (削除済みの記事を除く)"""
+        with self._lock:
+            raw = self._base.get(token)
+            delta = self._delta.get(token)
+            merged = decode_postings(raw) if raw is not None else {}
+            if delta:
+                merged.update(delta)
+            return {d: p for d, p in merged.items() if self._docs[d] is not None}
+    
+    def _tokens_containing(self, char: str) -> List[str]:
+        with self._lock:
+            return [t for t in set(self._base) | set(self._delta) if char in t]
+    
+    # ========================================
+    # 検索
+    # ========================================
+    
+    def search(
+        self,
+        query: str,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: int = 20
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        AND検索
+        
+        スペース区切りの語をすべて含む記事を返す。各語は連続した文字列として照合し
+        (バイグラムの位置が連続するもの)、ダブルクォートで囲むとスペースを含むフレーズになる
+        
+        Args:
+            query: 検索語
+            date_from: 公開日の下限 (YYYY-MM-DD、含む)
+            date_to: 公開日の上限 (YYYY-MM-DD、含む)
+            limit: 返す件数
+        
+        Returns:
+            ([{"id", "title", "published_date", "hits"}], 該当件数) 公開日の新しい順
+        """
+        clauses = [tokenize(a or b) for a, b in _QUERY_PATTERN.findall(query or "")]
+        clauses = [c for c in clauses if c]
+        if not clauses:
+            return [], 0
+        
+        hits: Optional[Dict[int, int]] = None
+        for clause in clauses:
+            matched = self._match_clause(clause)
+            if hits is None:
+                hits = matched
+            else:
+                hits = {d: hits[d] + n for d, n in matched.items() if d in hits}
+            if not hits:
+                return [], 0
+        
+        with self._lock:
+            results = []
+            for doc_num, count in hits.items():
+                doc = self._docs[doc_num]
+                if doc is None:
+                    continue
+                doc_id, title, date, _ = doc
+                if (date_from and (not date or date < date_from)) or (date_to and (not date or date > date_to)):
+                    continue
+                results.append({"id": doc_id, "title": title, "published_date": date, "hits": count})
+        
+        results.sort(key=lambda r: (r["published_date"], r["hits"]), reverse=True)
+        return results[:limit], len(results)
+    
+    def _match_clause(self, clause: List[Tuple[str, int]]) -> Dict[int, int]:
+        """1語に一致する記事 → 出現数"""
+        # 1文字の語はその文字を含むトークンすべてで探す (位置は見ない)
+        if len(clause) == 1 and len(clause[0][0]) == 1:
+            matched: Dict[int, int] = {}
+            for token in self._tokens_containing(clause[0][0]):
+                for doc_num, positions in self.postings(token).items():
+                    matched[doc_num] = matched.get(doc_num, 0) + len(positions)
+            return matched
+        
+        lists = [(self.postings(token), rel) for token, rel in clause]
+        lists.sort(key=lambda item: len(item[0]))
+        if not lists[0][0]:
+            return {}
+        
+        candidates = set(lists[0][0])
+        for postings, _ in lists[1:]:
+            candidates &= postings.keys()
+            if not candidates:
+                return {}
+        
+        # 出現位置が連続しているか (最初のトークンの位置 - 相対位置 = 語の開始位置)
+        anchor_postings, anchor_rel = lists[0]
+        matched = {}
+        for doc_num in candidates:
+            position_sets = [(set(p[doc_num]), rel) for p, rel in lists[1:]]
+            count = sum(
+                1 for pos in anchor_postings[doc_num]
+                if all(pos - anchor_rel + rel in positions for positions, rel in position_sets)
+            )
+            if count:
+                matched[doc_num] = count
+        return matched
+    
+    # ========================================
+    # 保存・読み込み
+    # ========================================
+    
+    def to_bytes(self) -> bytes:
+        """索引をバイト列に変換 (削除済みの記事を除いて記事番号を詰め直す)"""
+        with self._lock:
+            renumber = {}
+            docs = []
+            for doc_num, doc in enumerate(self._docs):
+                if doc is not None:
+                    renumber[doc_num] = len(docs)
+                    docs.append(doc)
+            
+            out = bytearray(MAGIC)
+            header = json.dumps(docs, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            _write_varint(out, len(header))
+            out += header
+            
+            encoded = []
+            for token in sorted(set(self._base) | set(self._delta)):
+                postings = {renumber[d]: p for d, p in self.postings(token).items()}
+                if postings:
+                    encoded.append((token.encode("utf-8"), encode_postings(postings)))
+            
+            _write_varint(out, len(encoded))
+            for token, payload in encoded:
+                _write_varint(out, len(token))
+                out += token
+                _write_varint(out, len(payload))
+                out += payload
+            return bytes(out)
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SearchIndex":
+        """
+        バイト列から索引を復元 (ポスティングは検索時に展開)
+        
+        Raises:
+            ValueError: 形式が違う場合
+        """
+        if not data.startswith(MAGIC):
+            raise ValueError("search index: unknown format")
+        
+        index = cls()
+        view = memoryview(data)
+        offset = len(MAGIC)
+        
+        header_len, offset = _read_varint(view, offset)
+        index._docs = json.loads(bytes(view[offset:offset + header_len]).decode("utf-8"))
+        index._doc_nums = {doc[0]: i for i, doc in enumerate(index._docs)}
+        offset += header_len
+        
+        count, offset = _read_varint(view, offset)
+        for _ in range(count):
+            token_len, offset = _read_varint(view, offset)
+            token = bytes(view[offset:offset + token_len]).decode("utf-8")
+            offset += token_len
+            payload_len, offset = _read_varint(view, offset)
+            index._base[token] = view[offset:offset + payload_len]
+            offset += payload_len
+        
+        return index
+
+
+def index_path(municipality: str) -> str:
+    """索引の保存先ファイル名"""
+    return f"{INDEX_DIR}/{municipality}/{INDEX_FILE}"
+
+
+def load_index(municipality: str) -> SearchIndex:
+    """
+    保存済みの索引を読み込む (ない・壊れている場合は空の索引)
+    
+    Args:
+        municipality: 自治体名
+    """
+    data = load_file(index_path(municipality))
+    if not data:
+        return SearchIndex()
+    
+    try:
+        return SearchIndex.from_bytes(data)
+    except (ValueError, IndexError) as e:
+        print(f"⚠️ 検索索引を読み込めないため作り直します: {e}")
+        return SearchIndex()
+
+
+def save_index(index: SearchIndex, municipality: str) -> str:
+    """
+    索引を保存
+    
+    Args:
+        index: SearchIndex
+        municipality: 自治体名
+    
+    Returns:
+        保存先パス
+    """
+    path = save_file(index.to_bytes(), index_path(municipality), "application/octet-stream")
+    index.dirty = False
+    return path
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 全文検索の索引作成
+
+- update_index: 全記事の quick_hash だけを読み、索引と違う記事だけ本文を読み直す (オフライン作成)
+- StreamIndexer: スクレイプが発行する記事イベントを受け取り、保存された記事をその場で索引に追加
+
+どちらも保存済みの索引 (storage の search/<自治体>/index.bin) に差分を積んで書き戻す
+"""
+
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.common.config import get_config
+from backend.common.events import ArticleEventQueue, get_event_bus
+from backend.common.firestore import get_firestore_client
+from backend.common.metrics import get_metrics, span
+from backend.search.index import SearchIndex, load_index, save_index
+
+
+# 本文をまとめて読む件数
+READ_BATCH_SIZE = 100
+
+
+def _read_documents(firestore_client, doc_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """記事をまとめて読む"""
+    documents = {}
+    for i in range(0, len(doc_ids), READ_BATCH_SIZE):
+        with span("firestore.get", source="search") as s:
+            s.amount = len(doc_ids[i:i + READ_BATCH_SIZE])
+            snapshots = firestore_client.get_documents(doc_ids[i:i + READ_BATCH_SIZE])
+        for snapshot in snapshots:
+            documents[snapshot.id] = snapshot.to_dict() or {}
+    return documents
+
+
+def update_index(config, firestore_client=None, index: Optional[SearchIndex] = None) -> Dict[str, Any]:
+    """
+    1自治体分の検索索引を差分更新
+    
+    Args:
+        config: Configインスタンス
+        firestore_client: FirestoreClient (Noneの場合は自治体のコレクションで取得)
+        index: 更新する索引 (Noneの場合は保存済みの索引を読み込む)
+    
+    Returns:
+        {"documents": 索引の記事数, "added": 追加・更新数, "removed": 削除数}
+    """
+    firestore_client = firestore_client or get_firestore_client(config)
+    index = index if index is not None else load_index(config.municipality)
+    
+    with span("firestore.list", source="search"):
+        versions = {
+            snapshot.id: (snapshot.to_dict() or {}).get("quick_hash") or ""
+            for snapshot in firestore_client.select_all(["quick_hash"])
+        }
+    
+    removed = 0
+    for doc_id in index.doc_ids():
+        if doc_id not in versions and index.remove_document(doc_id):
+            removed += 1
+    
+    changed = [doc_id for doc_id, version in versions.items() if index.version(doc_id) != version]
+    added = 0
+    with span("search.index", municipality=config.municipality) as s:
+        for doc_id, data in _read_documents(firestore_client, changed).items():
+            if index.add_document(doc_id, data):
+                added += 1
+        s.amount = added
+    
+    if index.dirty:
+        save_index(index, config.municipality)
+    
+    print(f"🔎 検索索引: {len(index)} 件 (追加・更新 {added} / 削除 {removed})")
+    return {"documents": len(index), "added": added, "removed": removed}
+
+
+class StreamIndexer:
+    """
+    スクレイプと並行して索引を更新
+    
+    with StreamIndexer(config, firestore_client):
+        run_scrape(config, firestore_client)
+    """
+    
+    def __init__(self, config, firestore_client=None):
+        """
+        Args:
+            config: Configインスタンス
+            firestore_client: FirestoreClient (Noneの場合は自治体のコレクションで取得)
+        """
+        self.config = config
+        self.firestore_client = firestore_client or get_firestore_client(config)
+        self.index = load_index(config.municipality)
+        self.indexed = 0
+        
+        self._events = ArticleEventQueue(config.firestore_collection_name)
+        self._unsubscribe = None
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """記事イベントの購読を開始"""
+        self._unsubscribe = get_event_bus().subscribe(self._events)
+        self._thread = threading.Thread(target=self._consume, name=f"search-{self.config.municipality}", daemon=True)
+        self._thread.start()
+    
+    def close(self):
+        """購読を終了し、キューに残った記事を索引に入れてから保存"""
+        if self._unsubscribe:
+            self._unsubscribe()
+        self._events.close()
+        if self._thread:
+            self._thread.join()
+        
+        if self.index.dirty:
+            save_index(self.index, self.config.municipality)
+        print(f"🔎 スクレイプと並行して索引: {self.indexed} 件")
+    
+    def __enter__(self) -> "StreamIndexer":
+        self.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _consume(self):
+        while True:
+            doc_id = self._events.get()
+            if doc_id is None:
+                return
+            try:
+                with span("firestore.get", source="search"):
+                    snapshot = self.firestore_client.get_document(doc_id)
+                if snapshot.exists and self.index.add_document(doc_id, snapshot.to_dict() or {}):
+                    self.indexed += 1
+            except Exception as e:
+                print(f"⚠️ 検索索引の更新失敗: {doc_id} | {e}")
+
+
+def main():
+    """メイン処理 (保存済みの索引を Firestore の記事に合わせて差分更新)"""
+    print("🚀 OMO Platform - 検索索引の作成開始")
+    
+    # 設定を初期化 (環境変数 MUNICIPALITY の自治体)
+    config = get_config()
+    get_metrics().reset()  # ウォームスタートで前回の計測を引き継がない
+    try:
+        update_index(config)
+    finally:
+        get_metrics().write_report(f"search-{config.municipality}")
+
+
+# ローカル実行
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 全文検索のトークナイザ
+
+日本語は単語の区切りがないため、文字の2-gram (バイグラム) で索引を作る。
+NFKC正規化・小文字化した後、記号・空白で区切られた文字の並び (ラン) ごとに
+隣り合う2文字をトークンにする (1文字だけのランは1文字のトークン)。
+位置はランをまたいで通し番号にするため、検索語も同じ規則で分割すればフレーズ照合できる
+"""
+
+import re
+import unicodedata
+from typing import List, Optional, Tuple
+
+# 文字のラン (記号・空白・アンダースコア以外の連続)
+_RUN_PATTERN = re.compile(r"[^\W_]+")
+
+# 日付 (YYYY年M月D日 / YYYY-MM-DD / YYYY/M/D など)
+_DATE_PATTERN = re.compile(r"(\d{4})\s*[年/\-.]\s*(\d{1,2})\s*[月/\-.]\s*(\d{1,2})")
+
+
+def normalize(text: str) -> str:
+    """NFKC正規化・小文字化"""
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def split_runs(text: str) -> List[str]:
+    """正規化したテキストを文字のランに分割"""
+    return _RUN_PATTERN.findall(normalize(text))
+
+
+def tokenize(text: str) -> List[Tuple[str, int]]:
+    """
+    テキストをバイグラムに分割
+    
+    Args:
+        text: 入力テキスト
+    
+    Returns:
+        [(トークン, 位置)]
+    """
+    tokens = []
+    position = 0
+    for run in split_runs(text):
+        if len(run) == 1:
+            tokens.append((run, position))
+            position += 1
+            continue
+        for i in range(len(run) - 1):
+            tokens.append((run[i:i + 2], position))
+            position += 1
+    return tokens
+
+
+def parse_date(value: str) -> Optional[str]:
+    """
+    公開日の文字列を YYYY-MM-DD に変換
+    
+    Args:
+        value: 公開日 (例: "2026年10月15日")
+    
+    Returns:
+        YYYY-MM-DD (解釈できない場合はNone)
+    """
+    m = _DATE_PATTERN.search(normalize(value))
+    if not m:
+        return None
+    year, month, day = (int(g) for g in m.groups())
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return None
+    return f"{year:04d}-{month:02d}-{day:02d}"
@@ -6,19 +6,26 @@ OMO Platform - 変換基底クラス (フィルタリング対応版)
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 import sys
 from pathlib import Path
 
 # パスを追加
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
 
-from backend.common.filters import ArticleFilter
+from backend.common.filters import create_filter
+from backend.transform.core.long_document import LongDocumentSummarizer
 
 
 class BaseTransformer(ABC):
     """変換基底クラス"""
     
+    # 入力として出力を参照する上流の変換タイプ (入力フィンガープリントに含める)
+    depends_on: List[str] = []
+    
+    # 変換設定に加える自治体設定のトップレベルの設定 (Config の属性名、入力フィンガープリントには含めない)
+    shared_settings: List[str] = []
+    
     def __init__(self, config: Dict[str, Any]):
         """
         Args:
@@ -29,20 +36,31 @@ class BaseTransformer(ABC):
         
         # フィルタ設定
         filter_config = config.get("filters", {})
-        self.filter = ArticleFilter(filter_config) if filter_config else None
+        self.filter = create_filter(filter_config)
+        
+        # 長文モード設定 (Map-Reduce要約)
+        self.long_document = LongDocumentSummarizer(config.get("long_document", {}))
     
-    def transform_with_filter(self, article: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def transform_with_filter(
+        self,
+        article: Dict[str, Any],
+        included: Optional[bool] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         フィルタリングを含めた変換実行
         
         Args:
             article: Firestoreから取得した記事データ
+            included: FilterSet で評価済みの判定 (Noneの場合はここで判定)
         
         Returns:
             変換結果の辞書 (失敗時またはフィルタで除外された場合はNone)
         """
         # フィルタチェック
-        if self.filter and not self.filter.should_include(article):
+        if included is None:
+            included = self.filter.should_include(article) if self.filter else True
+        
+        if not included:
             title = article.get("title", "unknown")
             print(f"⏭️ フィルタによりスキップ: {title[:50]}...")
             return None
@@ -63,6 +81,42 @@ class BaseTransformer(ABC):
         """
         pass
     
+    def prepare_body_text(self, title: str, body_text: str, max_chars: int) -> str:
+        """
+        プロンプトに埋め込む本文を準備
+        
+        長文モードが有効なら Map-Reduce 要約、無効なら切り詰め
+        
+        Args:
+            title: 記事タイトル
+            body_text: 本文
+            max_chars: 最大文字数
+        
+        Returns:
+            max_chars 以内の本文
+        """
+        return self.long_document.condense(title, body_text, max_chars)
+    
+    def get_source_text(self, article: Dict[str, Any]) -> str:
+        """
+        変換の入力となる本文を取得
+        
+        スクレイプ時に取り込んだPDF添付ファイルのテキストがあれば本文の後に連結する
+        
+        Args:
+            article: 記事データ
+        
+        Returns:
+            本文 (+ PDFテキスト)
+        """
+        body_text = article.get("body_text", "") or ""
+        pdf_text = article.get("pdf_text", "") or ""
+        
+        if not pdf_text:
+            return body_text
+        
+        return f"{body_text}\n\n【添付資料】\n{pdf_text}".strip()
+    
     def is_enabled(self) -> bool:
         """変換が有効かどうか"""
         return self.enabled
@@ -81,6 +135,7 @@ class BaseTransformer(ABC):
         Returns:
             変換可能ならTrue
         """
-        # 基本的なフィールドの存在チェック
-        required_fields = ["title", "body_text"]
-        return all(article.get(field) for field in required_fields)
+        # 基本的なフィールドの存在チェック (本文がなくてもPDFテキストがあれば可)
+        if not article.get("title"):
+            return False
+        return bool(article.get("body_text") or article.get("pdf_text"))
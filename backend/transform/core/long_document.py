@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 長文ドキュメント要約 (Map-Reduce)
+
+本文を段落・文の境界で分割して並列に要約し、最後に統合する。
+単純な切り詰めで末尾の締切や会場が失われるのを防ぐ
+
+チャンクの要約と統合結果はプロセス内で共有し (本文と分割・要約の設定のハッシュがキー)、
+同じ記事を複数の変換器 (digest / easy / image など) やフォールバックで
+要約し直さない
+"""
+
+import contextvars
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from backend.common.utils import compute_content_hash, truncate_text
+
+
+# 文の区切り (句点・感嘆符・疑問符の直後で分割)
+SENTENCE_BOUNDARY = re.compile(r"(?<=[。．！？!?])")
+
+# 要約のキャッシュ (件数上限、古いものから捨てる)
+CACHE_SIZE = int(os.getenv("LONG_DOCUMENT_CACHE_SIZE", "64"))
+_cache: "OrderedDict[str, Any]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+DEFAULT_MAP_PROMPT = """以下は長いお知らせ「{title}」の一部 ({index}/{total}) です。
+この部分に書かれている重要な情報を、{max_chars}文字以内の箇条書きで抜き出してください。
+
+# 指示
+- 日時・曜日・時間・場所・対象者・締切・金額・申込方法・問い合わせ先は必ず残してください。
+- 数字や固有名詞は本文の表記どおり正確に書いてください。
+- 本文にない情報を追加しないでください。
+- 箇条書きのみを出力してください。
+
+# 本文 ({index}/{total})
+{chunk}
+"""
+
+DEFAULT_REDUCE_PROMPT = """以下は長いお知らせ「{title}」を分割して抜き出した要点です。
+重複を除いて1つにまとめ、{max_chars}文字以内の箇条書きにしてください。
+
+# 指示
+- 日時・場所・対象者・締切・金額・申込方法・問い合わせ先は省略しないでください。
+- 数字や固有名詞は表記どおり正確に書いてください。
+- 箇条書きのみを出力してください。
+
+# 要点
+{partials}
+"""
+
+
+def _cache_get(key: str) -> Any:
+    """キャッシュを取得 (なければNone)"""
+    with _cache_lock:
+        value = _cache.get(key)
+        if value is not None:
+            _cache.move_to_end(key)
+        return value
+
+
+def _cache_put(key: str, value: Any):
+    """キャッシュに保存"""
+    with _cache_lock:
+        _cache[key] = value
+        _cache.move_to_end(key)
+        while len(_cache) > max(1, CACHE_SIZE):
+            _cache.popitem(last=False)
+
+
+def reset_long_document_cache():
+    """要約のキャッシュを破棄"""
+    with _cache_lock:
+        _cache.clear()
+
+
+def split_into_chunks(text: str, max_chars: int) -> List[str]:
+    """
+    テキストを段落・文の境界で分割
+    
+    Args:
+        text: 入力テキスト
+        max_chars: 1チャンクの最大文字数
+    
+    Returns:
+        チャンクのリスト (各チャンクは max_chars 以下)
+    """
+    if not text:
+        return []
+    
+    # 段落 → 文 → 固定長 の順で細かくする
+    pieces: List[str] = []
+    for paragraph in text.split("\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in SENTENCE_BOUNDARY.split(paragraph):
+            sentence = sentence.strip()
+            while len(sentence) > max_chars:
+                pieces.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            if sentence:
+                pieces.append(sentence)
+    
+    # 上限に収まる範囲で詰め直す
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        candidate = f"{current}\n{piece}" if current else piece
+        if len(candidate) <= max_chars:
+            current = candidate
+        else:
+            chunks.append(current)
+            current = piece
+    if current:
+        chunks.append(current)
+    
+    return chunks
+
+
+class LongDocumentSummarizer:
+    """長文ドキュメントのMap-Reduce要約"""
+    
+    def __init__(self, config: Dict[str, Any], llm=None):
+        """
+        Args:
+            config: 長文モード設定
+                {
+                    "enabled": bool,
+                    "chunk_chars": 2000,
+                    "max_workers": 4,
+                    "map_max_chars": 400,
+                    "max_output_tokens": 2048,
+                    "prompts": {"map": "...", "reduce": "..."}
+                }
+            llm: LLMClient (Noneの場合は初回使用時に取得)
+        """
+        self.enabled = config.get("enabled", False)
+        self.chunk_chars = config.get("chunk_chars", 2000)
+        self.max_workers = config.get("max_workers", 4)
+        self.map_max_chars = config.get("map_max_chars", 400)
+        self.max_output_tokens = config.get("max_output_tokens", 2048)
+        self.prompts = config.get("prompts", {})
+        self._llm = llm
+    
+    @property
+    def llm(self):
+        """LLMクライアント (遅延初期化)"""
+        if self._llm is None:
+            from backend.common.llm import get_llm_client
+            self._llm = get_llm_client()
+        return self._llm
+    
+    def condense(self, title: str, body_text: str, max_chars: int, suffix: str = "...") -> str:
+        """
+        本文を指定文字数以内に収める
+        
+        Args:
+            title: 記事タイトル
+            body_text: 本文
+            max_chars: 最大文字数
+            suffix: 切り詰め時の接尾辞
+        
+        Returns:
+            max_chars 以内のテキスト (短い本文はそのまま)
+        """
+        if not body_text or len(body_text) <= max_chars:
+            return body_text
+        
+        if not self.enabled:
+            return truncate_text(body_text, max_chars, suffix=suffix)
+        
+        try:
+            condensed = self._map_reduce(title, body_text, max_chars)
+        except Exception as e:
+            print(f"⚠️ 長文要約失敗 -> 切り詰めにフォールバック: {e}")
+            condensed = ""
+        
+        if not condensed:
+            return truncate_text(body_text, max_chars, suffix=suffix)
+        
+        return truncate_text(condensed, max_chars, suffix=suffix)
+    
+    def _cache_key(self, title: str, body_text: str) -> str:
+        """要約のキャッシュキー (本文と、チャンクの要約結果に影響する設定)"""
+        return compute_content_hash(
+            title,
+            body_text,
+            self.chunk_chars,
+            self.map_max_chars,
+            self.max_output_tokens,
+            self.prompts.get("map", DEFAULT_MAP_PROMPT),
+            self.prompts.get("reduce", DEFAULT_REDUCE_PROMPT),
+            self.llm.model_name,
+        )
+    
+    def _map_reduce(self, title: str, body_text: str, max_chars: int) -> str:
+        """Map-Reduce要約を実行 (同じ本文・設定のチャンクの要約と統合結果は再利用)"""
+        key = self._cache_key(title, body_text)
+        reduce_key = f"{key}:{max_chars}"
+        
+        condensed = _cache_get(reduce_key)
+        if condensed is not None:
+            print(f"♻️ 長文モード: 要約済みの結果を再利用 ({len(body_text)}文字)")
+            return condensed
+        
+        partials = _cache_get(key)
+        if partials is None:
+            partials = self._map(title, body_text, key)
+        else:
+            print(f"♻️ 長文モード: 要約済みのチャンクを再利用 ({len(partials)}件)")
+        
+        partials = [p for p in partials if p]
+        if not partials:
+            return ""
+        
+        combined = "\n".join(partials)
+        if len(combined) <= max_chars:
+            return combined
+        
+        # Reduce: 部分要約を統合
+        condensed = self._reduce(title, partials, max_chars)
+        if condensed:
+            _cache_put(reduce_key, condensed)
+        return condensed
+    
+    def _map(self, title: str, body_text: str, key: str) -> List[str]:
+        """チャンクごとに並列要約 (Map、すべて成功した場合だけキャッシュ)"""
+        chunks = split_into_chunks(body_text, self.chunk_chars)
+        total = len(chunks)
+        print(f"📚 長文モード: {len(body_text)}文字 -> {total}チャンク")
+        
+        # 使用量の記録先を引き継ぐためコンテキストをコピー
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, total))) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._summarize_chunk, title, chunk, index, total)
+                for index, chunk in enumerate(chunks, start=1)
+            ]
+            results = [future.result() for future in futures]
+        
+        # 失敗したチャンクは原文の先頭で代用 (情報を落とさないため、次回は要約し直す)
+        partials = [
+            result if result is not None else truncate_text(chunk, self.map_max_chars, suffix="...")
+            for result, chunk in zip(results, chunks)
+        ]
+        if all(result is not None for result in results):
+            _cache_put(key, partials)
+        return partials
+    
+    def _summarize_chunk(self, title: str, chunk: str, index: int, total: int) -> Optional[str]:
+        """1チャンクを要約 (Map、失敗時はNone)"""
+        template = self.prompts.get("map", DEFAULT_MAP_PROMPT)
+        prompt = template.format(
+            title=title,
+            chunk=chunk,
+            index=index,
+            total=total,
+            max_chars=self.map_max_chars
+        )
+        
+        try:
+            response = self.llm.generate(
+                prompt=prompt,
+                generation_config=self.llm.get_json_config(max_tokens=self.max_output_tokens),
+                retry=3,
+                purpose="long_map"
+            )
+            return self.llm.extract_text(response)
+        except Exception as e:
+            print(f"⚠️ チャンク要約失敗 ({index}/{total}): {e}")
+            return None
+    
+    def _reduce(self, title: str, partials: List[str], max_chars: int) -> str:
+        """部分要約を統合 (Reduce)"""
+        template = self.prompts.get("reduce", DEFAULT_REDUCE_PROMPT)
+        prompt = template.format(
+            title=title,
+            partials="\n".join(partials),
+            max_chars=max_chars
+        )
+        
+        response = self.llm.generate(
+            prompt=prompt,
+            generation_config=self.llm.get_json_config(max_tokens=self.max_output_tokens),
+            retry=3,
+            purpose="long_reduce"
+        )
+        return self.llm.extract_text(response)
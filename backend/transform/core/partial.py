@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 変換の途中結果
+
+出力を複数作る変換器 (アスペクト比ごとの画像など) が、できた分から途中結果を保存する。
+オーケストレーターが partial_scope で保存先を設定し、変換器は save_partial で書き込む。
+同じ入力で再実行したときは previous_partial で前回の途中結果を受け取り、できている出力を使い回す
+"""
+
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Optional
+
+
+# 途中結果であることを示すキー (transformedContent.<変換タイプ> に保存)
+PARTIAL_KEY = "partial"
+
+# (保存関数, 前回の途中結果)
+_current: contextvars.ContextVar = contextvars.ContextVar("transform_partial", default=None)
+
+
+@contextmanager
+def partial_scope(save: Callable[[Dict[str, Any]], None], previous: Optional[Dict[str, Any]] = None):
+    """
+    この範囲の途中結果の保存先を設定
+    
+    Args:
+        save: 途中結果を保存する関数
+        previous: 同じ入力で前回保存した途中結果
+    """
+    token = _current.set((save, previous))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def save_partial(result: Dict[str, Any]):
+    """
+    途中結果を保存 (保存先が設定されていない場合は何もしない)
+    
+    Args:
+        result: その時点の変換結果
+    """
+    scope = _current.get()
+    if scope is None:
+        return
+    try:
+        scope[0]({**result, PARTIAL_KEY: True})
+    except Exception as e:
+        print(f"⚠️ 途中結果の保存失敗: {e}")
+
+
+def previous_partial() -> Dict[str, Any]:
+    """同じ入力で前回保存した途中結果 (ない場合は空)"""
+    scope = _current.get()
+    return dict(scope[1] or {}) if scope else {}
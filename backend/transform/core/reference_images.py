@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 画像生成の参照画像 (ロゴ・ゆるキャラなど)
+
+参照画像は記事ごとに変わらないため、プロセス内で1回だけ読み込み・縮小・エンコードして共有する。
+- load_reference_images: ファイルのパスと更新時刻をキーにキャッシュ (差し替えたら読み直す)
+- reference_parts: 生成リクエストに添付するパーツ。Files API にアップロードできる場合は
+  1回だけアップロードしてファイルの参照 (URI) を使い回し、できない場合は縮小済みのバイト列を添付する
+"""
+
+import io
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from backend.common.llm import get_genai_client
+
+
+# 参照画像の長辺の上限 (ロゴ・キャラクターの参照にはこれで十分、リクエストのサイズを抑える)
+DEFAULT_MAX_EDGE = 1024
+
+# ディレクトリ指定で読み込む拡張子
+IMAGE_PATTERNS = ["*.png", "*.jpg", "*.jpeg", "*.webp"]
+
+# アップロードしたファイルを使い回す時間 (Files API の保存期間は48時間、余裕を持って作り直す)
+UPLOAD_TTL_SEC = 46 * 3600
+
+# アップロードに失敗した後、バイト列の添付で済ませる時間
+UPLOAD_RETRY_SEC = 600
+
+
+class ReferenceImage:
+    """縮小・エンコード済みの参照画像"""
+    
+    def __init__(self, name: str, data: bytes, mime_type: str, size: Tuple[int, int]):
+        self.name = name
+        self.data = data
+        self.mime_type = mime_type
+        self.size = size
+        self.digest = hashlib.sha256(data).hexdigest()
+
+
+# (パス, 更新時刻, 長辺の上限) → ReferenceImage
+_images: Dict[Tuple[str, int, int], ReferenceImage] = {}
+# (APIキー, ダイジェスト) → (ファイルURI, MIMEタイプ, アップロード時刻)
+_uploads: Dict[Tuple[str, str], Tuple[str, str, float]] = {}
+# APIキー → アップロードを再び試す時刻 (失敗した後はしばらくバイト列を添付)
+_upload_retry_at: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def _encode(path: Path, max_edge: int) -> ReferenceImage:
+    """画像を読み込み、長辺を max_edge 以下に縮小して PNG にエンコード"""
+    from PIL import Image
+    
+    with Image.open(path) as img:
+        img.load()
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+        if max_edge and max(img.size) > max_edge:
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, format="PNG", optimize=True)
+        return ReferenceImage(path.name, out.getvalue(), "image/png", img.size)
+
+
+def _resolve_dir(directory: str) -> Path:
+    """相対パスは実行時のカレントディレクトリ (プロジェクトルート) 基準"""
+    path = Path(directory)
+    return path if path.is_absolute() else Path.cwd() / path
+
+
+def load_reference_images(
+    directory: Optional[str],
+    names: Optional[List[str]] = None,
+    max_edge: int = DEFAULT_MAX_EDGE
+) -> List[ReferenceImage]:
+    """
+    参照画像を読み込む (プロセス内でキャッシュ)
+    
+    Args:
+        directory: 参照画像のディレクトリ
+        names: 読み込むファイル名 (Noneの場合はディレクトリ内の画像すべて、ない名前は飛ばす)
+        max_edge: 長辺の上限 (px)
+    
+    Returns:
+        ReferenceImage のリスト (names の順、Noneの場合はファイル名順)
+    """
+    if not directory:
+        return []
+    
+    ref_dir = _resolve_dir(directory)
+    if not ref_dir.is_dir():
+        return []
+    
+    if names is None:
+        paths = sorted({p for pattern in IMAGE_PATTERNS for p in ref_dir.glob(pattern)})
+    else:
+        paths = [ref_dir / name for name in names if (ref_dir / name).is_file()]
+    
+    images = []
+    for path in paths:
+        try:
+            key = (str(path.resolve()), path.stat().st_mtime_ns, int(max_edge or 0))
+        except OSError:
+            continue
+        
+        with _lock:
+            image = _images.get(key)
+        if image is None:
+            try:
+                image = _encode(path, max_edge)
+            except Exception as e:
+                print(f"⚠️ 参照画像読み込み失敗: {path.name} | {e}")
+                continue
+            with _lock:
+                # 差し替え前の同じファイルは捨てる
+                for old in [k for k in _images if k[0] == key[0]]:
+                    del _images[old]
+                _images[key] = image
+            print(f"🖼️ 参照画像ロード: {path.name} ({image.size[0]}x{image.size[1]}, {len(image.data) // 1024}KB)")
+        images.append(image)
+    
+    return images
+
+
+def _upload(api_key: str, image: ReferenceImage) -> Optional[Tuple[str, str]]:
+    """Files API にアップロード (アップロード済みで期限内なら使い回す)"""
+    key = (api_key, image.digest)
+    with _lock:
+        if time.time() < _upload_retry_at.get(api_key, 0.0):
+            return None
+        cached = _uploads.get(key)
+        if cached and time.time() - cached[2] < UPLOAD_TTL_SEC:
+            return cached[0], cached[1]
+    
+    try:
+        from google.genai import types
+        uploaded = get_genai_client(api_key).files.upload(
+            file=io.BytesIO(image.data),
+            config=types.UploadFileConfig(mime_type=image.mime_type, display_name=image.name)
+        )
+        uri = uploaded.uri
+        mime_type = uploaded.mime_type or image.mime_type
+    except Exception as e:
+        print(f"ℹ️ 参照画像をアップロードできないため、画像を直接添付します: {e}")
+        with _lock:
+            _upload_retry_at[api_key] = time.time() + UPLOAD_RETRY_SEC
+        return None
+    
+    with _lock:
+        _uploads[key] = (uri, mime_type, time.time())
+    print(f"📤 参照画像アップロード: {image.name}")
+    return uri, mime_type
+
+
+def reference_parts(
+    images: List[ReferenceImage],
+    api_key: Optional[str] = None,
+    upload: bool = True
+) -> List[Any]:
+    """
+    生成リクエストの contents に添付するパーツ
+    
+    Args:
+        images: load_reference_images の結果
+        api_key: Google API Key (アップロードに使うクライアント)
+        upload: Files API にアップロードしてファイルの参照を使うか
+    
+    Returns:
+        google.genai.types.Part のリスト
+    """
+    if not images:
+        return []
+    
+    from google.genai import types
+    
+    parts = []
+    for image in images:
+        uploaded = _upload(api_key, image) if upload and api_key else None
+        if uploaded:
+            parts.append(types.Part.from_uri(file_uri=uploaded[0], mime_type=uploaded[1]))
+        else:
+            parts.append(types.Part.from_bytes(data=image.data, mime_type=image.mime_type))
+    return parts
+
+
+def reset_reference_cache():
+    """読み込み・アップロード済みの参照画像を破棄"""
+    with _lock:
+        _images.clear()
+        _uploads.clear()
+        _upload_retry_at.clear()
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 変換ステータス管理
+
+変換器ごとの状態 (pending / completed / failed / filtered) と
+入力フィンガープリントを transformStatus に保存し、
+失敗したもの・入力が変わったものだけを再実行する
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from backend.common.utils import (
+    SEMANTIC_FIELDS,
+    OPTIONAL_SEMANTIC_FIELDS,
+    compute_content_hash,
+    get_current_timestamp,
+)
+
+
+# 状態
+STATE_PENDING = "pending"
+STATE_COMPLETED = "completed"
+STATE_FAILED = "failed"
+STATE_FILTERED = "filtered"
+
+# 旧形式 (文字列) のステータスとの対応
+LEGACY_STATES = {
+    "completed": STATE_COMPLETED,
+    "skipped_or_failed": STATE_FAILED,
+    "filtered": STATE_FILTERED,
+}
+
+# フィンガープリントに含めない設定キー (出力に影響しないもの、
+# encoder_profiles はプロファイルの定義を変えても作成済みの動画を作り直さないため)
+NON_OUTPUT_CONFIG_KEYS = {"enabled", "filters", "max_workers", "reference_upload", "encoder_profiles"}
+
+
+def article_source_fingerprint(article: Dict[str, Any]) -> str:
+    """
+    記事の入力内容のフィンガープリント
+    
+    スクレイプ時の意味的フィンガープリントがあればそれを使い、
+    なければタイトルと本文から計算する
+    
+    Args:
+        article: 記事データ
+    
+    Returns:
+        SHA256ハッシュ (hex)
+    """
+    # 意味的フィンガープリントがあれば使用 (軽微な変更では変わらない)
+    semantic = article.get("semantic_fingerprint")
+    if isinstance(semantic, dict) and semantic:
+        parts = [semantic.get(f, "") for f in SEMANTIC_FIELDS]
+        parts += [semantic[f] for f in OPTIONAL_SEMANTIC_FIELDS if semantic.get(f)]
+        return compute_content_hash(*parts)
+    
+    parts = [article.get("title", ""), article.get("body_text", "")]
+    if article.get("pdf_text"):
+        parts.append(article["pdf_text"])
+    return compute_content_hash(*parts)
+
+
+def compute_input_fingerprint(
+    article: Dict[str, Any],
+    transform_config: Dict[str, Any],
+    upstream_fingerprints: Optional[List[str]] = None
+) -> str:
+    """
+    変換器の入力フィンガープリントを計算
+    
+    記事内容・変換設定・上流の変換器のフィンガープリントから計算するため、
+    いずれかが変われば再実行対象になる
+    
+    Args:
+        article: 記事データ
+        transform_config: 変換設定 (YAML)
+        upstream_fingerprints: 依存する変換器のフィンガープリント
+    
+    Returns:
+        SHA256ハッシュ (hex)
+    """
+    output_config = {
+        k: v for k, v in (transform_config or {}).items()
+        if k not in NON_OUTPUT_CONFIG_KEYS
+    }
+    
+    return compute_content_hash(
+        article_source_fingerprint(article),
+        json.dumps(output_config, sort_keys=True, ensure_ascii=False, default=str),
+        *(upstream_fingerprints or []),
+    )
+
+
+def get_transform_state(article: Dict[str, Any], transform_type: str) -> Dict[str, Any]:
+    """
+    保存済みの変換器の状態を取得 (旧形式も正規化)
+    
+    Args:
+        article: 記事データ
+        transform_type: 変換タイプ
+    
+    Returns:
+        {"state": ..., "fingerprint": ..., "attempts": ...}
+    """
+    raw = (article.get("transformStatus") or {}).get(transform_type)
+    
+    if isinstance(raw, dict):
+        return {
+            "state": raw.get("state", STATE_PENDING),
+            "fingerprint": raw.get("fingerprint"),
+            "attempts": int(raw.get("attempts", 0) or 0),
+        }
+    
+    if isinstance(raw, str):
+        return {
+            "state": LEGACY_STATES.get(raw, STATE_PENDING),
+            "fingerprint": None,
+            "attempts": 0,
+        }
+    
+    return {"state": STATE_PENDING, "fingerprint": None, "attempts": 0}
+
+
+def needs_run(state: Dict[str, Any], fingerprint: str, max_attempts: int) -> bool:
+    """
+    変換器を実行する必要があるか判定
+    
+    Args:
+        state: 保存済みの状態
+        fingerprint: 今回の入力フィンガープリント
+        max_attempts: 同一入力での最大試行回数
+    
+    Returns:
+        実行が必要ならTrue
+    """
+    if state.get("fingerprint") != fingerprint:
+        return True  # 入力が変わった (または未実行)
+    
+    if state["state"] == STATE_COMPLETED:
+        return False
+    
+    if state["state"] == STATE_FAILED and state.get("attempts", 0) >= max_attempts:
+        return False  # 同じ入力で上限まで失敗済み
+    
+    return True
+
+
+def is_settled(state: Dict[str, Any], max_attempts: int) -> bool:
+    """
+    これ以上の再実行が不要な状態か判定
+    
+    Args:
+        state: 変換器の状態
+        max_attempts: 同一入力での最大試行回数
+    
+    Returns:
+        完了・除外・試行上限到達のいずれかならTrue
+    """
+    if state["state"] in (STATE_COMPLETED, STATE_FILTERED):
+        return True
+    return state["state"] == STATE_FAILED and state.get("attempts", 0) >= max_attempts
+
+
+def make_state(
+    state: str,
+    fingerprint: Optional[str] = None,
+    attempts: int = 0
+) -> Dict[str, Any]:
+    """
+    transformStatus に保存する状態を作成
+    
+    Args:
+        state: 状態
+        fingerprint: 入力フィンガープリント
+        attempts: 同一入力での試行回数
+    
+    Returns:
+        状態の辞書
+    """
+    return {
+        "state": state,
+        "fingerprint": fingerprint,
+        "attempts": attempts,
+        "updatedAt": get_current_timestamp(),
+    }
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 画像のアスペクト比の変換
+
+1枚の画像 (マスター) から別のアスペクト比の画像をローカルで作る (画像生成APIを呼ばない)。
+- pad: マスター全体を収め、余白はマスターをぼかして敷き詰める (文字を切らない)
+- crop: 中央を切り抜く
+"""
+
+import io
+from typing import Tuple
+
+
+# 変換方法
+REFRAME_PAD = "pad"
+REFRAME_CROP = "crop"
+
+# 余白のぼかしの半径 (短辺に対する割合)
+BLUR_RATIO = 0.04
+
+
+def parse_aspect_ratio(aspect_ratio: str) -> Tuple[int, int]:
+    """
+    "16:9" → (16, 9)
+    
+    Raises:
+        ValueError: 形式が違う場合
+    """
+    width, _, height = (aspect_ratio or "").partition(":")
+    w, h = int(width), int(height)
+    if w <= 0 or h <= 0:
+        raise ValueError(f"invalid aspect ratio: {aspect_ratio}")
+    return w, h
+
+
+def target_size(size: Tuple[int, int], aspect_ratio: str, mode: str = REFRAME_PAD) -> Tuple[int, int]:
+    """
+    マスターの大きさから変換後の大きさを計算
+    
+    Args:
+        size: マスターの (幅, 高さ)
+        aspect_ratio: 変換後のアスペクト比
+        mode: pad (マスターを含む大きさ) / crop (マスターに含まれる大きさ)
+    
+    Returns:
+        (幅, 高さ)
+    """
+    width, height = size
+    rw, rh = parse_aspect_ratio(aspect_ratio)
+    wider = width * rh < rw * height  # 変換後の方が横長
+    if (mode == REFRAME_CROP) == wider:
+        return width, max(1, round(width * rh / rw))
+    return max(1, round(height * rw / rh)), height
+
+
+def reframe_image(data: bytes, aspect_ratio: str, mode: str = REFRAME_PAD) -> bytes:
+    """
+    画像を別のアスペクト比に変換
+    
+    Args:
+        data: マスター画像のバイト列
+        aspect_ratio: 変換後のアスペクト比 ("16:9" など)
+        mode: pad / crop
+    
+    Returns:
+        PNG のバイト列
+    """
+    from PIL import Image, ImageFilter
+    
+    with Image.open(io.BytesIO(data)) as master:
+        master = master.convert("RGB")
+        width, height = target_size(master.size, aspect_ratio, mode)
+        
+        if mode == REFRAME_CROP:
+            left = (master.width - width) // 2
+            top = (master.height - height) // 2
+            frame = master.crop((left, top, left + width, top + height))
+        else:
+            # 余白: マスターを拡大して敷き詰め、ぼかす
+            scale = max(width / master.width, height / master.height)
+            cover = master.resize((max(width, round(master.width * scale)), max(height, round(master.height * scale))), Image.BILINEAR)
+            left = (cover.width - width) // 2
+            top = (cover.height - height) // 2
+            frame = cover.crop((left, top, left + width, top + height))
+            frame = frame.filter(ImageFilter.GaussianBlur(max(2, round(min(width, height) * BLUR_RATIO))))
+            frame.paste(master, ((width - master.width) // 2, (height - master.height) // 2))
+        
+        out = io.BytesIO()
+        frame.save(out, format="PNG")
+        return out.getvalue()
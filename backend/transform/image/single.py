@@ -7,26 +7,52 @@ OMO Platform - 1枚絵生成 (google-genai SDK版 / Storage対応)
 
 import sys
 import os
+import contextvars
 import hashlib
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Tuple
-from PIL import Image
+from typing import Dict, Any, Optional, List, Tuple, TYPE_CHECKING
 
 # パスを追加
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
 
 from backend.transform.core.base import BaseTransformer
 from backend.common.config import get_config
+from backend.common.llm import LIMIT_IMAGE, gemini_request, get_genai_client
 from backend.common.utils import truncate_text
-from backend.common.storage import save_file
-from google import genai
-from google.genai import types
+from backend.common.metrics import span
+from backend.common.usage import record_usage
+from backend.common.storage import load_file, save_file
+from backend.transform.core.partial import previous_partial, save_partial
+from backend.transform.core.reference_images import DEFAULT_MAX_EDGE, load_reference_images, reference_parts
+from backend.transform.image.reframe import REFRAME_PAD, reframe_image
+from backend.transform.image.variants import VariantBuilder
+from backend.transform.text.digest import get_article_digest, format_digest_summary
+
+if TYPE_CHECKING:
+    from google import genai
+
+
+# 参照画像 (ロゴ・ゆるキャラ) のファイル名
+REFERENCE_IMAGE_NAMES = ["logo.png", "mascot.png"]
+
+
+def _image_key(aspect_ratio: str) -> str:
+    """結果のキー (例: image_path_16x9)"""
+    return f"image_path_{aspect_ratio.replace(':', 'x')}"
+
+
+def _image_filename(safe_title: str, aspect_ratio: str) -> str:
+    """保存ファイル名"""
+    return f"images/{safe_title}_eye_catch_{aspect_ratio.replace(':', 'x')}.png"
 
 
 class ImageSingleTransformer(BaseTransformer):
     """1枚絵生成"""
     
+    depends_on = ["text_digest"]
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.app_config = get_config()
@@ -38,16 +64,36 @@ class ImageSingleTransformer(BaseTransformer):
             self.aspect_ratios = [config["aspect_ratio"]]
             
         self.image_size = config.get("image_size", "1K")
+        
+        # アスペクト比ごとの並列生成 (同時実行数は共有のレート制限 gemini_image でも制限)
+        self.max_workers = int(config.get("max_workers", len(self.aspect_ratios) or 1))
+        # マスターを1枚だけ生成し、他のアスペクト比はローカルで変換 (pad: ぼかした余白 / crop: 切り抜き)
+        self.derive_from_master = config.get("derive_from_master", False)
+        self.master_aspect_ratio = config.get("master_aspect_ratio") or self.aspect_ratios[0]
+        if self.master_aspect_ratio not in self.aspect_ratios:
+            print(f"⚠️ master_aspect_ratio が aspect_ratios にありません: {self.master_aspect_ratio} -> {self.aspect_ratios[0]}")
+            self.master_aspect_ratio = self.aspect_ratios[0]
+        self.reframe_mode = config.get("reframe", REFRAME_PAD)
+        # 配信用のバリアント (WebP・AVIF・JPEG、幅違いのサムネイル)
+        self.variants = VariantBuilder(config.get("variants", {}))
+        
         self.reference_images_dir = config.get("reference_images_dir", None)
+        self.reference_max_edge = int(config.get("reference_max_edge", DEFAULT_MAX_EDGE))
+        self.reference_upload = config.get("reference_upload", True)  # Files API で1回だけアップロード
         self.summary_model_name = config.get("summary_model_name", "gemini-2.5-flash")
         self.max_output_tokens = config.get("max_output_tokens", 8192)
         self.prompts = config.get("prompts", {})
+        self.use_digest = config.get("use_digest", True)
         
-        # クライアント初期化
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
+        # クライアントは最初の生成時に作成 (キーの有無だけ先に確認)
+        self.api_key = os.getenv("GOOGLE_API_KEY")
+        if not self.api_key:
             raise ValueError("GOOGLE_API_KEY が設定されていません")
-        self.client = genai.Client(api_key=api_key)
+    
+    @property
+    def client(self) -> "genai.Client":
+        """google-genai クライアント (最初の生成時に作成、プロセス全体で共有)"""
+        return get_genai_client(self.api_key)
     
     def transform(self, article: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
@@ -63,17 +109,22 @@ class ImageSingleTransformer(BaseTransformer):
         try:
             # 入力データを準備
             title = article.get("title", "")
-            body_text = article.get("body_text", "")
+            body_text = self.get_source_text(article)
             
             # デバッグ: 入力データを確認
             print(f"🔍 [DEBUG] Title: {title}")
             print(f"🔍 [DEBUG] Body Length: {len(body_text)}")
             print(f"🔍 [DEBUG] Body Head: {body_text[:200].replace(chr(10), ' ')}...")
             
-            # 要約を生成
-            print(f"📝 要約生成開始 ({self.summary_model_name}): {title[:30]}...")
-            summary = self._generate_summary(title, body_text)
-            print(f"📝 要約生成完了:\n{summary}")
+            # 要約を生成 (ダイジェストがあればそのまま使用)
+            digest = get_article_digest(article) if self.use_digest else None
+            if digest:
+                summary = format_digest_summary(digest)
+                print(f"📝 要約 (ダイジェスト使用):\n{summary}")
+            else:
+                print(f"📝 要約生成開始 ({self.summary_model_name}): {title[:30]}...")
+                summary = self._generate_summary(title, body_text)
+                print(f"📝 要約生成完了:\n{summary}")
             
             # 参照画像を読み込む
             ref_images, loaded_ref_names = self._load_reference_images()
@@ -92,67 +143,89 @@ class ImageSingleTransformer(BaseTransformer):
                 contents.extend(ref_images)
                 print(f"📎 参照画像: {len(ref_images)}枚 ({', '.join(loaded_ref_names)})")
             
+            base = {
+                "prompt": prompt,
+                "mime_type": "image/png",
+                "aspect_ratios": self.aspect_ratios,
+                "summary": summary
+            }
+            
+            # 前回の途中結果 (同じプロンプトで生成済みのアスペクト比は使い回す)
+            previous = previous_partial()
             results = {}
-            generated_any = False
+            if previous.get("prompt") == prompt:
+                results = {
+                    _image_key(r): previous[_image_key(r)]
+                    for r in self.aspect_ratios if previous.get(_image_key(r))
+                }
+                if results:
+                    print(f"♻️ 途中まで生成済みの画像を使用: {', '.join(results)}")
             
-            # 各アスペクト比で生成
-            for aspect_ratio in self.aspect_ratios:
-                print(f"🎨 画像生成開始 ({self.model_name}, {aspect_ratio}, {self.image_size}): {title[:30]}...")
-                
-                try:
-                    # 画像生成実行 (types使用)
-                    response = self.client.models.generate_content(
-                        model=self.model_name,
-                        contents=contents,
-                        config=types.GenerateContentConfig(
-                            response_modalities=["IMAGE"],
-                            image_config=types.ImageConfig(
-                                aspect_ratio=aspect_ratio,
-                                image_size=self.image_size
-                            )
-                        )
-                    )
-                    
-                    # 画像抽出
-                    img_bytes = None
-                    if hasattr(response, "candidates") and response.candidates:
-                        for cand in response.candidates:
-                            if not cand.content: continue
-                            for part in cand.content.parts:
-                                if part.inline_data and part.inline_data.data:
-                                    img_bytes = part.inline_data.data
-                                    break
-                            if img_bytes: break
-                    
-                    if not img_bytes:
-                        print(f"⚠️ 画像生成失敗 (画像なし, {aspect_ratio}): {title}")
-                        continue
-                    
-                    # ストレージに保存
-                    aspect_suffix = aspect_ratio.replace(':', 'x')
-                    filename = f"images/{safe_title}_eye_catch_{aspect_suffix}.png"
-                    storage_path = save_file(img_bytes, filename, "image/png")
-                    
-                    print(f"✅ 画像生成成功 ({aspect_ratio}): {title[:30]}... -> {storage_path}")
-                    
-                    # 結果に追加
-                    key = f"image_path_{aspect_suffix}"
-                    results[key] = storage_path
-                    generated_any = True
-                    
-                except Exception as e:
-                    print(f"⚠️ 画像生成エラー ({aspect_ratio}): {e}")
+            pending = [r for r in self.aspect_ratios if _image_key(r) not in results]
+            generated: Dict[str, bytes] = {}  # 今回生成・変換した画像 (バリアントの作成用)
+            
+            # マスターを1枚だけ生成し、他のアスペクト比はローカルで変換
+            if self.derive_from_master and pending:
+                master_bytes = self._master_image(contents, title, safe_title, results, base)
+                if master_bytes:
+                    generated[self.master_aspect_ratio] = master_bytes
+                    for aspect_ratio in [r for r in pending if r != self.master_aspect_ratio]:
+                        try:
+                            with span("image.reframe", aspect_ratio=aspect_ratio, mode=self.reframe_mode):
+                                img_bytes = reframe_image(master_bytes, aspect_ratio, self.reframe_mode)
+                            results[_image_key(aspect_ratio)] = self._save_image(img_bytes, safe_title, aspect_ratio, title)
+                            generated[aspect_ratio] = img_bytes
+                        except Exception as e:
+                            print(f"⚠️ アスペクト比の変換失敗 ({aspect_ratio}): {e}")
+                    pending = []  # 変換に失敗したアスペクト比は生成し直さない
+                else:
+                    print("⚠️ マスター画像の生成失敗 -> アスペクト比ごとに生成")
             
-            if not generated_any:
+            # 各アスペクト比を並列に生成 (同時実行数は共有のレート制限で制御)
+            if pending:
+                workers = max(1, min(self.max_workers, len(pending)))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    # 使用量の記録先・途中結果の保存先を引き継ぐためコンテキストをコピー
+                    futures = {
+                        executor.submit(contextvars.copy_context().run, self._generate_image, contents, aspect_ratio, title): aspect_ratio
+                        for aspect_ratio in pending
+                    }
+                    for future in as_completed(futures):
+                        aspect_ratio = futures[future]
+                        img_bytes = future.result()
+                        if not img_bytes:
+                            continue
+                        results[_image_key(aspect_ratio)] = self._save_image(img_bytes, safe_title, aspect_ratio, title)
+                        generated[aspect_ratio] = img_bytes
+                        # できた分から保存 (途中で止まっても次回は残りだけ生成)
+                        if len(results) < len(self.aspect_ratios):
+                            save_partial({**base, **results})
+            
+            if not results:
                 print(f"❌ すべてのアスペクト比で画像生成失敗: {title}")
                 return None
             
+            # 結果の順序をアスペクト比の設定順にそろえる
+            ordered = {_image_key(r): results[_image_key(r)] for r in self.aspect_ratios if _image_key(r) in results}
+            if self.derive_from_master:
+                base["master_aspect_ratio"] = self.master_aspect_ratio
+            
+            # 配信用のバリアント (WebP・JPEG などと幅違いのサムネイル)
+            if self.variants.enabled:
+                images = {}
+                for aspect_ratio in self.aspect_ratios:
+                    if _image_key(aspect_ratio) not in results:
+                        continue
+                    data = generated.get(aspect_ratio) or load_file(_image_filename(safe_title, aspect_ratio))
+                    if data:
+                        images[aspect_ratio.replace(':', 'x')] = data
+                variants = self.variants.build(images, f"images/{safe_title}_eye_catch")
+                if variants:
+                    base["variants"] = variants
+            
             return {
-                **results,
-                "prompt": prompt,
-                "mime_type": "image/png",
-                "aspect_ratios": self.aspect_ratios,
-                "summary": summary
+                **ordered,
+                **base
             }
             
         except Exception as e:
@@ -161,6 +234,79 @@ class ImageSingleTransformer(BaseTransformer):
             traceback.print_exc()
             return None
 
+    def _generate_image(self, contents: List[Any], aspect_ratio: str, title: str) -> Optional[bytes]:
+        """1つのアスペクト比で画像を生成 (失敗時はNone)"""
+        from google.genai import types  # SDK は生成時に読み込む
+        
+        print(f"🎨 画像生成開始 ({self.model_name}, {aspect_ratio}, {self.image_size}): {title[:30]}...")
+        
+        try:
+            # 全自治体・全スレッドで共有するレート制限
+            with gemini_request(self.model_name, LIMIT_IMAGE, "image.generate", aspect_ratio=aspect_ratio):
+                response = self.client.models.generate_content(
+                    model=self.model_name,
+                    contents=contents,
+                    config=types.GenerateContentConfig(
+                        response_modalities=["IMAGE"],
+                        image_config=types.ImageConfig(
+                            aspect_ratio=aspect_ratio,
+                            image_size=self.image_size
+                        )
+                    )
+                )
+            
+            # 画像抽出
+            img_bytes = None
+            if hasattr(response, "candidates") and response.candidates:
+                for cand in response.candidates:
+                    if not cand.content: continue
+                    for part in cand.content.parts:
+                        if part.inline_data and part.inline_data.data:
+                            img_bytes = part.inline_data.data
+                            break
+                    if img_bytes: break
+            
+            record_usage(self.model_name, response, images=1 if img_bytes else 0, purpose="eye_catch")
+            
+            if not img_bytes:
+                print(f"⚠️ 画像生成失敗 (画像なし, {aspect_ratio}): {title}")
+            return img_bytes
+            
+        except Exception as e:
+            print(f"⚠️ 画像生成エラー ({aspect_ratio}): {e}")
+            return None
+    
+    def _master_image(
+        self,
+        contents: List[Any],
+        title: str,
+        safe_title: str,
+        results: Dict[str, str],
+        base: Dict[str, Any]
+    ) -> Optional[bytes]:
+        """マスター画像 (途中結果で保存済みなら読み込み、なければ生成して results に追加)"""
+        key = _image_key(self.master_aspect_ratio)
+        if key in results:
+            data = load_file(_image_filename(safe_title, self.master_aspect_ratio))
+            if data:
+                return data
+            del results[key]
+        
+        img_bytes = self._generate_image(contents, self.master_aspect_ratio, title)
+        if not img_bytes:
+            return None
+        
+        results[key] = self._save_image(img_bytes, safe_title, self.master_aspect_ratio, title)
+        if len(results) < len(self.aspect_ratios):
+            save_partial({**base, **results})
+        return img_bytes
+    
+    def _save_image(self, img_bytes: bytes, safe_title: str, aspect_ratio: str, title: str) -> str:
+        """ストレージに保存"""
+        storage_path = save_file(img_bytes, _image_filename(safe_title, aspect_ratio), "image/png")
+        print(f"✅ 画像生成成功 ({aspect_ratio}): {title[:30]}... -> {storage_path}")
+        return storage_path
+
     def _generate_summary(self, title: str, body_text: str) -> str:
         """画像に載せるための要約を生成"""
     def _generate_summary(self, title: str, body_text: str) -> str:
@@ -183,7 +329,7 @@ class ImageSingleTransformer(BaseTransformer):
 
         prompt = template.format(
             title=title,
-            body_text=truncate_text(body_text, 2000)
+            body_text=self.prepare_body_text(title, body_text, 2000)
         ).strip()
         
         # 強制力を高めるための追加指示 (これはシステム的なガードレールとして残す)
@@ -192,14 +338,18 @@ class ImageSingleTransformer(BaseTransformer):
         print(f"🔍 [DEBUG] Prompt Head: {prompt[:200].replace(chr(10), ' ')}...")
 
         try:
-            response = self.client.models.generate_content(
-                model=self.summary_model_name,
-                contents=[prompt],
-                config=types.GenerateContentConfig(
-                    temperature=0.0, # 創造性を排除し、事実に忠実に
-                    max_output_tokens=self.max_output_tokens
+            from google.genai import types
+            
+            with gemini_request(self.summary_model_name):
+                response = self.client.models.generate_content(
+                    model=self.summary_model_name,
+                    contents=[prompt],
+                    config=types.GenerateContentConfig(
+                        temperature=0.0, # 創造性を排除し、事実に忠実に
+                        max_output_tokens=self.max_output_tokens
+                    )
                 )
-            )
+            record_usage(self.summary_model_name, response, purpose="image_summary")
             if response.text:
                 text = response.text.strip()
                 
@@ -224,37 +374,18 @@ class ImageSingleTransformer(BaseTransformer):
             # 失敗時は本文の冒頭を使用
             return truncate_text(body_text, 100, suffix="...")
 
-    def _load_reference_images(self) -> Tuple[List[Image.Image], List[str]]:
-        """参照画像を読み込む"""
+    def _load_reference_images(self) -> Tuple[List[Any], List[str]]:
+        """参照画像を読み込む (縮小・エンコード・アップロードはプロセス内で1回だけ)"""
         if not self.reference_images_dir:
             return [], []
         
-        # プロジェクトルートからの相対パス (backend/transform/image/single.py から見て)
-        # 実行時のカレントディレクトリ(プロジェクトルート)を基準にするのが安全
-        ref_dir = Path(os.getcwd()) / self.reference_images_dir
-        
-        if not ref_dir.exists():
-            print(f"ℹ️ 参照画像フォルダが見つかりません: {ref_dir}")
+        # 実行時のカレントディレクトリ(プロジェクトルート)を基準にする
+        images = load_reference_images(self.reference_images_dir, REFERENCE_IMAGE_NAMES, self.reference_max_edge)
+        if not images:
             return [], []
         
-        ref_images = []
-        loaded_names = []
-        
-        # logo.png と mascot.png を探す
-        for img_name in ["logo.png", "mascot.png"]:
-            img_path = ref_dir / img_name
-            if img_path.exists():
-                try:
-                    img = Image.open(img_path)
-                    ref_images.append(img)
-                    loaded_names.append(img_name)
-                    print(f"📎 参照画像読み込み: {img_name}")
-                except Exception as e:
-                    print(f"⚠️ 参照画像読み込み失敗: {img_name} | {e}")
-            else:
-                print(f"ℹ️ 参照画像なし: {img_name} (スキップ)")
-        
-        return ref_images, loaded_names
+        parts = reference_parts(images, self.api_key, upload=self.reference_upload)
+        return parts, [image.name for image in images]
             
     def _build_prompt(self, title: str, summary: str, loaded_ref_names: List[str]) -> str:
         """プロンプトを作成"""
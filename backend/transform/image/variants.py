@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 画像の配信用バリアント
+
+生成した PNG (数MB) から、配信用に WebP / AVIF / JPEG と幅違いのサムネイルを作る。
+エンコードは CPU を使うため、プロセスプールで画像ごとに並列に実行する
+(プールは最初の使用時に作成し、プロセス全体で共有)。
+
+    variants:
+      enabled: true
+      formats: ["webp", "jpeg"]     # avif は Pillow が AVIF に対応している場合のみ
+      widths: [1080, 640, 320]      # 元の幅より大きい指定は元の幅にそろえる
+      quality: {webp: 80, avif: 55, jpeg: 82}
+      workers: 2                    # プロセス数 (0: プロセスを使わずに実行)
+"""
+
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional
+
+from backend.common.metrics import span
+
+
+# 形式 → (Pillow の形式名, 拡張子, MIMEタイプ)
+FORMATS = {
+    "webp": ("WEBP", "webp", "image/webp"),
+    "avif": ("AVIF", "avif", "image/avif"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+}
+
+# 既定の設定
+DEFAULT_FORMATS = ["webp", "jpeg"]
+DEFAULT_WIDTHS = [1080, 640, 320]
+DEFAULT_QUALITY = {"webp": 80, "avif": 55, "jpeg": 82}
+DEFAULT_WORKERS = 2
+
+
+def encode_variants(
+    data: bytes,
+    formats: List[str],
+    widths: List[int],
+    quality: Dict[str, int]
+) -> List[Dict[str, Any]]:
+    """
+    1枚の画像をバリアントにエンコード (プロセスプールで実行するため PIL 以外に依存しない)
+    
+    Args:
+        data: 元画像 (PNG) のバイト列
+        formats: 形式 ("webp", "avif", "jpeg")
+        widths: 幅 (px)
+        quality: 形式ごとの品質
+    
+    Returns:
+        [{"format", "width", "height", "data", "mime_type", "extension"}] (大きい順、
+        Pillow が対応していない形式は含めない)
+    """
+    from PIL import Image
+    
+    with Image.open(io.BytesIO(data)) as img:
+        original = img.convert("RGB")
+    
+    # 元の幅より大きい指定は元の幅にそろえる
+    sizes = sorted({min(int(w), original.width) for w in widths if int(w) > 0}, reverse=True) or [original.width]
+    
+    variants = []
+    unsupported = set()
+    for width in sizes:
+        height = max(1, round(original.height * width / original.width))
+        frame = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+        
+        for fmt in formats:
+            if fmt not in FORMATS or fmt in unsupported:
+                continue
+            pil_format, extension, mime_type = FORMATS[fmt]
+            options = {"quality": int(quality.get(fmt, DEFAULT_QUALITY.get(fmt, 80)))}
+            if fmt == "jpeg":
+                options.update(optimize=True, progressive=True)
+            elif fmt == "webp":
+                options.update(method=4)
+            elif fmt == "avif":
+                options.update(speed=6)
+            
+            out = io.BytesIO()
+            try:
+                frame.save(out, format=pil_format, **options)
+            except (KeyError, OSError, ValueError):
+                unsupported.add(fmt)  # エンコーダがない (AVIF など)
+                continue
+            
+            variants.append({
+                "format": fmt,
+                "width": width,
+                "height": frame.height,
+                "data": out.getvalue(),
+                "mime_type": mime_type,
+                "extension": extension,
+            })
+    
+    return variants
+
+
+# プロセスプール (プロセス全体で共有)
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> Optional[ProcessPoolExecutor]:
+    """プロセスプールを取得 (workers <= 0 の場合はNone)"""
+    global _pool
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # 変換はスレッドで並列に動くため fork ではなく spawn で起動
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool():
+    """プロセスプールを終了"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+class VariantBuilder:
+    """画像のバリアントを作成して保存"""
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: バリアント設定 (image_single.variants)
+        """
+        self.enabled = config.get("enabled", False)
+        self.formats = [f for f in config.get("formats", DEFAULT_FORMATS) if f in FORMATS]
+        self.widths = [int(w) for w in config.get("widths", DEFAULT_WIDTHS)]
+        self.quality = {**DEFAULT_QUALITY, **(config.get("quality") or {})}
+        self.workers = int(os.getenv("IMAGE_VARIANT_WORKERS", config.get("workers", DEFAULT_WORKERS)))
+    
+    def build(self, images: Dict[str, bytes], filename_prefix: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        画像ごとのバリアントを作成して保存
+        
+        Args:
+            images: {キー (例: "1x1"): PNG のバイト列}
+            filename_prefix: 保存ファイル名の接頭辞 (例: "images/タイトル_eye_catch")
+        
+        Returns:
+            {キー: [{"format", "width", "height", "path", "bytes"}]}
+        """
+        if not self.enabled or not images or not self.formats:
+            return {}
+        
+        # ワーカープロセスでは読み込まない (encode_variants だけを使う)
+        from backend.common.storage import save_file
+        
+        encoded = self._encode_all(images)
+        
+        results = {}
+        for key, variants in encoded.items():
+            saved = []
+            for variant in variants:
+                filename = f"{filename_prefix}_{key}_w{variant['width']}.{variant['extension']}"
+                try:
+                    path = save_file(variant["data"], filename, variant["mime_type"])
+                except Exception as e:
+                    print(f"⚠️ バリアント保存失敗: {filename} | {e}")
+                    continue
+                saved.append({
+                    "format": variant["format"],
+                    "width": variant["width"],
+                    "height": variant["height"],
+                    "path": path,
+                    "bytes": len(variant["data"]),
+                })
+            if saved:
+                results[key] = saved
+                smallest = min(v["bytes"] for v in saved)
+                print(f"🗜️ バリアント作成 ({key}): {len(saved)}件 (元 {len(images[key]) // 1024}KB → 最小 {smallest // 1024}KB)")
+        
+        return results
+    
+    def _encode_all(self, images: Dict[str, bytes]) -> Dict[str, List[Dict[str, Any]]]:
+        """画像ごとにエンコード (プロセスプールで並列、使えない場合はこのスレッドで実行)"""
+        args = (self.formats, self.widths, self.quality)
+        encoded: Dict[str, List[Dict[str, Any]]] = {}
+        
+        with span("image.encode", formats=",".join(self.formats)) as s:
+            pool = _get_pool(self.workers)
+            futures = {}
+            if pool is not None:
+                try:
+                    futures = {key: pool.submit(encode_variants, data, *args) for key, data in images.items()}
+                except (BrokenProcessPool, RuntimeError, OSError) as e:
+                    print(f"⚠️ プロセスプールを使えないため、このスレッドでエンコードします: {e}")
+                    shutdown_pool()
+                    futures = {}
+            
+            for key, data in images.items():
+                try:
+                    if key in futures:
+                        try:
+                            encoded[key] = futures[key].result()
+                            continue
+                        except BrokenProcessPool as e:
+                            print(f"⚠️ プロセスプールが停止したため、このスレッドでエンコードします: {e}")
+                            shutdown_pool()
+                    encoded[key] = encode_variants(data, *args)
+                except Exception as e:
+                    print(f"⚠️ バリアント作成失敗 ({key}): {e}")
+            
+            s.amount = len(images)
+        return encoded
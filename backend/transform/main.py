@@ -6,119 +6,467 @@ OMO Platform - Transformオーケストレーター
 """
 
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, Any, List, Optional
 
 # パスを追加
-sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from common.config import get_config
-from common.firestore import get_firestore_client
-from transform.text.simple import SimpleTextTransformer
-from transform.text.easy import EasyTextTransformer
-from transform.text.script import ScriptTransformer
-from transform.image.single import ImageSingleTransformer
-from transform.video.short import VideoShortTransformer
+from backend.common.config import get_config
+from backend.common.dedup import reusable_types
+from backend.common.firestore import get_firestore_client
+from backend.common.filters import FilterSet, create_filter
+from backend.common.firestore import LEASE_OWNER_FIELD, LEASE_EXPIRES_FIELD
+from backend.common.lease import LeaseHeartbeat, make_worker_id
+from backend.common.metrics import get_metrics, span
+from backend.common.usage import UsageLedger, transformer_scope, usage_scope
+from backend.common.utils import get_current_timestamp
+from backend.transform.core.partial import PARTIAL_KEY, partial_scope
+from backend.transform.core.status import (
+    STATE_COMPLETED,
+    STATE_FAILED,
+    STATE_FILTERED,
+    STATE_PENDING,
+    compute_input_fingerprint,
+    get_transform_state,
+    is_settled,
+    make_state,
+    needs_run,
+)
+# 変換器は有効なものだけ生成時に読み込む (TRANSFORM_TYPES は実行順)
+from backend.transform.registry import TRANSFORM_TYPES, create_transformers
 
 
-def main():
-    """メイン処理"""
-    print("🚀 OMO Platform - Transform開始")
+# フィルタ事前評価でプロジェクション取得するフィールド
+PRESELECT_FIELDS = ["title", "category", "scraped_at", LEASE_OWNER_FIELD, LEASE_EXPIRES_FIELD]
+
+
+def preselect_documents(config, firestore_client, filter_set: FilterSet) -> List[str]:
+    """
+    本文を読まずにフィルタを事前評価し、変換対象のドキュメントIDを選ぶ
     
-    # 設定とクライアントを初期化
-    config = get_config()
-    firestore_client = get_firestore_client(config)
+    全ての有効な変換器で除外される記事は処理済みにし、
+    以後の変換キューに入らないようにする (その間に他のワーカーが取得した記事は書き換えない)
     
-    print(f"📍 自治体: {config.municipality_name}")
-    print(f"📦 コレクション: {config.firestore_collection_name}")
+    Args:
+        config: Configインスタンス
+        firestore_client: FirestoreClient
+        filter_set: 有効な変換器のフィルタ
     
-    # 変換対象のドキュメントを取得
-    # scriptStatus == None かつ scrapeStatus in ["new", "updated"]
-    docs = firestore_client.query_pending_transform(limit=config.batch_limit)
+    Returns:
+        変換対象のドキュメントID (最大 batch_limit 件)
+    """
+    with span("firestore.preselect"):
+        candidates = firestore_client.query_pending_transform(
+            limit=config.preselect_limit,
+            fields=PRESELECT_FIELDS
+        )
     
-    if not docs:
-        print("⚠️ 変換対象の記事がありません")
-        return
+    selected = []
+    excluded = {}
+    now = time.time()
     
-    print(f"📝 変換対象: {len(docs)} 件")
+    for snap in candidates:
+        data = snap.to_dict() or {}
+        
+        # 他のワーカーが処理中の記事は対象外
+        if data.get(LEASE_OWNER_FIELD) and (data.get(LEASE_EXPIRES_FIELD) or 0) > now:
+            continue
+        
+        decisions = filter_set.evaluate(data)
+        
+        if not any(decisions.values()):
+            # 変換器ごとに更新 (無効な変換器の状態は残す)
+            excluded[snap.id] = {
+                "scriptStatus": True,  # 変換キューから外す
+                "filterStatus": "excluded",
+                **{f"transformStatus.{t}": make_state(STATE_FILTERED) for t in decisions},
+            }
+        elif len(selected) < config.batch_limit:
+            selected.append(snap.id)
     
-    # 変換器を初期化
-    transformers = {}
+    if excluded:
+        with span("firestore.exclude"):
+            updated = sum(
+                1 for doc_id, update_data in excluded.items()
+                if firestore_client.update_unless_leased(doc_id, update_data)
+            )
+        print(f"⏭️ フィルタで全変換器から除外: {updated} 件 (処理済みに更新)")
     
-    # テキスト要約
-    if config.is_transform_enabled("text_simple"):
-        text_config = config.get_transform_config("text_simple")
-        transformers["text_simple"] = SimpleTextTransformer(text_config)
+    return selected
+
+
+def load_reusable_outputs(article: Dict[str, Any], config, firestore_client) -> Dict[str, Any]:
+    """
+    重複記事の場合、正規の記事で完了している変換結果を取得
     
-    # わかりやすいテキスト
-    if config.is_transform_enabled("text_easy"):
-        easy_config = config.get_transform_config("text_easy")
-        transformers["text_easy"] = EasyTextTransformer(easy_config)
+    Args:
+        article: 記事データ (duplicateOf, duplicateExact)
+        config: Configインスタンス
+        firestore_client: FirestoreClient
     
-    # 台本生成
-    if config.is_transform_enabled("text_script"):
-        script_config = config.get_transform_config("text_script")
-        transformers["text_script"] = ScriptTransformer(script_config)
+    Returns:
+        {変換タイプ: 変換結果} (重複でない・再利用できるものがない場合は空)
+    """
+    types = reusable_types(article, config.dedup_config)
+    if types is not None and not types:
+        return {}
     
-    # 画像変換
-    if config.is_transform_enabled("image_single"):
-        image_config = config.get_transform_config("image_single")
-        transformers["image_single"] = ImageSingleTransformer(image_config)
+    with span("firestore.get", source="dedup"):
+        snap = firestore_client.get_document(article["duplicateOf"])
+    if not snap.exists:
+        return {}
     
-    # 動画変換
-    if config.is_transform_enabled("video_short"):
-        video_config = config.get_transform_config("video_short")
-        transformers["video_short"] = VideoShortTransformer(video_config)
+    canonical = snap.to_dict() or {}
+    return {
+        transform_type: result
+        for transform_type, result in (canonical.get("transformedContent") or {}).items()
+        if result
+        and (types is None or transform_type in types)
+        and get_transform_state(canonical, transform_type)["state"] == STATE_COMPLETED
+    }
+
+
+def _lease_lost(heartbeat: Optional[LeaseHeartbeat]) -> bool:
+    """リースを他のワーカーに奪われたか (ハートビートなしの場合はFalse)"""
+    return heartbeat is not None and heartbeat.lost
+
+
+def _partial_saver(
+    firestore_client,
+    doc_id: str,
+    transform_type: str,
+    fingerprint: str,
+    state: Dict[str, Any],
+    heartbeat: Optional[LeaseHeartbeat] = None
+):
+    """変換器の途中結果を保存する関数 (状態は pending のまま、同じ入力の再実行で使い回す)"""
+    attempts = state["attempts"] if state["fingerprint"] == fingerprint else 0
     
-    if not transformers:
-        print("⚠️ 有効な変換器がありません")
-        return
+    def _save(result: Dict[str, Any]):
+        if _lease_lost(heartbeat):
+            print(f"⏩ リースを失ったため途中結果を保存しません: {doc_id} ({transform_type})")
+            return
+        with span("firestore.update"):
+            firestore_client.update_document(doc_id, {
+                f"transformedContent.{transform_type}": result,
+                f"transformStatus.{transform_type}": make_state(STATE_PENDING, fingerprint, attempts),
+            })
+    
+    return _save
+
+
+def transform_article(
+    doc_id: str,
+    article: Dict[str, Any],
+    transformers: Dict[str, Any],
+    filter_set: FilterSet,
+    config,
+    firestore_client,
+    heartbeat: Optional[LeaseHeartbeat] = None
+) -> Optional[bool]:
+    """
+    1記事を変換 (未実行・失敗・入力変更のあった変換器のみ実行)
     
-    # 変換実行
-    success_count = 0
+    Args:
+        doc_id: ドキュメントID
+        article: 記事データ
+        transformers: {変換タイプ: 変換器} (実行順)
+        filter_set: 有効な変換器のフィルタ
+        config: Configインスタンス
+        firestore_client: FirestoreClient
+        heartbeat: リースのハートビート (リースを失ったら生成・書き込みをやめる)
     
-    for doc in docs:
-        doc_id = doc.id
-        article = doc.to_dict()
-        article["id"] = doc_id  # IDを追加 (画像保存などで使用)
+    Returns:
+        全変換器が完了・除外・試行上限のいずれかに達したらTrue
+        (リースを失った場合は何も書き込まずにNone)
+    """
+    max_attempts = config.transform_max_attempts
+    
+    # 既存の変換結果を引き継ぐ (再実行しない変換器の出力を下流で使うため)
+    transformed_content = dict(article.get("transformedContent") or {})
+    article["transformedContent"] = transformed_content
+    
+    # フィルタ判定 (全変換器分を一括評価)
+    decisions = filter_set.evaluate(article)
+    
+    fingerprints = {}
+    states = {}
+    update_data = {}
+    
+    # Gemini使用量の台帳 (変換器ごとに usage.<変換タイプ> へ保存)
+    ledger = UsageLedger()
+    
+    # 重複記事は正規の記事の変換結果を再利用 (生成しない)
+    reusable = load_reusable_outputs(article, config, firestore_client) if article.get("duplicateOf") else {}
+    
+    for transform_type, transformer in transformers.items():
+        # 他のワーカーが引き継いだ記事には生成を続けない (API の二重消費・上書きを防ぐ)
+        if _lease_lost(heartbeat):
+            print(f"⏩ リースを失ったため変換を中断: {doc_id} ({transform_type} 以降)")
+            return None
         
-        print(f"\n--- {article.get('title', 'unknown')[:50]}... ---")
+        upstream = [fingerprints[d] for d in transformer.depends_on if d in fingerprints]
+        fingerprint = compute_input_fingerprint(article, transformer.config, upstream)
+        fingerprints[transform_type] = fingerprint
         
-        try:
-            # 変換結果を格納
-            transformed_content = {}
-            transform_status = {}
+        state = get_transform_state(article, transform_type)
+        
+        if not decisions[transform_type]:
+            new_state = make_state(STATE_FILTERED, fingerprint)
+        elif not needs_run(state, fingerprint, max_attempts):
+            print(f"⏩ 変更なしのためスキップ: {transform_type} ({state['state']})")
+            states[transform_type] = state
+            continue
+        elif transform_type in reusable:
+            result = reusable[transform_type]
+            transformed_content[transform_type] = result
+            update_data[f"transformedContent.{transform_type}"] = result
+            update_data["transformedAt"] = get_current_timestamp()
+            new_state = {**make_state(STATE_COMPLETED, fingerprint), "reusedFrom": article["duplicateOf"]}
+            print(f"♻️ 重複記事の変換結果を再利用: {transform_type} ({article['duplicateOf']})")
+        else:
+            # 同じ入力で前回保存した途中結果 (できている出力は変換器が使い回す)
+            previous = transformed_content.get(transform_type)
+            if not (isinstance(previous, dict) and previous.get(PARTIAL_KEY) and state["fingerprint"] == fingerprint):
+                previous = None
+            saver = _partial_saver(firestore_client, doc_id, transform_type, fingerprint, state, heartbeat)
+            
+            # transform_with_filterを使用 (評価済みのフィルタ判定を渡す)
+            with partial_scope(saver, previous), usage_scope(ledger), transformer_scope(transform_type), span("transform.run", transformer=transform_type) as s:
+                result = transformer.transform_with_filter(article, included=True)
+                s.ok = bool(result)
             
-            # 各変換器を実行 (フィルタリング対応)
-            for transform_type, transformer in transformers.items():
-                # transform_with_filterを使用 (フィルタチェック込み)
-                result = transformer.transform_with_filter(article)
-                
-                if result:
-                    transformed_content[transform_type] = result
-                    transform_status[transform_type] = "completed"
-                    # articleを更新 (次の変換で使用)
-                    article["transformedContent"] = transformed_content
-                else:
-                    transform_status[transform_type] = "skipped_or_failed"
+            # 最後に実行したときの使用量 (失敗した場合も記録)
+            usage = ledger.for_transformer(transform_type)
+            if usage:
+                update_data[f"usage.{transform_type}"] = usage
             
-            # Firestoreに保存
-            if transformed_content:
-                update_data = {
-                    "transformedContent": transformed_content,
-                    "transformStatus": transform_status,
-                    "scriptStatus": True,  # 変換完了フラグ (既存との互換性)
-                }
-                
-                firestore_client.update_document(doc_id, update_data)
-                print(f"✅ 変換完了: {doc_id}")
-                success_count += 1
+            if result:
+                transformed_content[transform_type] = result
+                update_data[f"transformedContent.{transform_type}"] = result
+                update_data["transformedAt"] = get_current_timestamp()  # 配信APIの並び順・ETag
+                new_state = make_state(STATE_COMPLETED, fingerprint)
             else:
-                print(f"⚠️ 変換失敗: {doc_id}")
+                # 同じ入力での失敗回数を数える
+                attempts = state["attempts"] + 1 if state["fingerprint"] == fingerprint else 1
+                new_state = make_state(STATE_FAILED, fingerprint, attempts)
+                print(f"⚠️ 変換失敗: {transform_type} (試行 {attempts}/{max_attempts})")
+        
+        states[transform_type] = new_state
+        update_data[f"transformStatus.{transform_type}"] = new_state
+    
+    settled = all(is_settled(state, max_attempts) for state in states.values())
+    
+    # 変換完了フラグ (既存との互換性)
+    # 再試行が残っている場合は False にして次回のバッチで失敗分のみ再実行
+    update_data["scriptStatus"] = settled
+    
+    # 最終結果の書き込み前にリースを保持しているか確かめる
+    if heartbeat is not None and not heartbeat.confirm():
+        print(f"⏩ リースを失ったため変換結果を保存しません: {doc_id}")
+        return None
+    
+    with span("firestore.update"):
+        firestore_client.update_document(doc_id, update_data)
+    
+    completed = [t for t, st in states.items() if st["state"] == STATE_COMPLETED]
+    if settled:
+        print(f"✅ 変換完了: {doc_id} (完了: {', '.join(completed) or 'なし'})")
+    else:
+        failed = [t for t, st in states.items() if not is_settled(st, max_attempts)]
+        print(f"⚠️ 一部の変換が未完了: {doc_id} (再試行: {', '.join(failed)})")
+    
+    return settled
+
+
+def _record_error(
+    doc_id: str,
+    article: Dict[str, Any],
+    transformers: Dict[str, Any],
+    filter_set: FilterSet,
+    config,
+    firestore_client,
+    heartbeat: LeaseHeartbeat
+):
+    """
+    例外で中断した記事の未完了の変換器に失敗を1回記録
+    
+    結果の保存に失敗した場合など、変換器の状態が書かれないまま変換キューに残ると
+    同じ記事を繰り返し変換してしまうため、transform_max_attempts で再試行を打ち切れるようにする
+    """
+    if not heartbeat.confirm():
+        return
+    
+    max_attempts = config.transform_max_attempts
+    decisions = filter_set.evaluate(article)
+    
+    fingerprints = {}
+    states = {}
+    update_data = {}
+    for transform_type, transformer in transformers.items():
+        upstream = [fingerprints[d] for d in transformer.depends_on if d in fingerprints]
+        fingerprint = compute_input_fingerprint(article, transformer.config, upstream)
+        fingerprints[transform_type] = fingerprint
+        
+        state = get_transform_state(article, transform_type)
+        if not decisions[transform_type]:
+            state = make_state(STATE_FILTERED, fingerprint)
+        elif needs_run(state, fingerprint, max_attempts):
+            attempts = state["attempts"] + 1 if state["fingerprint"] == fingerprint else 1
+            state = make_state(STATE_FAILED, fingerprint, attempts)
+            print(f"⚠️ 変換失敗として記録: {transform_type} (試行 {attempts}/{max_attempts})")
+        else:
+            states[transform_type] = state
+            continue
         
+        states[transform_type] = state
+        update_data[f"transformStatus.{transform_type}"] = state
+    
+    update_data["scriptStatus"] = all(is_settled(state, max_attempts) for state in states.values())
+    
+    try:
+        with span("firestore.update"):
+            firestore_client.update_document(doc_id, update_data)
+    except Exception as e:
+        print(f"⚠️ 失敗の記録に失敗: {doc_id} | {e}")
+
+
+def process_document(
+    doc_id: str,
+    transformers: Dict[str, Any],
+    filter_set: FilterSet,
+    config,
+    firestore_client,
+    owner: str
+) -> Optional[bool]:
+    """
+    リースを取得して1記事を変換
+    
+    変換中はハートビートでリースを延長し、終了時に解放する
+    (クラッシュした場合は期限切れ後に他のワーカーが再取得する)
+    
+    Args:
+        doc_id: ドキュメントID
+        transformers: {変換タイプ: 変換器} (実行順)
+        filter_set: 有効な変換器のフィルタ
+        config: Configインスタンス
+        firestore_client: FirestoreClient
+        owner: ワーカーID
+    
+    Returns:
+        transform_article の結果 (リースを取得できなかった・途中で失った場合はNone)
+    """
+    with span("firestore.claim"):
+        snap = firestore_client.claim_lease(doc_id, owner, config.lease_ttl_sec)
+    if snap is None:
+        print(f"⏩ 他のワーカーが処理中または完了済み: {doc_id}")
+        return None
+    
+    article = snap.to_dict() or {}
+    article["id"] = doc_id  # IDを追加 (画像保存などで使用)
+    
+    print(f"\n--- {article.get('title', 'unknown')[:50]}... ---")
+    
+    heartbeat = LeaseHeartbeat(firestore_client, doc_id, owner, config.lease_ttl_sec)
+    try:
+        with heartbeat, span("transform.article") as s:
+            result = transform_article(doc_id, article, transformers, filter_set, config, firestore_client, heartbeat)
+            s.ok = bool(result)
+            return result
+    except Exception as e:
+        print(f"❌ エラー: {doc_id} | {e}")
+        _record_error(doc_id, article, transformers, filter_set, config, firestore_client, heartbeat)
+        return False
+    finally:
+        try:
+            firestore_client.release_lease(doc_id, owner)
         except Exception as e:
-            print(f"❌ エラー: {doc_id} | {e}")
+            print(f"⚠️ リース解放失敗 (期限切れで解放されます): {doc_id} | {e}")
+
+
+def run_transform(config, firestore_client=None, transformers: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    """
+    1自治体分の変換を実行
     
-    print(f"\n✅ Transform完了: {success_count}/{len(docs)} 件成功")
+    Args:
+        config: Configインスタンス
+        firestore_client: FirestoreClient (Noneの場合は自治体のコレクションで取得)
+        transformers: 初期化済みの変換器 (Noneの場合はここで初期化)
+    
+    Returns:
+        {"targets": 変換対象数, "completed": 完了数}
+    """
+    firestore_client = firestore_client or get_firestore_client(config)
+    summary = {"targets": 0, "completed": 0}
+    
+    print(f"📍 自治体: {config.municipality_name}")
+    print(f"📦 コレクション: {config.firestore_collection_name}")
+    
+    enabled_types = [t for t in TRANSFORM_TYPES if config.is_transform_enabled(t)]
+    if not enabled_types:
+        print("⚠️ 有効な変換器がありません")
+        return summary
+    
+    # 全変換器のフィルタをまとめてコンパイル (記事ごとに1回だけ評価)
+    filter_set = FilterSet({
+        t: create_filter(config.get_transform_config(t).get("filters", {}))
+        for t in enabled_types
+    })
+    
+    # 変換対象のドキュメントを選定
+    # scriptStatus == None かつ scrapeStatus in ["new", "updated"]
+    # (タイトル・カテゴリのみ取得してフィルタを事前評価)
+    doc_ids = preselect_documents(config, firestore_client, filter_set)
+    
+    if not doc_ids:
+        print("⚠️ 変換対象の記事がありません")
+        return summary
+    
+    summary["targets"] = len(doc_ids)
+    
+    print(f"📝 変換対象: {len(doc_ids)} 件")
+    
+    if transformers is None:
+        transformers = create_transformers(config)
+    
+    if not transformers:
+        print("⚠️ 有効な変換器がありません")
+        return summary
+    
+    # 対象記事ごとにリースを取得して変換 (本文はリース取得時に読む)
+    owner = make_worker_id("batch")
+    
+    def _run(doc_id: str) -> Optional[bool]:
+        return process_document(doc_id, transformers, filter_set, config, firestore_client, owner)
+    
+    # 変換実行 (自治体ごとの並列数まで記事を同時に処理)
+    workers = min(config.transform_workers, len(doc_ids))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_run, doc_ids))
+    else:
+        results = [_run(doc_id) for doc_id in doc_ids]
+    
+    summary["completed"] = sum(1 for r in results if r)
+    
+    print(f"\n✅ Transform完了: {summary['completed']}/{len(doc_ids)} 件完了")
+    return summary
+
+
+def main():
+    """メイン処理"""
+    print("🚀 OMO Platform - Transform開始")
+    
+    # 設定を初期化 (環境変数 MUNICIPALITY の自治体)
+    config = get_config()
+    get_metrics().reset()  # ウォームスタートで前回の計測を引き継がない
+    try:
+        run_transform(config)
+    finally:
+        get_metrics().write_report(f"transform-{config.municipality}")
 
 
 # Cloud Functions用ハンドラ
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 変換器レジストリ
+
+変換タイプ → 変換器クラスの対応を "モジュール:クラス名" で持ち、
+有効な変換器のモジュールだけを生成時に読み込む
+(無効な変換器の Gemini SDK / PIL / ffmpeg まわりを読み込まない)
+"""
+
+import importlib
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Type, Union
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.transform.core.base import BaseTransformer
+
+
+# 変換タイプ → "モジュール:クラス名" (実行順: text_digest は下流で共有するため先頭)
+TRANSFORMER_REGISTRY: Dict[str, Union[str, Type[BaseTransformer]]] = {
+    "text_digest": "backend.transform.text.digest:ArticleDigestTransformer",
+    "text_simple": "backend.transform.text.simple:SimpleTextTransformer",
+    "text_easy": "backend.transform.text.easy:EasyTextTransformer",
+    "text_script": "backend.transform.text.script:ScriptTransformer",
+    "image_single": "backend.transform.image.single:ImageSingleTransformer",
+    "video_short": "backend.transform.video.short:VideoShortTransformer",
+}
+
+# 変換タイプ (実行順)
+TRANSFORM_TYPES: List[str] = list(TRANSFORMER_REGISTRY)
+
+_load_lock = threading.Lock()
+
+
+def register_transformer(transform_type: str, transformer_cls: Union[str, Type[BaseTransformer]]):
+    """
+    変換器を登録
+    
+    Args:
+        transform_type: 変換タイプ (設定の transform のキー)
+        transformer_cls: 変換器クラス、または "モジュール:クラス名" (生成時に読み込む)
+    """
+    TRANSFORMER_REGISTRY[transform_type] = transformer_cls
+    if transform_type not in TRANSFORM_TYPES:
+        TRANSFORM_TYPES.append(transform_type)
+
+
+def load_transformer_class(transform_type: str) -> Optional[Type[BaseTransformer]]:
+    """
+    変換器クラスを取得 (初回はモジュールを読み込む)
+    
+    Args:
+        transform_type: 変換タイプ
+    
+    Returns:
+        変換器クラス (未登録の場合はNone)
+    """
+    with _load_lock:
+        entry = TRANSFORMER_REGISTRY.get(transform_type)
+        if entry is None or not isinstance(entry, str):
+            return entry
+        
+        module_name, _, class_name = entry.partition(":")
+        transformer_cls = getattr(importlib.import_module(module_name), class_name)
+        TRANSFORMER_REGISTRY[transform_type] = transformer_cls
+        return transformer_cls
+
+
+def create_transformer(transform_type: str, transform_config: Dict[str, Any]) -> Optional[BaseTransformer]:
+    """
+    変換設定から変換器を生成
+    
+    Args:
+        transform_type: 変換タイプ
+        transform_config: 変換設定
+    
+    Returns:
+        変換器 (未対応の場合はNone)
+    """
+    transformer_cls = load_transformer_class(transform_type)
+    if transformer_cls is None:
+        print(f"⚠️ 未対応の変換器: {transform_type}")
+        return None
+    
+    return transformer_cls(transform_config)
+
+
+def create_transformers(config) -> Dict[str, BaseTransformer]:
+    """
+    有効な変換器を実行順に初期化
+    
+    Args:
+        config: Configインスタンス
+    
+    Returns:
+        {変換タイプ: 変換器}
+    """
+    transformers = {}
+    for transform_type in TRANSFORM_TYPES:
+        if not config.is_transform_enabled(transform_type):
+            continue
+        
+        transform_config = config.get_transform_config(transform_type)
+        # 変換器が使う自治体設定のトップレベルの設定 (変換器ごとの設定があればそちらを優先)
+        transformer_cls = load_transformer_class(transform_type)
+        shared = getattr(transformer_cls, "shared_settings", [])
+        if shared:
+            transform_config = {**{key: getattr(config, key) for key in shared}, **transform_config}
+        transformer = create_transformer(transform_type, transform_config)
+        if transformer:
+            transformers[transform_type] = transformer
+    
+    return transformers
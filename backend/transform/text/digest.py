@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 記事ダイジェスト生成
+
+記事本文から要点 (日時・場所・対象・締切・見出し) を1回だけ抽出し、
+text_simple / image_single / text_script で共有する
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+# パスを追加
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from backend.transform.core.base import BaseTransformer
+from backend.common.llm import get_llm_client
+from backend.common.utils import parse_json_loose
+
+
+# ダイジェストに含めるリスト項目 (キー, 表示ラベル)
+DIGEST_FACT_FIELDS = [
+    ("dates", "日時"),
+    ("places", "場所"),
+    ("targets", "対象"),
+    ("deadlines", "締切"),
+]
+
+DEFAULT_DIGEST_PROMPT = """以下の自治体のお知らせから、要点を構造化して抽出してください。
+
+# 記事タイトル
+{title}
+
+# 記事本文
+{body_text}
+
+# 指示
+- 記事に書かれている事実のみを抽出し、推測や補足は加えないでください。
+- 日付・曜日・時間・金額・人数などの数字は、本文の表記どおり正確に残してください。
+- 該当する情報がない項目は空配列にしてください。
+- key_points は {max_points} 個以内で、見出しは【】を付けずに短い名詞で書いてください
+  (例: イベント概要、募集対象、募集期間、開催場所、応募方法)。
+
+# 出力形式 (JSONのみ)
+{{
+  "summary": "記事全体の1〜2文の要約",
+  "dates": ["開催日時などの日付・時間"],
+  "places": ["会場・場所"],
+  "targets": ["対象者"],
+  "deadlines": ["申込・提出などの締切"],
+  "key_points": [
+    {{"heading": "見出し", "content": "内容 (体言止めで簡潔に)"}}
+  ]
+}}
+"""
+
+
+class ArticleDigestTransformer(BaseTransformer):
+    """記事ダイジェスト生成"""
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.llm = get_llm_client()
+        self.max_input_chars = config.get("max_input_chars", 3000)
+        self.max_points = config.get("max_points", 5)
+        self.max_output_tokens = config.get("max_output_tokens", 4096)
+        self.prompts = config.get("prompts", {})
+    
+    def transform(self, article: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        記事からダイジェストを生成
+        """
+        if not self.is_enabled():
+            return None
+        
+        if not self.validate_article(article):
+            print(f"⚠️ 記事データが不正: {article.get('title', 'unknown')}")
+            return None
+        
+        try:
+            title = article.get("title", "")
+            body_text = self.get_source_text(article)
+            
+            # 本文が長すぎる場合は切り詰め
+            body_preview = self.prepare_body_text(title, body_text, self.max_input_chars)
+            
+            prompt = self._build_prompt(title, body_preview)
+            
+            response = self.llm.generate(
+                prompt=prompt,
+                generation_config=self.llm.get_json_config(max_tokens=self.max_output_tokens),
+                retry=3
+            )
+            
+            raw_text = self.llm.extract_text(response)
+            digest = self._normalize_digest(parse_json_loose(raw_text))
+            
+            if not digest["key_points"] and not digest["summary"]:
+                print(f"⚠️ ダイジェスト生成失敗 (JSONパース失敗): {title}")
+                return None
+            
+            print(f"✅ ダイジェスト生成: {title[:30]}... ({len(digest['key_points'])}項目)")
+            return digest
+        
+        except Exception as e:
+            print(f"❌ ダイジェスト生成エラー: {article.get('title', 'unknown')} | {e}")
+            return None
+    
+    def _build_prompt(self, title: str, body_text: str) -> str:
+        """プロンプトを作成"""
+        template = self.prompts.get("digest", DEFAULT_DIGEST_PROMPT)
+        
+        return template.format(
+            title=title,
+            body_text=body_text,
+            max_points=self.max_points
+        )
+    
+    def _normalize_digest(self, parsed: Dict[str, Any]) -> Dict[str, Any]:
+        """LLM出力を正規化 (型の揺れを吸収)"""
+        digest: Dict[str, Any] = {
+            "summary": str(parsed.get("summary") or "").strip(),
+        }
+        
+        for key, _ in DIGEST_FACT_FIELDS:
+            digest[key] = _as_str_list(parsed.get(key))
+        
+        key_points = []
+        for item in parsed.get("key_points") or []:
+            if not isinstance(item, dict):
+                continue
+            heading = str(item.get("heading") or "").strip().strip("【】")
+            content = str(item.get("content") or "").strip()
+            if heading and content:
+                key_points.append({"heading": heading, "content": content})
+        
+        digest["key_points"] = key_points[:self.max_points]
+        return digest
+
+
+# ========================================
+# 下流の変換器向けヘルパー
+# ========================================
+
+def _as_str_list(value: Any) -> List[str]:
+    """文字列またはリストを文字列リストに変換"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value.strip()] if value.strip() else []
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return []
+
+
+def get_article_digest(article: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    記事に付与済みのダイジェストを取得
+    
+    Args:
+        article: 記事データ (transformedContent を含む)
+    
+    Returns:
+        ダイジェスト (未生成の場合はNone)
+    """
+    digest = (article.get("transformedContent") or {}).get("text_digest")
+    if not isinstance(digest, dict) or not digest.get("key_points"):
+        return None
+    return digest
+
+
+def format_digest_text(digest: Dict[str, Any]) -> str:
+    """
+    ダイジェストをプロンプト入力用のテキストに変換
+    
+    Args:
+        digest: ダイジェスト
+    
+    Returns:
+        本文の代わりにプロンプトへ埋め込むテキスト
+    """
+    lines = []
+    
+    if digest.get("summary"):
+        lines.append(f"【要約】{digest['summary']}")
+    
+    for key, label in DIGEST_FACT_FIELDS:
+        values = digest.get(key) or []
+        if values:
+            lines.append(f"【{label}】{' / '.join(values)}")
+    
+    lines.append(format_digest_summary(digest))
+    return "\n".join(line for line in lines if line)
+
+
+def format_digest_summary(digest: Dict[str, Any]) -> str:
+    """
+    ダイジェストの要点を「【見出し】・内容」形式に変換 (画像掲載用)
+    
+    Args:
+        digest: ダイジェスト
+    
+    Returns:
+        見出し付き箇条書きテキスト
+    """
+    blocks = []
+    for point in digest.get("key_points") or []:
+        blocks.append(f"【{point['heading']}】\n・{point['content']}")
+    return "\n".join(blocks)
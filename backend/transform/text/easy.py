@@ -15,7 +15,6 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
 
 from backend.transform.core.base import BaseTransformer
 from backend.common.llm import get_llm_client
-from backend.common.utils import truncate_text
 from backend.common.storage import save_file
 
 
@@ -43,10 +42,10 @@ class EasyTextTransformer(BaseTransformer):
         try:
             # 入力データを準備
             title = article.get("title", "")
-            body_text = article.get("body_text", "")
+            body_text = self.get_source_text(article)
             
             # 本文が長すぎる場合は切り詰め（入力トークン制限対策）
-            body_preview = truncate_text(body_text, 3000, suffix="...")
+            body_preview = self.prepare_body_text(title, body_text, 3000)
             
             # プロンプト作成
             # ここでは「簡潔テキスト」ではなく「本文」を元にする
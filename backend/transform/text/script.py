@@ -9,22 +9,36 @@ import sys
 import os
 import json
 import re
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, TYPE_CHECKING
 
 # パスを追加
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
 
 from backend.transform.core.base import BaseTransformer
 from backend.common.config import get_config
+from backend.common.llm import build_safety_settings, gemini_request
+from backend.common.usage import record_usage
 from backend.common.utils import truncate_text
-import google.generativeai as genai
-from google.generativeai.types import GenerationConfig, HarmCategory, HarmBlockThreshold
+from backend.transform.text.digest import get_article_digest
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+    from google.generativeai.types import GenerationConfig
+
+
+def _generation_config(**kwargs) -> "GenerationConfig":
+    """GenerationConfig を作成 (SDK は生成時に読み込む)"""
+    from google.generativeai.types import GenerationConfig
+    return GenerationConfig(**kwargs)
 
 
 class ScriptTransformer(BaseTransformer):
     """台本生成"""
     
+    depends_on = ["text_digest"]
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.municipality_name = config.get("municipality_name", "守谷市")
@@ -35,22 +49,31 @@ class ScriptTransformer(BaseTransformer):
         self.telop_max_chars = config.get("telop_max_chars", 40)
         self.max_output_tokens = config.get("max_output_tokens", 16384)
         self.prompts = config.get("prompts", {})
+        self.use_digest = config.get("use_digest", True)
         
-        # Gemini初期化
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
+        # Gemini は最初の生成時に初期化 (キーの有無だけ先に確認)
+        self.api_key = os.getenv("GOOGLE_API_KEY")
+        if not self.api_key:
             raise ValueError("GOOGLE_API_KEY が設定されていません")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(self.model_name)
+        self._model: Optional["genai.GenerativeModel"] = None
+        self._model_lock = threading.Lock()
         print(f"✨ ScriptTransformer初期化: model={self.model_name}")
-        
-        # 安全設定 (ブロックなし)
-        self.safety_settings = {
-            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-        }
+    
+    @property
+    def model(self) -> "genai.GenerativeModel":
+        """GenerativeModel (最初の生成時に初期化)"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+    
+    @property
+    def safety_settings(self) -> Dict[Any, Any]:
+        """安全設定 (ブロックなし)"""
+        return build_safety_settings("BLOCK_NONE")
 
     # ... (中略) ...
 
@@ -137,16 +160,18 @@ class ScriptTransformer(BaseTransformer):
         )
         
         try:
-            config = GenerationConfig(
+            config = _generation_config(
                 temperature=0.0,
                 max_output_tokens=10240
             )
             
-            response = self.model.generate_content(
-                prompt,
-                generation_config=config,
-                safety_settings=self.safety_settings
-            )
+            with gemini_request(self.model_name):
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=config,
+                    safety_settings=self.safety_settings
+                )
+                record_usage(self.model_name, response, purpose="telop")
             
             raw = self._extract_text_safe(response)
             if not raw:
@@ -191,12 +216,16 @@ class ScriptTransformer(BaseTransformer):
         
         try:
             title = article.get("title", "")
-            body_text = article.get("body_text", "")
+            body_text = self.get_source_text(article)
             
             print(f"📝 台本生成開始: {title[:30]}...")
             
-            # 1. シーン数を決定
-            scene_count = self._get_scene_count(title, body_text)
+            # 1. シーン数を決定 (ダイジェストがあればLLM呼び出しを省略)
+            digest = get_article_digest(article) if self.use_digest else None
+            if digest:
+                scene_count = self._scene_count_from_digest(digest)
+            else:
+                scene_count = self._get_scene_count(title, body_text)
             
             # 2. 台本生成
             script_data = self._generate_script(scene_count, title, body_text)
@@ -227,6 +256,13 @@ class ScriptTransformer(BaseTransformer):
             traceback.print_exc()
             return None
     
+    def _scene_count_from_digest(self, digest: Dict[str, Any]) -> int:
+        """ダイジェストの要点数からシーン数を決定 (導入 + 要点 + 結び)"""
+        n = len(digest.get("key_points", [])) + 2
+        n = max(self.scene_min, min(self.scene_max, n))
+        print(f"🎬 シーン数 (ダイジェストから算出): {n}")
+        return n
+    
     def _get_scene_count(self, title: str, body_text: str) -> int:
         """シーン数を決定"""
         input_text = f"記事タイトル: {title}\n\n記事本文:\n{truncate_text(body_text, 800)}"
@@ -252,18 +288,20 @@ class ScriptTransformer(BaseTransformer):
         
         try:
             print(f"🔢 シーン数取得開始 (model={self.model_name})")
-            config = GenerationConfig(
+            config = _generation_config(
                 temperature=0.0,
                 max_output_tokens=10240
             )
             
             # 初回試行
             try:
-                response = self.model.generate_content(
-                    prompt,
-                    generation_config=config,
-                    safety_settings=self.safety_settings
-                )
+                with gemini_request(self.model_name):
+                    response = self.model.generate_content(
+                        prompt,
+                        generation_config=config,
+                        safety_settings=self.safety_settings
+                    )
+                    record_usage(self.model_name, response, purpose="scene_count")
                 raw = self._extract_text_safe(response)
             except Exception as e:
                 print(f"⚠️ 初回試行失敗: {e}")
@@ -274,11 +312,13 @@ class ScriptTransformer(BaseTransformer):
                 print("⚠️ シーン数取得失敗 -> リトライ (プロンプト調整)")
                 safe_prompt = prompt + "\n\n※内容評価や不適切表現は扱わず、数値だけを出力してください。"
                 try:
-                    response = self.model.generate_content(
-                        safe_prompt,
-                        generation_config=config,
-                        safety_settings=self.safety_settings
-                    )
+                    with gemini_request(self.model_name):
+                        response = self.model.generate_content(
+                            safe_prompt,
+                            generation_config=config,
+                            safety_settings=self.safety_settings
+                        )
+                        record_usage(self.model_name, response, purpose="scene_count")
                     raw = self._extract_text_safe(response)
                 except Exception as e:
                     print(f"⚠️ リトライ失敗: {e}")
@@ -374,18 +414,20 @@ class ScriptTransformer(BaseTransformer):
         )
         
         try:
-            config = GenerationConfig(
+            config = _generation_config(
                 temperature=0.2,
                 top_p=0.9,
                 top_k=40,
                 max_output_tokens=10240
             )
             
-            response = self.model.generate_content(
-                prompt,
-                generation_config=config,
-                safety_settings=self.safety_settings
-            )
+            with gemini_request(self.model_name):
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=config,
+                    safety_settings=self.safety_settings
+                )
+                record_usage(self.model_name, response, purpose="script")
             
             # 安全チェック
             if not response.parts:
@@ -448,16 +490,18 @@ class ScriptTransformer(BaseTransformer):
         )
         
         try:
-            config = GenerationConfig(
+            config = _generation_config(
                 temperature=0.0,
                 max_output_tokens=self.max_output_tokens
             )
             
-            response = self.model.generate_content(
-                prompt,
-                generation_config=config,
-                safety_settings=self.safety_settings
-            )
+            with gemini_request(self.model_name):
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=config,
+                    safety_settings=self.safety_settings
+                )
+                record_usage(self.model_name, response, purpose="telop")
             
             raw = self._extract_text_safe(response)
             if not raw:
@@ -17,17 +17,21 @@ from backend.transform.core.base import BaseTransformer
 from backend.common.llm import get_llm_client
 from backend.common.utils import truncate_text
 from backend.common.storage import save_file
+from backend.transform.text.digest import get_article_digest, format_digest_text
 
 
 class SimpleTextTransformer(BaseTransformer):
     """簡潔テキスト生成"""
     
+    depends_on = ["text_digest"]
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.llm = get_llm_client()
         self.max_chars = config.get("max_chars", 150)
         self.max_output_tokens = config.get("max_output_tokens", 8192)
         self.prompts = config.get("prompts", {})
+        self.use_digest = config.get("use_digest", True)
     
     def transform(self, article: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
@@ -43,10 +47,15 @@ class SimpleTextTransformer(BaseTransformer):
         try:
             # 入力データを準備
             title = article.get("title", "")
-            body_text = article.get("body_text", "")
+            body_text = self.get_source_text(article)
             
-            # 本文が長すぎる場合は切り詰め
-            body_preview = truncate_text(body_text, 1500, suffix="...")
+            # ダイジェストがあれば本文の代わりに使用 (入力トークン削減)
+            digest = get_article_digest(article) if self.use_digest else None
+            if digest:
+                body_preview = format_digest_text(digest)
+            else:
+                # 本文が長すぎる場合は切り詰め
+                body_preview = self.prepare_body_text(title, body_text, 1500)
             
             # プロンプト作成
             prompt = self._build_prompt(title, body_preview)
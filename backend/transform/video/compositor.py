@@ -11,21 +11,52 @@ import tempfile
 from typing import List, Tuple, Optional
 from PIL import Image, ImageDraw, ImageFont
 
+from backend.common.metrics import span
+from backend.transform.image.reframe import BLUR_RATIO, REFRAME_CROP, REFRAME_PAD
+from backend.transform.video.encoder import EncoderProfile, resolve_profile
+
+
+def _reframe_filter(width: int, height: int, mode: str = REFRAME_PAD) -> str:
+    """
+    別のアスペクト比に変換するフィルターグラフ (入力 [0:v] → 出力 [v])
+    
+    - pad: 全体を収め、余白は同じ映像を拡大・ぼかして敷き詰める (テロップを切らない)
+    - crop: 拡大して中央を切り抜く
+    """
+    if mode == REFRAME_CROP:
+        return f"[0:v]scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height},setsar=1[v]"
+    blur = max(2, round(min(width, height) * BLUR_RATIO))
+    return (
+        f"[0:v]split=2[bg][fg];"
+        f"[bg]scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height},boxblur={blur}[bgb];"
+        f"[fg]scale={width}:{height}:force_original_aspect_ratio=decrease[fgs];"
+        f"[bgb][fgs]overlay=(W-w)/2:(H-h)/2,setsar=1[v]"
+    )
+
 
 class VideoCompositor:
     """動画合成"""
     
-    def __init__(self, width: int, height: int, fps: int = 30, scene_padding: float = 0.6):
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        fps: int = 30,
+        scene_padding: float = 0.6,
+        profile: Optional[EncoderProfile] = None
+    ):
         """
         Args:
             width: 動画幅
             height: 動画高さ
             fps: フレームレート
             scene_padding: 各シーンの末尾余韻(秒)
+            profile: エンコード設定 (Noneの場合は default)
         """
         self.width = width
         self.height = height
-        self.fps = fps
+        self.profile = profile or resolve_profile(None, fps=fps)
+        self.fps = self.profile.fps
         self.scene_padding = scene_padding
     
     def create_video(
@@ -87,7 +118,9 @@ class VideoCompositor:
             
             try:
                 # FFmpegで動画生成
-                self._run_ffmpeg(tmp_image_path, audio_path, output_path, duration)
+                with span("ffmpeg.run", step="scene", size=f"{self.width}x{self.height}", profile=self.profile.name) as s:
+                    self._run_ffmpeg(tmp_image_path, audio_path, output_path, duration)
+                    s.amount = os.path.getsize(output_path)
                 return True
             finally:
                 # 一時ファイル削除
@@ -100,6 +133,38 @@ class VideoCompositor:
             traceback.print_exc()
             return False
     
+    def reframe_video(self, input_path: str, output_path: str, mode: str = REFRAME_PAD) -> bool:
+        """
+        完成した動画 (マスター) をこの動画の解像度に変換 (音声は再エンコードせずにコピー)
+        
+        Args:
+            input_path: マスター動画パス
+            output_path: 出力動画パス
+            mode: pad / crop
+        
+        Returns:
+            成功したらTrue
+        """
+        cmd = [
+            "ffmpeg", "-y",
+            "-i", input_path,
+            "-filter_complex", _reframe_filter(self.width, self.height, mode),
+            "-map", "[v]", "-map", "0:a?",
+            *self.profile.video_args(),
+            "-c:a", "copy",
+            *self.profile.container_args(),
+            output_path
+        ]
+        
+        with span("ffmpeg.run", step="reframe", size=f"{self.width}x{self.height}", profile=self.profile.name) as s:
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"⚠️ 動画のアスペクト比変換失敗 ({self.width}x{self.height}): {result.stderr[-500:]}")
+                s.ok = False
+                return False
+            s.amount = os.path.getsize(output_path)
+        return True
+    
     def _get_audio_duration(self, audio_path: str) -> float:
         """音声の長さを取得 (秒)"""
         cmd = [
@@ -344,19 +409,17 @@ class VideoCompositor:
         # これにより、音声の実際の長さ + 余韻が保証される
         audio_filter = f"apad=pad_dur={self.scene_padding}"
         
+        # 静止画は低いフレームレートで読み込み、出力のフレームレートまで複製する (input_fps)
         cmd = [
             "ffmpeg", "-y",
-            "-loop", "1",
+            *self.profile.still_input_args(),
             "-i", image_path,
             "-i", audio_path,
             "-filter:a", audio_filter,  # 音声に余韻を追加
-            "-c:v", "libx264",
-            "-tune", "stillimage",
-            "-c:a", "aac",
-            "-b:a", "192k",
-            "-pix_fmt", "yuv420p",
+            *self.profile.video_args(still=True),
+            *self.profile.audio_args(),
+            *self.profile.container_args(),
             "-shortest",  # 音声の長さに合わせる
-            "-r", str(self.fps),
             output_path
         ]
         
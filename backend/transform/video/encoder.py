@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+OMO Platform - 動画のエンコード設定 (プロファイル)
+
+ショート動画は静止画 (スライド) + 音声のため、動きのある映像向けの既定値より
+大幅に速く・小さくエンコードできる。設定は名前付きのプロファイルとして YAML に書き、
+変換器の encoder_profile で選ぶ。
+
+    encoder_profiles:          # 自治体設定のトップレベル (組み込みのプロファイルの上書き・追加)
+      still_fast:
+        preset: "veryfast"
+        crf: 26
+      my_profile:
+        base: "still_small"    # 継承するプロファイル
+        audio_bitrate: "64k"
+
+静止画向けの工夫:
+- input_fps: 静止画を低いフレームレートで読み込み、出力時にフレームを複製する
+  (ffmpeg は -loop 1 の画像をフレームごとにデコードするため、読み込み回数が減る)
+- gop / keyint_min: キーフレームの間隔を長くする (変化のないフレームはほぼ0バイト)
+
+tune / pix_fmt / h264_profile / level を省略した場合は従来のパスごとの値を使う
+(シーンクリップ: -tune stillimage -pix_fmt yuv420p -r、仕上げ (BGM合成): -profile:v high -level 4.1)。
+指定した場合はすべてのパスに付ける。
+"""
+
+from typing import Dict, Any, List, Optional
+
+
+# 組み込みのプロファイル
+BUILTIN_PROFILES: Dict[str, Dict[str, Any]] = {
+    # 従来の設定 (パスごとに従来と同じオプション)
+    "default": {},
+    # 静止画向け・速度優先
+    "still_fast": {
+        "preset": "veryfast",
+        "crf": 25,
+        "input_fps": 1,
+        "gop": 300,
+        "keyint_min": 30,
+        "audio_bitrate": "128k",
+        "faststart": True,
+    },
+    # 静止画向け・サイズ優先
+    "still_small": {
+        "preset": "slow",
+        "crf": 28,
+        "input_fps": 1,
+        "gop": 600,
+        "keyint_min": 30,
+        "audio_bitrate": "96k",
+        "faststart": True,
+    },
+}
+
+DEFAULT_PROFILE = "default"
+
+# 省略時のパスごとの値 (従来のコマンドと同じ)
+STILL_PASS_DEFAULTS = {"tune": "stillimage", "pix_fmt": "yuv420p"}
+FINISH_PASS_DEFAULTS = {"h264_profile": "high", "level": "4.1"}
+
+
+class EncoderProfile:
+    """ffmpeg のエンコード設定"""
+    
+    def __init__(self, name: str, settings: Dict[str, Any], fps: int = 30):
+        """
+        Args:
+            name: プロファイル名
+            settings: 設定 (preset, crf, tune, fps, input_fps, gop, keyint_min,
+                h264_profile, level, pix_fmt, audio_codec, audio_bitrate, faststart)
+            fps: 設定に fps がない場合の出力フレームレート
+        """
+        self.name = name
+        self.video_codec = settings.get("video_codec", "libx264")
+        self.preset = settings.get("preset")
+        self.crf = settings.get("crf")
+        self.tune = settings.get("tune")
+        self.fps = int(settings.get("fps") or fps)
+        self.input_fps = settings.get("input_fps")
+        self.gop = settings.get("gop")
+        self.keyint_min = settings.get("keyint_min")
+        self.h264_profile = settings.get("h264_profile")
+        self.level = settings.get("level")
+        self.pix_fmt = settings.get("pix_fmt")
+        self.audio_codec = settings.get("audio_codec", "aac")
+        self.audio_bitrate = settings.get("audio_bitrate", "192k")
+        self.faststart = settings.get("faststart", False)
+    
+    def still_input_args(self) -> List[str]:
+        """静止画の入力オプション (-i の前に置く)"""
+        args = ["-loop", "1"]
+        if self.input_fps:
+            args = ["-framerate", str(self.input_fps)] + args
+        return args
+    
+    def video_args(self, still: bool = False) -> List[str]:
+        """
+        映像のエンコードオプション
+        
+        Args:
+            still: 静止画からシーンクリップを作るパス (Falseの場合は動画を再エンコードする仕上げのパス)
+        """
+        defaults = STILL_PASS_DEFAULTS if still else FINISH_PASS_DEFAULTS
+        tune = self.tune or defaults.get("tune")
+        h264_profile = self.h264_profile or defaults.get("h264_profile")
+        level = self.level or defaults.get("level")
+        pix_fmt = self.pix_fmt or defaults.get("pix_fmt")
+        
+        args = ["-c:v", self.video_codec]
+        if self.preset:
+            args += ["-preset", str(self.preset)]
+        if self.crf is not None:
+            args += ["-crf", str(self.crf)]
+        if tune:
+            args += ["-tune", str(tune)]
+        if h264_profile:
+            args += ["-profile:v", str(h264_profile)]
+        if level:
+            args += ["-level", str(level)]
+        if self.gop:
+            args += ["-g", str(self.gop)]
+        if self.keyint_min:
+            args += ["-keyint_min", str(self.keyint_min)]
+        if pix_fmt:
+            args += ["-pix_fmt", str(pix_fmt)]
+        # 仕上げのパスは入力 (シーンクリップ) のフレームレートをそのまま使う
+        return args + ["-r", str(self.fps)] if still else args
+    
+    def audio_args(self) -> List[str]:
+        """音声のエンコードオプション"""
+        return ["-c:a", self.audio_codec, "-b:a", str(self.audio_bitrate)]
+    
+    def container_args(self) -> List[str]:
+        """MP4 のオプション (faststart: 先頭から再生できるよう moov を前に置く)"""
+        return ["-movflags", "+faststart"] if self.faststart else []
+
+
+def resolve_profile(
+    name: Optional[str],
+    custom_profiles: Optional[Dict[str, Dict[str, Any]]] = None,
+    fps: int = 30
+) -> EncoderProfile:
+    """
+    名前からプロファイルを作成
+    
+    Args:
+        name: プロファイル名 (Noneの場合は default)
+        custom_profiles: YAML の encoder_profiles (組み込みの上書き・追加)
+        fps: 設定に fps がない場合の出力フレームレート
+    
+    Returns:
+        EncoderProfile (見つからない場合は default)
+    """
+    name = name or DEFAULT_PROFILE
+    custom_profiles = custom_profiles or {}
+    
+    settings: Dict[str, Any] = {}
+    seen = set()
+    current: Optional[str] = name
+    # base をたどって継承元から順に重ねる
+    chain = []
+    while current and current not in seen:
+        seen.add(current)
+        merged = {**BUILTIN_PROFILES.get(current, {}), **(custom_profiles.get(current) or {})}
+        if current not in BUILTIN_PROFILES and current not in custom_profiles:
+            print(f"⚠️ エンコードプロファイルが見つかりません: {current} -> {DEFAULT_PROFILE}")
+            break
+        chain.append(merged)
+        current = merged.get("base")
+    
+    for layer in reversed(chain):
+        settings.update({k: v for k, v in layer.items() if k != "base"})
+    
+    return EncoderProfile(name if chain else DEFAULT_PROFILE, settings, fps)
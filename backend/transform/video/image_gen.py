@@ -7,9 +7,13 @@ Gemini APIで画像を生成
 
 import os
 import time
-from typing import Optional, Dict, Any
-from google import genai
-from google.genai import types
+from typing import Optional, List, Any, TYPE_CHECKING
+
+from backend.common.llm import LIMIT_IMAGE, gemini_request, get_genai_client
+from backend.common.usage import record_usage
+
+if TYPE_CHECKING:
+    from google import genai
 
 
 class GeminiImageGenerator:
@@ -22,13 +26,17 @@ class GeminiImageGenerator:
         """
         self.model = model
         
-        # クライアント初期化
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
+        # クライアントは最初の生成時に作成 (キーの有無だけ先に確認)
+        self.api_key = os.getenv("GOOGLE_API_KEY")
+        if not self.api_key:
             raise ValueError("GOOGLE_API_KEY が設定されていません")
-        self.client = genai.Client(api_key=api_key)
     
-    def generate(self, prompt: str, output_path: str, aspect_ratio: str = "1:1", reference_images: Optional[Dict[str, Any]] = None, image_size: str = "1K") -> bool:
+    @property
+    def client(self) -> "genai.Client":
+        """google-genai クライアント (最初の生成時に作成、プロセス全体で共有)"""
+        return get_genai_client(self.api_key)
+    
+    def generate(self, prompt: str, output_path: str, aspect_ratio: str = "1:1", reference_images: Optional[List[Any]] = None, image_size: str = "1K") -> bool:
         """
         画像を生成して保存
         
@@ -36,7 +44,7 @@ class GeminiImageGenerator:
             prompt: プロンプト
             output_path: 保存先パス
             aspect_ratio: アスペクト比 ("1:1", "16:9", "9:16" など)
-            reference_images: 参照画像の辞書 {filename: PIL.Image}
+            reference_images: 参照画像のパーツ (reference_images.reference_parts の結果)
             image_size: 画像サイズ ("1K", "2K", "4K")
         
         Returns:
@@ -52,11 +60,10 @@ class GeminiImageGenerator:
             # コンテンツ構築 (プロンプト + 参照画像)
             contents = [prompt]
             if reference_images:
-                for name, img in reference_images.items():
-                    contents.append(img)
-                    # print(f"   + Ref: {name}")
+                contents.extend(reference_images)
 
-            # 設定
+            # 設定 (SDK は生成時に読み込む)
+            from google.genai import types
             conf = types.GenerateContentConfig(
                 response_modalities=["IMAGE"],
                 image_config=types.ImageConfig(
@@ -66,11 +73,13 @@ class GeminiImageGenerator:
             )
             
             # 画像生成
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=contents,
-                config=conf
-            )
+            # 全自治体・全スレッドで共有するレート制限
+            with gemini_request(self.model, LIMIT_IMAGE, "image.generate", aspect_ratio=aspect_ratio):
+                response = self.client.models.generate_content(
+                    model=self.model,
+                    contents=contents,
+                    config=conf
+                )
             
             # 画像抽出
             img_bytes = None
@@ -83,6 +92,8 @@ class GeminiImageGenerator:
                             break
                     if img_bytes: break
             
+            record_usage(self.model, response, images=1 if img_bytes else 0, purpose="scene_image")
+            
             # 画像データを保存
             if img_bytes:
                 with open(output_path, "wb") as f:
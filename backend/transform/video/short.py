@@ -14,17 +14,21 @@ import tempfile
 import subprocess
 import re
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from PIL import Image, ImageDraw, ImageFont
 
 # パスを追加
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
 
 from backend.transform.core.base import BaseTransformer
+from backend.common.metrics import span
 from backend.common.storage import save_file
+from backend.transform.core.reference_images import DEFAULT_MAX_EDGE, load_reference_images, reference_parts
 from backend.transform.video.tts import GeminiTTS
 from backend.transform.video.image_gen import GeminiImageGenerator
+from backend.transform.image.reframe import REFRAME_PAD
 from backend.transform.video.compositor import VideoCompositor
+from backend.transform.video.encoder import resolve_profile
 
 
 # デフォルトの解像度マッピング（設定がない場合のフォールバック）
@@ -45,10 +49,19 @@ TAIL_SEC = 0.6
 class VideoShortTransformer(BaseTransformer):
     """ショート動画生成"""
     
+    depends_on = ["text_script"]
+    shared_settings = ["encoder_profiles"]
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.aspect_ratios = config.get("aspect_ratios", ["1:1"])
         self.fps = config.get("fps", 30)
+        # エンコード設定 (定義は自治体設定の encoder_profiles、組み込み: default / still_fast / still_small)
+        self.encoder_profile = resolve_profile(
+            config.get("encoder_profile"),
+            config.get("encoder_profiles"),
+            self.fps
+        )
         self.duration_max = config.get("duration_max", 60)
         self.generate_images = config.get("generate_images", False)  # 画像生成フラグ
         
@@ -74,8 +87,18 @@ class VideoShortTransformer(BaseTransformer):
         
         # 参照画像ディレクトリ
         self.reference_images_dir = config.get("reference_images_dir", "assets/video")
+        self.reference_max_edge = int(config.get("reference_max_edge", DEFAULT_MAX_EDGE))
+        self.reference_upload = config.get("reference_upload", True)  # Files API で1回だけアップロード
         self.image_size = config.get("image_size", "1K")
         
+        # マスター動画から他のアスペクト比を変換 (画像生成・テロップ・音声合成・BGM はマスターの1回だけ)
+        self.derive_from_master = config.get("derive_from_master", False)
+        self.master_aspect_ratio = config.get("master_aspect_ratio") or self.aspect_ratios[0]
+        if self.master_aspect_ratio not in self.aspect_ratios:
+            print(f"⚠️ master_aspect_ratio が aspect_ratios にありません: {self.master_aspect_ratio} -> {self.aspect_ratios[0]}")
+            self.master_aspect_ratio = self.aspect_ratios[0]
+        self.reframe_mode = config.get("reframe", REFRAME_PAD)
+        
         # 余韻設定
         self.tail_sec = float(config.get("tail_sec", TAIL_SEC))
         
@@ -90,31 +113,14 @@ class VideoShortTransformer(BaseTransformer):
         if not self.aspect_ratio_sizes:
             self.aspect_ratio_sizes = DEFAULT_ASPECT_RATIO_SIZES
         
-        print(f"✨ VideoShortTransformer初期化: aspect_ratios={self.aspect_ratios}, resolutions={self.aspect_ratio_sizes}, tail_sec={self.tail_sec}")
-        self.reference_images = {}
+        print(f"✨ VideoShortTransformer初期化: aspect_ratios={self.aspect_ratios}, resolutions={self.aspect_ratio_sizes}, tail_sec={self.tail_sec}, encoder_profile={self.encoder_profile.name}")
 
-    def _load_reference_images(self) -> Dict[str, Image.Image]:
-        """参照画像を読み込む"""
-        images = {}
-        if not self.reference_images_dir:
-            return images
-            
-        ref_dir = Path(self.reference_images_dir)
-        if not ref_dir.exists():
-            # プロジェクトルートからの相対パスとして試す (簡易)
-            # PYTHONPATHが通っている前提で、カレントディレクトリ基準で探す
-            pass
-
-        if ref_dir.exists() and ref_dir.is_dir():
-            for ext in ["*.png", "*.jpg", "*.jpeg", "*.webp"]:
-                for img_path in ref_dir.glob(ext):
-                    try:
-                        img = Image.open(img_path)
-                        images[img_path.name] = img
-                        print(f"🖼️ 参照画像ロード: {img_path.name}")
-                    except Exception as e:
-                        print(f"⚠️ 参照画像ロード失敗 ({img_path.name}): {e}")
-        return images
+    def _load_reference_images(self) -> List[Any]:
+        """参照画像を読み込む (縮小・エンコード・アップロードはプロセス内で1回だけ)"""
+        if not self.generate_images:
+            return []
+        images = load_reference_images(self.reference_images_dir, max_edge=self.reference_max_edge)
+        return reference_parts(images, self.image_gen.api_key, upload=self.reference_upload)
     
     def transform(self, article: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
@@ -128,8 +134,8 @@ class VideoShortTransformer(BaseTransformer):
             return None
         
         try:
-            # 参照画像ロード
-            self.reference_images = self._load_reference_images()
+            # 参照画像 (2件目以降はキャッシュ済み)
+            reference_images = self._load_reference_images()
             
             # 必要なデータを取得
             title = article.get("title", "")
@@ -214,68 +220,29 @@ class VideoShortTransformer(BaseTransformer):
                     return None
                 
                 # 各アスペクト比で動画生成
-                results = {}
+                # (derive_from_master: マスターだけを合成し、他のアスペクト比はマスターから変換)
+                ratios = []
                 for aspect_ratio in self.aspect_ratios:
                     if aspect_ratio not in self.aspect_ratio_sizes:
                         print(f"⚠️ 解像度が定義されていません: {aspect_ratio}")
                         continue
-                    
-                    # 解像度取得
-                    width, height = self.aspect_ratio_sizes[aspect_ratio]
-                    print(f"🎥 動画生成 ({aspect_ratio}, {width}x{height}): {title[:30]}...")
-                    
-                    # VideoCompositor作成
-                    compositor = VideoCompositor(width, height, self.fps, scene_padding=self.tail_sec)
-                    
-                    # 各シーンの動画を生成
-                    scene_videos = []
-                    for scene in scene_assets:
-                        # 画像パス
-                        image_path = os.path.join(tmpdir, f"scene_{scene['scene_id']}_{aspect_ratio.replace(':', 'x')}.png")
-                        
-                        # 2. 画像生成 (またはプレースホルダー)
-                        if self.generate_images and scene["image_prompt"]:
-                            # 画像生成
-                            if not self.image_gen.generate(scene["image_prompt"], image_path, aspect_ratio, self.reference_images, self.image_size):
-                                print(f"⚠️ 画像生成失敗 -> プレースホルダー使用")
-                                self._create_placeholder(image_path, width, height, f"Scene {scene['scene_id']}")
-                        else:
-                            # プレースホルダー
-                            self._create_placeholder(image_path, width, height, f"Scene {scene['scene_id']}")
-                        
-                        # 3. 動画クリップ生成
-                        scene_video_path = os.path.join(tmpdir, f"clip_{scene['scene_id']}_{aspect_ratio.replace(':', 'x')}.mp4")
-                        
-                        # 推定時間を渡す (ffprobeが失敗した場合に使用される)
-                        success = compositor.create_video(
-                            image_path=image_path,
-                            audio_path=scene["audio_path"],
-                            output_path=scene_video_path,
-                            telop_text=scene["telop"] if self.telop_config.get("enabled") else None,
-                            telop_config=self.telop_config if self.telop_config.get("enabled") else None,
-                            duration=scene["estimated_duration"]  # ここで渡す
-                        )
-                        
-                        if success:
-                            scene_videos.append(scene_video_path)
-                    
-                    if not scene_videos:
-                        print(f"⚠️ シーン動画生成失敗 ({aspect_ratio}): {title}")
-                        continue
-                    
-                    # シーンを連結
-                    temp_video_path = os.path.join(tmpdir, f"temp_{aspect_ratio.replace(':', 'x')}.mp4")
-                    if len(scene_videos) == 1:
-                        shutil.copy(scene_videos[0], temp_video_path)
-                    else:
-                        self._concat_videos(scene_videos, temp_video_path)
-                    
-                    # BGM合成
-                    final_video_path = os.path.join(tmpdir, f"final_{aspect_ratio.replace(':', 'x')}.mp4")
-                    if self.bgm_config.get("enabled", False):
-                        self._add_bgm(temp_video_path, final_video_path)
-                    else:
-                        shutil.move(temp_video_path, final_video_path)
+                    ratios.append(aspect_ratio)
+                if self.derive_from_master and self.master_aspect_ratio in ratios:
+                    ratios.remove(self.master_aspect_ratio)
+                    ratios.insert(0, self.master_aspect_ratio)
+                
+                results = {}
+                master_video_path = None
+                for aspect_ratio in ratios:
+                    final_video_path = None
+                    if master_video_path:
+                        final_video_path = self._derive_video(master_video_path, aspect_ratio, tmpdir)
+                    if final_video_path is None:
+                        final_video_path = self._render_video(aspect_ratio, scene_assets, reference_images, tmpdir, title)
+                        if final_video_path is None:
+                            continue
+                        if self.derive_from_master and aspect_ratio == self.master_aspect_ratio:
+                            master_video_path = final_video_path
                     
                     # ストレージに保存
                     aspect_suffix = aspect_ratio.replace(':', 'x')
@@ -296,13 +263,16 @@ class VideoShortTransformer(BaseTransformer):
                 print(f"❌ すべてのアスペクト比で動画生成失敗: {title}")
                 return None
             
-            return {
+            result = {
                 **results,
                 "script_title": script_title,
                 "scene_count": len(beats),
                 "aspect_ratios": self.aspect_ratios,
                 "mime_type": "video/mp4"
             }
+            if self.derive_from_master:
+                result["master_aspect_ratio"] = self.master_aspect_ratio
+            return result
             
         except Exception as e:
             print(f"❌ 動画生成エラー: {article.get('title', 'unknown')} | {e}")
@@ -310,6 +280,96 @@ class VideoShortTransformer(BaseTransformer):
             traceback.print_exc()
             return None
     
+    def _render_video(
+        self,
+        aspect_ratio: str,
+        scene_assets: List[Dict[str, Any]],
+        reference_images: List[Any],
+        tmpdir: str,
+        title: str
+    ) -> Optional[str]:
+        """
+        1つのアスペクト比の動画を合成 (画像 → シーン動画 → 連結 → BGM)
+        
+        Returns:
+            完成した動画のパス (失敗した場合はNone)
+        """
+        # 解像度取得
+        width, height = self.aspect_ratio_sizes[aspect_ratio]
+        print(f"🎥 動画生成 ({aspect_ratio}, {width}x{height}): {title[:30]}...")
+        
+        # VideoCompositor作成
+        compositor = VideoCompositor(width, height, self.fps, scene_padding=self.tail_sec, profile=self.encoder_profile)
+        
+        # 各シーンの動画を生成
+        scene_videos = []
+        for scene in scene_assets:
+            # 画像パス
+            image_path = os.path.join(tmpdir, f"scene_{scene['scene_id']}_{aspect_ratio.replace(':', 'x')}.png")
+            
+            # 2. 画像生成 (またはプレースホルダー)
+            if self.generate_images and scene["image_prompt"]:
+                # 画像生成
+                if not self.image_gen.generate(scene["image_prompt"], image_path, aspect_ratio, reference_images, self.image_size):
+                    print(f"⚠️ 画像生成失敗 -> プレースホルダー使用")
+                    self._create_placeholder(image_path, width, height, f"Scene {scene['scene_id']}")
+            else:
+                # プレースホルダー
+                self._create_placeholder(image_path, width, height, f"Scene {scene['scene_id']}")
+            
+            # 3. 動画クリップ生成
+            scene_video_path = os.path.join(tmpdir, f"clip_{scene['scene_id']}_{aspect_ratio.replace(':', 'x')}.mp4")
+            
+            # 推定時間を渡す (ffprobeが失敗した場合に使用される)
+            success = compositor.create_video(
+                image_path=image_path,
+                audio_path=scene["audio_path"],
+                output_path=scene_video_path,
+                telop_text=scene["telop"] if self.telop_config.get("enabled") else None,
+                telop_config=self.telop_config if self.telop_config.get("enabled") else None,
+                duration=scene["estimated_duration"]  # ここで渡す
+            )
+            
+            if success:
+                scene_videos.append(scene_video_path)
+        
+        if not scene_videos:
+            print(f"⚠️ シーン動画生成失敗 ({aspect_ratio}): {title}")
+            return None
+        
+        # シーンを連結
+        temp_video_path = os.path.join(tmpdir, f"temp_{aspect_ratio.replace(':', 'x')}.mp4")
+        if len(scene_videos) == 1:
+            shutil.copy(scene_videos[0], temp_video_path)
+        else:
+            self._concat_videos(scene_videos, temp_video_path)
+        
+        # BGM合成
+        final_video_path = os.path.join(tmpdir, f"final_{aspect_ratio.replace(':', 'x')}.mp4")
+        if self.bgm_config.get("enabled", False):
+            self._add_bgm(temp_video_path, final_video_path)
+        else:
+            shutil.move(temp_video_path, final_video_path)
+        
+        return final_video_path
+    
+    def _derive_video(self, master_video_path: str, aspect_ratio: str, tmpdir: str) -> Optional[str]:
+        """
+        マスター動画を別のアスペクト比に変換 (ナレーション + BGM の音声はそのまま使う)
+        
+        Returns:
+            変換した動画のパス (失敗した場合はNone、呼び出し側で合成し直す)
+        """
+        width, height = self.aspect_ratio_sizes[aspect_ratio]
+        print(f"🎞️ マスター ({self.master_aspect_ratio}) から変換 ({aspect_ratio}, {width}x{height}, {self.reframe_mode})")
+        
+        compositor = VideoCompositor(width, height, self.fps, scene_padding=self.tail_sec, profile=self.encoder_profile)
+        output_path = os.path.join(tmpdir, f"final_{aspect_ratio.replace(':', 'x')}.mp4")
+        if not compositor.reframe_video(master_video_path, output_path, self.reframe_mode):
+            print(f"⚠️ マスターからの変換失敗 -> 個別に合成 ({aspect_ratio})")
+            return None
+        return output_path
+    
     def _create_placeholder(self, path: str, width: int, height: int, text: str = ""):
         """プレースホルダー画像を生成"""
         img = Image.new("RGB", (width, height), "#f3f4f6")
@@ -351,7 +411,8 @@ class VideoShortTransformer(BaseTransformer):
             output_path
         ]
         
-        subprocess.run(cmd, check=True, capture_output=True)
+        with span("ffmpeg.run", step="concat"):
+            subprocess.run(cmd, check=True, capture_output=True)
         os.remove(list_file)
 
     def _safe_len_seconds(self, text: str) -> float:
@@ -406,13 +467,16 @@ class VideoShortTransformer(BaseTransformer):
                 "-stream_loop", "-1", "-i", bgm_path,
                 "-filter_complex", fc,
                 "-map", "[v1]", "-map", "[aout]",
-                "-c:v", "libx264", "-profile:v", "high", "-level", "4.1",
-                "-c:a", "aac", "-b:a", "192k",
+                *self.encoder_profile.video_args(),
+                *self.encoder_profile.audio_args(),
+                *self.encoder_profile.container_args(),
                 "-t", str(duration + self.tail_sec),  # 動画の長さを明示的に指定
                 output_path
             ]
             
-            subprocess.run(cmd, check=True, capture_output=True)
+            with span("ffmpeg.run", step="bgm", profile=self.encoder_profile.name) as s:
+                subprocess.run(cmd, check=True, capture_output=True)
+                s.amount = os.path.getsize(output_path)
         except Exception as e:
             print(f"⚠️ BGM合成失敗: {e}")
             shutil.copy(video_path, output_path)
@@ -11,13 +11,21 @@ import time
 import tempfile
 import subprocess
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, TYPE_CHECKING
 
 # パスを追加
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
 
-from google import genai
-from google.genai import types
+from backend.common.llm import LIMIT_TTS, gemini_request, get_genai_client
+from backend.common.metrics import span
+from backend.common.usage import record_usage
+
+if TYPE_CHECKING:
+    from google import genai
+
+
+# Gemini TTS の出力 (16bit モノラル PCM) のサンプリングレート
+PCM_SAMPLE_RATE = 24000
 
 
 class GeminiTTS:
@@ -36,11 +44,15 @@ class GeminiTTS:
         self.style = style
         self.pronunciation_dict = pronunciation_dict or {}
         
-        # クライアント初期化
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
+        # クライアントは最初の生成時に作成 (キーの有無だけ先に確認)
+        self.api_key = os.getenv("GOOGLE_API_KEY")
+        if not self.api_key:
             raise ValueError("GOOGLE_API_KEY が設定されていません")
-        self.client = genai.Client(api_key=api_key)
+    
+    @property
+    def client(self) -> "genai.Client":
+        """google-genai クライアント (最初の生成時に作成、プロセス全体で共有)"""
+        return get_genai_client(self.api_key)
     
     def _apply_pronunciation(self, text: str) -> str:
         """発音辞書を適用"""
@@ -73,27 +85,33 @@ class GeminiTTS:
         # プロンプト作成
         prompt = self._build_prompt(text)
         
+        from google.genai import types  # SDK は生成時に読み込む
+        
         for attempt in range(retries):
             try:
                 # TTS実行
-                response = self.client.models.generate_content(
-                    model=self.model,
-                    contents=prompt,
-                    config=types.GenerateContentConfig(
-                        response_modalities=["AUDIO"],
-                        speech_config=types.SpeechConfig(
-                            voice_config=types.VoiceConfig(
-                                prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                                    voice_name=self.voice
+                with gemini_request(self.model, LIMIT_TTS, "tts.generate"):
+                    response = self.client.models.generate_content(
+                        model=self.model,
+                        contents=prompt,
+                        config=types.GenerateContentConfig(
+                            response_modalities=["AUDIO"],
+                            speech_config=types.SpeechConfig(
+                                voice_config=types.VoiceConfig(
+                                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                                        voice_name=self.voice
+                                    )
                                 )
                             )
                         )
                     )
-                )
                 
                 # 音声データを抽出（Raw PCM）
                 pcm_data = self._extract_audio(response)
                 
+                # 音声の長さ (16bit モノラル 24kHz)
+                record_usage(self.model, response, audio_sec=len(pcm_data or b"") / (PCM_SAMPLE_RATE * 2), purpose="narration")
+                
                 if not pcm_data:
                     raise ValueError("音声データが見つかりません")
                 
@@ -151,7 +169,7 @@ class GeminiTTS:
         cmd = [
             "ffmpeg", "-y",
             "-f", "s16le",      # 16-bit signed little-endian PCM
-            "-ar", "24000",     # サンプリングレート 24kHz
+            "-ar", str(PCM_SAMPLE_RATE),  # サンプリングレート 24kHz
             "-ac", "1",         # モノラル
             "-i", pcm_path,
             "-c:a", "libmp3lame",
@@ -159,7 +177,8 @@ class GeminiTTS:
             mp3_path
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        with span("ffmpeg.run", step="tts_mp3"):
+            result = subprocess.run(cmd, capture_output=True, text=True)
         
         if result.returncode != 0:
             raise RuntimeError(f"FFmpeg変換失敗: {result.stderr}")